@@ -4,6 +4,8 @@
 from models import usuario_model, imobiliaria_model, imovel_model, agenda_model
 # Importações de utilitários (validadores e helpers)
 from utils import validators, helpers
+# Invalidação dos caches de horários fixos mantidos pelos controladores de vistoriador
+from controllers.vistoriador_controller import invalidar_cache_horarios_fixos, invalidar_cache_agenda
 # Importações para tipagem estática, melhorando a legibilidade e manutenção do código
 from typing import Dict, Any, Optional, List, Union, Tuple
 # Importação da biblioteca pandas para manipulação de dados, especialmente para relatórios
@@ -338,9 +340,12 @@ class AdminController:
         sucesso_cadastro = agenda_model.cadastrar_horarios_fixos_vistoriador(vistoriador_id, dias_semana, horarios_validos)
         
         if sucesso_cadastro:
+            # Os horários fixos mudaram: os caches dos controladores de vistoriador ficam obsoletos
+            invalidar_cache_horarios_fixos()
             # Após adicionar/atualizar horários fixos, a agenda base precisa ser regenerada
             # para refletir essas mudanças para datas futuras.
             agenda_model.gerar_agenda_baseada_em_horarios_fixos()
+            invalidar_cache_agenda() # --> Novos horários na agenda: descarta consultas em cache
             return {'success': True, 'message': "Horários fixos adicionados/atualizados e agenda regenerada."}
         else:
             return {'success': False, 'message': "Nenhum novo horário fixo foi adicionado (podem já existir ou ocorreu um erro)."}
@@ -371,6 +376,7 @@ class AdminController:
         # Tenta remover o horário fixo através do modelo
         sucesso = agenda_model.remover_horario_fixo_especifico(vistoriador_id, dia_semana_num_str, horario_str)
         if sucesso:
+            invalidar_cache_horarios_fixos() # --> Horários fixos alterados: invalida os caches
             # Idealmente, após remover um horário fixo, a agenda futura que dependia dele
             # deveria ser ajustada. A implementação atual pode não fazer isso automaticamente,
             # ou pode depender da lógica em `gerar_agenda_baseada_em_horarios_fixos` ser chamada.
@@ -429,6 +435,8 @@ class AdminController:
 
         # Tenta adicionar a entrada de agenda única através do modelo
         sucesso, mensagem = agenda_model.adicionar_entrada_agenda_unica(vistoriador_id, data_db_format, hora_str)
+        if sucesso:
+            invalidar_cache_agenda() # --> Agenda alterada: descarta consultas em cache
         return {'success': sucesso, 'message': mensagem}
 
     # --- Seção: Vistorias Improdutivas ---
@@ -484,6 +492,8 @@ class AdminController:
             motivo=motivo,
             valor_cobranca=valor_cobranca
         )
+        if sucesso:
+            invalidar_cache_agenda() # --> Horário passou a IMPRODUTIVA: descarta consultas em cache
         return {'success': sucesso, 'message': mensagem}
 
     # --- Seção: Geração de Relatórios ---
@@ -6,6 +6,7 @@ from models import agenda_model, imovel_model, usuario_model, imobiliaria_model
 from utils import validators, helpers
 # Importações para tipagem estática
 from typing import Dict, Any, Optional, List, Tuple
+from models.dto import AgendaRow # Item da agenda retornado pelas listagens
 # Importação do módulo datetime para manipulação de datas e horas (usado no bloco de teste __main__)
 import datetime
 
@@ -13,6 +14,8 @@ import datetime
 # para facilitar a criação de dados de teste. Se não fosse pelo teste, poderia ser removida
 # para reduzir o acoplamento entre controladores.
 from controllers.admin_controller import AdminController
+# Invalidação dos caches mantidos pelos controladores de vistoriador após alterações na agenda
+from controllers.vistoriador_controller import invalidar_cache_agenda, invalidar_cache_horarios_fixos
 
 class AgendaController:
     """
@@ -35,7 +38,7 @@ class AgendaController:
         pass # Nenhuma inicialização específica requerida no momento
 
     # --- Seção: Listagem de Horários da Agenda ---
-    def listar_horarios_para_agendamento_geral(self, filtro_periodo: str = "Todos os horários") -> List[Dict[str, Any]]:
+    def listar_horarios_para_agendamento_geral(self, filtro_periodo: str = "Todos os horários") -> List[AgendaRow]:
         """
         Lista os horários disponíveis na agenda para novos agendamentos.
 
@@ -48,8 +51,8 @@ class AgendaController:
                                   "Este mês", "Todos os horários".
 
         Returns:
-            List[Dict[str, Any]]: Uma lista de dicionários, onde cada dicionário representa
-                                  um horário disponível na agenda. Retorna lista vazia se
+            List[AgendaRow]: Uma lista de itens da agenda, cada um representando
+                             um horário disponível na agenda. Retorna lista vazia se
                                   nenhum horário disponível for encontrado no período.
         """
         # `obter_datas_para_filtro_periodo` converte a string do filtro em datas de início e fim
@@ -61,7 +64,7 @@ class AgendaController:
             apenas_disponiveis=True # Filtro crucial para esta função
         )
 
-    def listar_agendamentos_para_cancelamento(self, filtro_periodo: str = "Todos os agendamentos") -> List[Dict[str, Any]]:
+    def listar_agendamentos_para_cancelamento(self, filtro_periodo: str = "Todos os agendamentos") -> List[AgendaRow]:
         """
         Lista os horários que já possuem vistorias agendadas, para fins de visualização ou cancelamento.
 
@@ -70,8 +73,8 @@ class AgendaController:
                                   dos agendamentos.
 
         Returns:
-            List[Dict[str, Any]]: Uma lista de dicionários, cada um representando um
-                                  agendamento existente.
+            List[AgendaRow]: Uma lista de itens da agenda, cada um representando um
+                             agendamento existente.
         """
         data_inicio, data_fim = helpers.obter_datas_para_filtro_periodo(filtro_periodo)
         # Chama a função do modelo, especificando `apenas_agendados=True`
@@ -202,6 +205,9 @@ class AgendaController:
             ignorar_regras_horario_duplo=forcar_agendamento_unico # Permite flexibilidade controlada
         )
 
+        if sucesso_agendamento:
+            invalidar_cache_agenda() # --> Horário(s) ocupado(s): descarta consultas em cache
+
         if not sucesso_agendamento:
             # A `mensagem_agendamento` vinda do modelo deve explicar o motivo da falha
             # (ex: horário indisponível, imóvel já com vistoria marcada próxima, etc.)
@@ -231,6 +237,8 @@ class AgendaController:
 
         # Chama o modelo para processar o cancelamento
         sucesso, mensagem = agenda_model.cancelar_agendamento_vistoria(id_agenda, id_cliente_responsavel)
+        if sucesso:
+            invalidar_cache_agenda() # --> Horário(s) liberado(s): descarta consultas em cache
         return {'success': sucesso, 'message': mensagem}
 
     # --- Seção: Gerenciamento de Horários da Agenda (Visão Admin/Vistoriador) ---
@@ -242,7 +250,7 @@ class AgendaController:
                                        incluir_improdutivas: bool = False, # Parâmetro para incluir vistorias marcadas como improdutivas
                                        data_inicio: Optional[str] = None,  # Permite especificar data de início diretamente
                                        data_fim: Optional[str] = None      # Permite especificar data de fim diretamente
-                                       ) -> List[Dict[str, Any]]:
+                                       ) -> List[AgendaRow]:
         """
         Lista os horários da agenda para um vistoriador específico, com múltiplos filtros.
 
@@ -264,7 +272,7 @@ class AgendaController:
                                       Prevalece sobre `filtro_periodo`.
 
         Returns:
-            List[Dict[str, Any]]: Lista de horários da agenda conforme os filtros.
+            List[AgendaRow]: Lista de horários da agenda conforme os filtros.
         """
         # Determina as datas de início e fim para o filtro
         if data_inicio is None and data_fim is None:
@@ -315,6 +323,8 @@ class AgendaController:
 
         # Chama o modelo para fechar o horário
         sucesso, mensagem = agenda_model.fechar_horario_agenda(id_agenda, motivo, vistoriador_id_responsavel)
+        if sucesso:
+            invalidar_cache_agenda() # --> Horário fechado: descarta consultas em cache
         return {'success': sucesso, 'message': mensagem}
 
     def reabrir_horario_fechado(self, id_agenda: int, vistoriador_id_responsavel: int) -> Dict[str, Any]:
@@ -333,6 +343,8 @@ class AgendaController:
             
         # Chama o modelo para reabrir o horário
         sucesso, mensagem = agenda_model.reabrir_horario_agenda(id_agenda, vistoriador_id_responsavel)
+        if sucesso:
+            invalidar_cache_agenda() # --> Horário reaberto: descarta consultas em cache
         return {'success': sucesso, 'message': mensagem}
 
     def listar_horarios_fechados_do_vistoriador(self, vistoriador_id: int) -> List[Dict[str, Any]]:
@@ -374,6 +386,7 @@ class AgendaController:
         # Chama o modelo para cadastrar os horários fixos
         sucesso = agenda_model.cadastrar_horarios_fixos_vistoriador(vistoriador_id, dias_semana, horarios)
         if sucesso:
+            invalidar_cache_horarios_fixos() # --> Horários fixos alterados: invalida os caches
             # Se os horários fixos foram alterados com sucesso,
             # é importante disparar a regeneração da agenda base para refletir essas mudanças.
             self.disparar_geracao_agenda_automatica() # Chama o método local para regenerar
@@ -399,6 +412,7 @@ class AgendaController:
         # Chama a função do modelo que contém a lógica principal de geração da agenda
         sucesso = agenda_model.gerar_agenda_baseada_em_horarios_fixos(semanas_a_frente)
         if sucesso:
+            invalidar_cache_agenda() # --> Novos horários gerados: descarta consultas em cache
             return {'success': True, 'message': "Geração/Atualização da agenda concluída."}
         else:
             return {'success': False, 'message': "Erro durante a geração/atualização da agenda."}
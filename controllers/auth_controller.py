@@ -7,7 +7,29 @@ from models.usuario_model import login_usuario, redefinir_senha_usuario
 from utils.validators import is_valid_email, is_valid_password
 
 # Importações para tipagem estática, melhorando a clareza e detecção de erros
-from typing import Dict, Any, Optional, Tuple
+from typing import Optional, Tuple, TypedDict
+
+
+class _LoginResultBase(TypedDict):
+    """Chaves sempre presentes no resultado de `processar_login`."""
+    success: bool
+    message: str
+
+
+class LoginResult(_LoginResultBase, total=False):
+    """
+    Formato fixo do dicionário retornado por `AuthController.processar_login`.
+    'user_id' e 'user_type' só estão presentes quando o login é bem-sucedido.
+    """
+    user_id: int
+    user_type: str
+
+
+class ResetResult(TypedDict):
+    """Formato fixo do dicionário retornado por `AuthController.processar_redefinicao_senha`."""
+    success: bool
+    message: str
+
 
 class AuthController:
     """
@@ -30,7 +52,7 @@ class AuthController:
         """
         pass # Nenhuma inicialização específica é necessária no momento.
 
-    def processar_login(self, email: str, senha: str) -> Dict[str, Any]:
+    def processar_login(self, email: str, senha: str) -> LoginResult:
         """
         Processa a tentativa de login de um usuário no sistema.
 
@@ -43,7 +65,7 @@ class AuthController:
             senha (str): A senha fornecida pelo usuário.
 
         Returns:
-            Dict[str, Any]: Um dicionário contendo o resultado da tentativa de login:
+            LoginResult: Um dicionário contendo o resultado da tentativa de login:
                 'success' (bool): True se o login for bem-sucedido, False caso contrário.
                 'message' (Optional[str]): Uma mensagem informativa sobre o resultado
                                            (ex: erro de formato, credenciais inválidas).
@@ -84,7 +106,7 @@ class AuthController:
             # Para a interface do usuário, uma mensagem genérica é frequentemente preferível por segurança.
             return {'success': False, 'message': "E-mail ou senha incorretos."}
 
-    def processar_redefinicao_senha(self, email: str, nova_senha: str, confirmacao_nova_senha: str) -> Dict[str, Any]:
+    def processar_redefinicao_senha(self, email: str, nova_senha: str, confirmacao_nova_senha: str) -> ResetResult:
         """
         Processa a tentativa de redefinição de senha para um usuário.
 
@@ -98,7 +120,7 @@ class AuthController:
             confirmacao_nova_senha (str): A confirmação da nova senha.
 
         Returns:
-            Dict[str, Any]: Um dicionário contendo o resultado da tentativa de redefinição:
+            ResetResult: Um dicionário contendo o resultado da tentativa de redefinição:
                 'success' (bool): True se a senha for redefinida com sucesso, False caso contrário.
                 'message' (str): Uma mensagem informativa sobre o resultado da operação.
         """
@@ -107,6 +129,16 @@ class AuthController:
         if not email or not nova_senha or not confirmacao_nova_senha:
             return {'success': False, 'message': "Todos os campos são obrigatórios."}
 
+        # Verificações baratas (apenas comprimento) vêm antes das validações por regex,
+        # para que entradas inválidas sejam rejeitadas sem tocar em `is_valid_email`.
+        # Senha curta demais: rejeita de imediato.
+        if len(nova_senha) < 6:
+            return {'success': False, 'message': "A nova senha deve ter pelo menos 6 caracteres."}
+
+        # Comprimentos diferentes implicam senhas diferentes (evita a comparação completa).
+        if len(nova_senha) != len(confirmacao_nova_senha):
+            return {'success': False, 'message': "As senhas não coincidem."}
+
         # Valida o formato do e-mail
         if not is_valid_email(email):
             return {'success': False, 'message': "Formato de e-mail inválido."}
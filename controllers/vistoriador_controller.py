@@ -1,36 +1,144 @@
 # engentoria/controllers/vistoriador_controller.py
 
 # Importações de modelos de dados necessários para as operações do controlador
-from models import usuario_model, agenda_model
+from models import usuario_model, agenda_model, database
 # Importação de funções auxiliares, especificamente para converter filtros de período em datas
 from utils import helpers # Para obter_datas_para_filtro_periodo
 # Importações para tipagem estática, melhorando a legibilidade e robustez do código
-from typing import Dict, Any, Optional, List
-
-# Importações condicionais e configuração de sys.path para o bloco de teste `if __name__ == '__main__'`
-# Isso permite que o script de teste encontre outros módulos do projeto quando executado diretamente.
-import sys
-import os
-# Obtém o diretório do arquivo atual e o diretório raiz do projeto
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.dirname(current_dir) # Assume que 'controllers' está um nível abaixo da raiz do projeto
-# Adiciona a raiz do projeto ao sys.path se ainda não estiver lá
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
-
-# Importações específicas para o bloco de teste `if __name__ == '__main__'`
-if __name__ == '__main__':
-    from controllers.admin_controller import AdminController # Para criar/gerenciar dados de teste
-    # A importação de `criar_tabelas` dependeria da estrutura do seu módulo de banco de dados.
-    # Se `database.py` contiver essa função, o import seria `from models.database import criar_tabelas`.
-    # Supondo que exista para fins de configuração de teste:
-    try:
-        from models.database import criar_tabelas
-    except ImportError:
-        # Define uma função dummy se não existir, para que o teste não quebre apenas por isso.
-        def criar_tabelas():
-            print("AVISO: Função 'criar_tabelas' não encontrada no models.database. Testes podem não ter o DB configurado.")
-            pass
+from typing import Dict, Any, Optional, List, Tuple, Iterator
+import sys # sys.intern para os rótulos de período
+import logging # Registro de eventos do controlador (substitui prints nos caminhos frequentes)
+import operator # operator.index: conversão estrita para inteiro na validação do ID
+from models.dto import AgendaRow # Item da agenda retornado pelas listagens
+from functools import lru_cache # Memoização da conversão de período em datas
+from datetime import date # A data atual faz parte da chave do cache
+import time # Marcação de tempo para a validade (TTL) dos caches do controlador
+import threading # Proteção do cache de agenda (acessado também pelas threads do painel inicial)
+from collections import OrderedDict # Cache LRU com TTL para as consultas de agenda
+from concurrent.futures import ThreadPoolExecutor # Carregamento concorrente do painel inicial
+
+
+# Logger do módulo: mensagens abaixo do nível configurado não são nem formatadas
+# (argumentos no estilo %s são interpolados apenas se a mensagem for emitida).
+logger = logging.getLogger(__name__)
+
+# Rótulos de período mais usados pela interface, internados: comparações e buscas
+# nos caches (chaves de dicionário) com essas strings resolvem por identidade.
+PERIODO_HOJE = sys.intern("Hoje")
+PERIODO_AMANHA = sys.intern("Amanhã")
+PERIODO_ESTA_SEMANA = sys.intern("Esta semana")
+PERIODO_PROXIMAS_2_SEMANAS = sys.intern("Próximas 2 semanas")
+PERIODO_TODOS_AGENDAMENTOS = sys.intern("Todos os agendamentos")
+
+# Nomes abreviados dos dias da semana, indexados pela convenção de `horarios_fixos.dia_semana`
+# ('0' = Domingo, ..., '6' = Sábado). Tabela constante: evita uma chamada de função por linha.
+_DIAS = ("Dom", "Seg", "Ter", "Qua", "Qui", "Sex", "Sáb")
+
+# Tempo (em segundos) durante o qual os horários fixos em cache são considerados válidos
+TTL_CACHE_HORARIOS_FIXOS_SEG = 300.0
+# Versão global dos horários fixos: incrementada sempre que um fluxo administrativo os altera.
+# Cada controlador guarda a versão com a qual preencheu seu cache; se divergir, o cache é descartado.
+_versao_horarios_fixos: int = 0
+
+
+def invalidar_cache_horarios_fixos() -> None:
+    """
+    Invalida os horários fixos em cache de todos os VistoriadorController existentes.
+    Deve ser chamada pelos fluxos que alteram horários fixos (ex: AdminController).
+    """
+    global _versao_horarios_fixos
+    _versao_horarios_fixos += 1
+
+
+# Cache de resultados de `obter_minha_agenda_detalhada`, compartilhado entre instâncias.
+# Chave: (vistoriador_id, filtro_periodo, apenas_agendados, apenas_disponiveis,
+#         incluir_fechados, incluir_improdutivas, data_atual)
+# Valor: (instante de armazenamento, versão dos dados, lista de itens da agenda)
+# A versão dos dados (`database.obter_versao_dados`) muda a cada commit: entradas preenchidas
+# antes de qualquer alteração no banco são descartadas, mesmo dentro do TTL.
+TTL_CACHE_AGENDA_SEG = 30.0
+_MAX_ENTRADAS_CACHE_AGENDA = 256
+_cache_agenda: "OrderedDict[tuple, Tuple[float, int, List[AgendaRow]]]" = OrderedDict()
+_trava_cache_agenda = threading.Lock()
+
+
+# Combinações de filtros pedidas o tempo todo pela interface do vistoriador, pré-carregadas
+# no cache por `precomputar_agenda_vistoriador` (ex: ao abrir a tela do vistoriador).
+# Formato: (filtro_periodo, apenas_agendados, apenas_disponiveis, incluir_fechados, incluir_improdutivas)
+_COMBINACOES_MATERIALIZADAS: Tuple[Tuple[str, bool, bool, bool, bool], ...] = (
+    (PERIODO_HOJE, True, False, False, False), # Vistorias agendadas para hoje
+    (PERIODO_ESTA_SEMANA, False, True, False, False), # Horários disponíveis na semana
+)
+
+
+@lru_cache(maxsize=32)
+def _periodo_cached(filtro: str, today: date) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Versão memoizada de `helpers.obter_datas_para_filtro_periodo`.
+
+    O conjunto de filtros usados pela interface é pequeno e o resultado só depende
+    do filtro e do dia atual. Como `today` faz parte da chave, as entradas deixam
+    de ser usadas automaticamente na virada do dia.
+    """
+    return helpers.obter_datas_para_filtro_periodo(filtro)
+
+
+def _consultar_e_armazenar_agenda(chave_cache: tuple) -> List[AgendaRow]:
+    """
+    Executa a consulta da agenda descrita por `chave_cache` (mesmo formato das chaves
+    de `_cache_agenda`) e armazena o resultado no cache. Função auxiliar interna.
+    """
+    (vistoriador_id, filtro_periodo, apenas_agendados, apenas_disponiveis,
+     incluir_fechados, incluir_improdutivas, hoje) = chave_cache
+
+    # Converte o filtro de período textual (ex: "Hoje") em datas de início e fim concretas
+    # (resultado memoizado por filtro e por dia; ver `_periodo_cached`)
+    data_inicio, data_fim = _periodo_cached(filtro_periodo, hoje)
+    # Versão lida antes da consulta: um commit concorrente torna o resultado obsoleto
+    versao = database.obter_versao_dados()
+
+    # Chama a função do modelo `agenda_model` para buscar os horários da agenda.
+    # Todos os filtros, incluindo `vistoriador_id`, são passados para a camada de modelo,
+    # que é responsável por construir a consulta SQL apropriada.
+    itens = agenda_model.listar_horarios_agenda(
+        vistoriador_id=vistoriador_id, # Filtra crucialmente pela agenda do vistoriador logado
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        apenas_disponiveis=apenas_disponiveis,
+        apenas_agendados=apenas_agendados,
+        incluir_fechados=incluir_fechados,
+        incluir_improdutivas=incluir_improdutivas # Filtro para vistorias improdutivas
+    )
+
+    # Armazena o resultado, descartando a entrada menos usada se o limite for atingido
+    with _trava_cache_agenda:
+        _cache_agenda[chave_cache] = (time.monotonic(), versao, itens)
+        _cache_agenda.move_to_end(chave_cache)
+        if len(_cache_agenda) > _MAX_ENTRADAS_CACHE_AGENDA:
+            _cache_agenda.popitem(last=False)
+    return itens
+
+
+def precomputar_agenda_vistoriador(vistoriador_id: int) -> None:
+    """
+    Pré-carrega no cache as combinações de filtros mais usadas (`_COMBINACOES_MATERIALIZADAS`)
+    para o vistoriador. Depois de uma alteração no banco, as entradas deixam de valer (versão
+    dos dados) e são recalculadas na próxima leitura, não no caminho de escrita.
+    """
+    hoje = date.today()
+    for combinacao in _COMBINACOES_MATERIALIZADAS:
+        _consultar_e_armazenar_agenda((vistoriador_id, *combinacao, hoje))
+
+
+def invalidar_cache_agenda() -> None:
+    """
+    Descarta todas as consultas de agenda em cache. Chamada pelos fluxos que alteram a agenda
+    (agendar, cancelar, fechar, reabrir, gerar agenda, marcar improdutiva, adicionar horário
+    avulso) para liberar a memória das entradas; a versão dos dados já as tornaria obsoletas.
+    Nenhuma consulta é refeita aqui: o caminho de escrita (thread da interface) não paga por ela.
+    """
+    with _trava_cache_agenda:
+        _cache_agenda.clear()
 
 
 class VistoriadorController:
@@ -44,6 +152,11 @@ class VistoriadorController:
     - Listar seus horários de trabalho fixos.
     """
 
+    # Atributos fixos da instância: dispensa o __dict__ por objeto e transforma
+    # erros de digitação em nomes de atributos em AttributeError imediato.
+    __slots__ = ('vistoriador_id', '_perfil_cache', '_horarios_fixos_cache',
+                 '_horarios_fixos_ts', '_horarios_fixos_versao')
+
     def __init__(self, vistoriador_id: int):
         """
         Construtor do VistoriadorController.
@@ -60,10 +173,25 @@ class VistoriadorController:
             ValueError: Se o `vistoriador_id` não for um inteiro válido ou for menor/igual a zero.
         """
         # Validação crucial: o ID do vistoriador deve ser válido para o controlador funcionar.
-        if not isinstance(vistoriador_id, int) or vistoriador_id <= 0:
-            # Uma exceção é levantada aqui porque um ID inválido torna o controlador inutilizável.
+        # Uma exceção é levantada aqui porque um ID inválido torna o controlador inutilizável.
+        # `operator.index` aceita apenas tipos inteiros (int, numpy.int64, ...) e rejeita
+        # str/float com TypeError; bool é recusado explicitamente, apesar de ser subclasse de int.
+        if isinstance(vistoriador_id, bool):
+            raise ValueError("ID do vistoriador inválido fornecido ao VistoriadorController.")
+        try:
+            vid = operator.index(vistoriador_id)
+        except TypeError:
+            raise ValueError("ID do vistoriador inválido fornecido ao VistoriadorController.") from None
+        if vid <= 0:
             raise ValueError("ID do vistoriador inválido fornecido ao VistoriadorController.")
-        self.vistoriador_id: int = vistoriador_id # Armazena o ID do vistoriador para uso nos métodos
+        self.vistoriador_id: int = vid # Armazena o ID do vistoriador (como int puro) para uso nos métodos
+        # Cache do perfil: o ID é imutável durante a vida do controlador, então o perfil
+        # só precisa ser buscado uma vez. Use `invalidate_perfil()` após alterações no usuário.
+        self._perfil_cache: Optional[Dict[str, Any]] = None
+        # Cache dos horários fixos, com instante de preenchimento (TTL) e versão global correspondente
+        self._horarios_fixos_cache: Optional[List[Dict[str, str]]] = None
+        self._horarios_fixos_ts: float = 0.0
+        self._horarios_fixos_versao: int = -1
 
         # Comentário sobre acoplamento e alternativas de design:
         # Poderíamos instanciar outros controllers aqui se precisarmos de suas funcionalidades
@@ -78,8 +206,8 @@ class VistoriadorController:
         """
         Busca e retorna os dados de perfil do vistoriador logado.
 
-        Utiliza o `vistoriador_id` armazenado na instância para consultar o modelo.
-        Verifica se o usuário encontrado é realmente do tipo 'vistoriador'.
+        Utiliza o `vistoriador_id` armazenado na instância para consultar o modelo,
+        que só retorna o usuário se ele for do tipo 'vistoriador'.
 
         Returns:
             Optional[Dict[str, Any]]: Um dicionário com os dados do perfil do vistoriador
@@ -87,27 +215,36 @@ class VistoriadorController:
                                       e for do tipo correto. Retorna None se o usuário
                                       não for encontrado ou não for um vistoriador.
         """
-        # Busca o usuário pelo ID armazenado na instância, usando a função do modelo de usuário
-        perfil = usuario_model.obter_usuario_por_id(self.vistoriador_id)
+        # Retorna o perfil já carregado, evitando uma nova consulta ao banco
+        if self._perfil_cache is not None:
+            return self._perfil_cache
 
-        # Verifica se o perfil foi encontrado e se o tipo do usuário é 'vistoriador'
-        if perfil and perfil.get('tipo') == 'vistoriador':
+        # Busca o vistoriador pelo ID armazenado na instância. O filtro `tipo = 'vistoriador'`
+        # é aplicado na própria consulta do modelo, então um ID de outro tipo de usuário
+        # simplesmente não retorna dados.
+        perfil = usuario_model.obter_vistoriador_por_id(self.vistoriador_id)
+
+        if perfil:
+            self._perfil_cache = perfil # Apenas perfis válidos são armazenados em cache
             return perfil # Retorna os dados do perfil se tudo estiver correto
-        elif perfil:
-            # Log de aviso caso o ID corresponda a um usuário, mas este não seja um vistoriador.
-            # Isso pode indicar um erro na lógica de atribuição do ID ou no fluxo de autenticação.
-            print(f"⚠️ AVISO: Usuário ID {self.vistoriador_id} encontrado, mas não é do tipo 'vistoriador'. Tipo: {perfil.get('tipo')}")
-            return None # Ou poderia levantar um erro de permissão, dependendo da política do sistema.
-        
-        # Se o perfil não foi encontrado (usuario_model.obter_usuario_por_id retornou None)
-        print(f"ℹ️ INFO: Perfil não encontrado para o vistoriador ID {self.vistoriador_id}.")
+
+        # Perfil não encontrado (ID inexistente ou usuário que não é vistoriador)
+        logger.info("Perfil não encontrado para o vistoriador ID %s.", self.vistoriador_id)
         return None
 
-    def obter_minha_agenda_detalhada(self, filtro_periodo: str = "Todos os agendamentos",
+    def invalidate_perfil(self) -> None:
+        """
+        Descarta o perfil em cache, forçando uma nova consulta na próxima chamada
+        de `obter_meu_perfil`. Deve ser chamado após alterações nos dados do usuário
+        (ex: edição pelo administrador, troca de senha).
+        """
+        self._perfil_cache = None
+
+    def obter_minha_agenda_detalhada(self, filtro_periodo: str = PERIODO_TODOS_AGENDAMENTOS,
                                      apenas_agendados: bool = False,
                                      apenas_disponiveis: bool = False,
                                      incluir_fechados: bool = False,
-                                     incluir_improdutivas: bool = False) -> List[Dict[str, Any]]:
+                                     incluir_improdutivas: bool = False) -> List[AgendaRow]:
         """
         Lista os horários da agenda (agendados, disponíveis, fechados ou improdutivos)
         para o vistoriador logado, com base nos filtros fornecidos.
@@ -122,26 +259,65 @@ class VistoriadorController:
             incluir_improdutivas (bool): Se True, inclui na lista as vistorias que foram marcadas como improdutivas.
 
         Returns:
-            List[Dict[str, Any]]: Uma lista de dicionários, onde cada dicionário representa
-                                  um item da agenda do vistoriador, conforme os filtros aplicados.
-                                  Retorna uma lista vazia se nenhum item correspondente for encontrado.
+            List[AgendaRow]: Uma lista de itens da agenda do vistoriador, conforme os filtros aplicados
+                             (leitura por atributo ou no estilo dicionário).
+                             Retorna uma lista vazia se nenhum item correspondente for encontrado.
+        """
+        # Rótulos vindos da interface (ex: texto de um QComboBox) não são internados;
+        # sys.intern devolve a instância única (sem custo se já for uma das constantes PERIODO_*).
+        filtro_periodo = sys.intern(filtro_periodo)
+        hoje = date.today()
+
+        # Atualizações rápidas e repetidas da interface reutilizam o resultado em cache (TTL curto)
+        chave_cache = (self.vistoriador_id, filtro_periodo, apenas_agendados, apenas_disponiveis,
+                       incluir_fechados, incluir_improdutivas, hoje)
+        with _trava_cache_agenda:
+            entrada_cache = _cache_agenda.get(chave_cache)
+            if entrada_cache is not None:
+                instante, versao_entrada, itens_cache = entrada_cache
+                if (versao_entrada == database.obter_versao_dados()
+                        and time.monotonic() - instante < TTL_CACHE_AGENDA_SEG):
+                    _cache_agenda.move_to_end(chave_cache) # Marca como usada recentemente (LRU)
+                    return list(itens_cache) # Cópia rasa: o chamador pode alterar a lista sem corromper o cache
+                del _cache_agenda[chave_cache] # Entrada expirada ou dados alterados desde a consulta
+
+        return list(_consultar_e_armazenar_agenda(chave_cache))
+
+    def iter_minha_agenda_detalhada(self, filtro_periodo: str = PERIODO_TODOS_AGENDAMENTOS,
+                                    apenas_agendados: bool = False,
+                                    apenas_disponiveis: bool = False,
+                                    incluir_fechados: bool = False,
+                                    incluir_improdutivas: bool = False) -> Iterator[AgendaRow]:
+        """
+        Versão em fluxo de `obter_minha_agenda_detalhada`: mesmos filtros e mesmo
+        formato de item, mas os itens são lidos do banco sob demanda.
+
+        Indicada para telas que exibem apenas parte da agenda (ex: primeira página),
+        pois não monta a lista completa. Não utiliza o cache de consultas.
+
+        Yields:
+            AgendaRow: Um item da agenda do vistoriador.
         """
-        # Converte o filtro de período textual (ex: "Hoje") em datas de início e fim concretas
-        data_inicio, data_fim = helpers.obter_datas_para_filtro_periodo(filtro_periodo)
-        
-        # Chama a função do modelo `agenda_model` para buscar os horários da agenda.
-        # Todos os filtros, incluindo `vistoriador_id`, são passados para a camada de modelo,
-        # que é responsável por construir a consulta SQL apropriada.
-        return agenda_model.listar_horarios_agenda(
-            vistoriador_id=self.vistoriador_id, # Filtra crucialmente pela agenda do vistoriador logado
+        data_inicio, data_fim = _periodo_cached(filtro_periodo, date.today())
+        yield from agenda_model.iter_horarios_agenda(
+            vistoriador_id=self.vistoriador_id,
             data_inicio=data_inicio,
             data_fim=data_fim,
             apenas_disponiveis=apenas_disponiveis,
             apenas_agendados=apenas_agendados,
             incluir_fechados=incluir_fechados,
-            incluir_improdutivas=incluir_improdutivas # Filtro para vistorias improdutivas
+            incluir_improdutivas=incluir_improdutivas
         )
 
+    def invalidate_agenda_cache(self) -> None:
+        """
+        Descarta as consultas de agenda em cache deste vistoriador, forçando
+        uma nova consulta na próxima chamada de `obter_minha_agenda_detalhada`.
+        """
+        with _trava_cache_agenda:
+            for chave in [c for c in _cache_agenda if c[0] == self.vistoriador_id]:
+                del _cache_agenda[chave]
+
     def obter_meus_horarios_fixos(self) -> List[Dict[str, str]]:
         """
         Lista os horários de trabalho fixos cadastrados para o vistoriador logado.
@@ -156,9 +332,52 @@ class VistoriadorController:
                                   e 'horario' (no formato "HH:MM").
                                   Retorna uma lista vazia se o vistoriador não tiver horários fixos cadastrados.
         """
+        # Horários fixos mudam raramente (ação administrativa): reutiliza o resultado em cache
+        # enquanto estiver dentro do TTL e nenhuma alteração tiver sido sinalizada.
+        if (self._horarios_fixos_cache is not None
+                and self._horarios_fixos_versao == _versao_horarios_fixos
+                and time.monotonic() - self._horarios_fixos_ts < TTL_CACHE_HORARIOS_FIXOS_SEG):
+            return list(self._horarios_fixos_cache) # Cópia rasa: o chamador pode alterar a lista livremente
+
         # Delega a busca diretamente para a função correspondente no modelo da agenda,
         # passando o ID do vistoriador logado.
-        return agenda_model.listar_horarios_fixos_por_vistoriador(self.vistoriador_id)
+        horarios = agenda_model.listar_horarios_fixos_por_vistoriador(self.vistoriador_id)
+        self._horarios_fixos_cache = horarios
+        self._horarios_fixos_ts = time.monotonic()
+        self._horarios_fixos_versao = _versao_horarios_fixos
+        return list(horarios)
+
+    def obter_dashboard_inicial(self) -> Dict[str, Any]:
+        """
+        Carrega de uma só vez os dados do painel inicial do vistoriador:
+        perfil, horários fixos e agenda de hoje.
+
+        As três consultas são independentes e cada função do modelo abre sua própria
+        conexão, então são executadas em paralelo (uma thread por consulta) em vez de
+        sequencialmente.
+
+        Returns:
+            Dict[str, Any]: Dicionário com as chaves:
+                'perfil' (Optional[Dict[str, Any]]): Resultado de `obter_meu_perfil`.
+                'horarios_fixos' (List[Dict[str, str]]): Resultado de `obter_meus_horarios_fixos`.
+                'agenda_hoje' (List[AgendaRow]): Resultado de `obter_minha_agenda_detalhada(filtro_periodo="Hoje")`.
+        """
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futuro_perfil = executor.submit(self.obter_meu_perfil)
+            futuro_horarios = executor.submit(self.obter_meus_horarios_fixos)
+            futuro_agenda = executor.submit(self.obter_minha_agenda_detalhada, filtro_periodo=PERIODO_HOJE)
+            return {
+                'perfil': futuro_perfil.result(),
+                'horarios_fixos': futuro_horarios.result(),
+                'agenda_hoje': futuro_agenda.result(),
+            }
+
+    def invalidate_horarios_fixos(self) -> None:
+        """
+        Descarta os horários fixos em cache desta instância, forçando uma nova
+        consulta na próxima chamada de `obter_meus_horarios_fixos`.
+        """
+        self._horarios_fixos_cache = None
 
     
 
@@ -166,6 +385,28 @@ class VistoriadorController:
 # demonstração do controlador. Este bloco só é executado quando o script
 # `vistoriador_controller.py` é rodado diretamente (ex: `python vistoriador_controller.py`).
 if __name__ == '__main__':
+    # Configuração de sys.path e importações usadas apenas por este bloco de teste.
+    # Ficam aqui dentro para que importações normais do módulo não paguem nada por elas.
+    import os
+    # Obtém o diretório do arquivo atual e o diretório raiz do projeto
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(current_dir) # Assume que 'controllers' está um nível abaixo da raiz do projeto
+    # Adiciona a raiz do projeto ao sys.path se ainda não estiver lá
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+    from controllers.admin_controller import AdminController # Para criar/gerenciar dados de teste
+    # A importação de `criar_tabelas` dependeria da estrutura do seu módulo de banco de dados.
+    # Se `database.py` contiver essa função, o import seria `from models.database import criar_tabelas`.
+    # Supondo que exista para fins de configuração de teste:
+    try:
+        from models.database import criar_tabelas
+    except ImportError:
+        # Define uma função dummy se não existir, para que o teste não quebre apenas por isso.
+        def criar_tabelas():
+            print("AVISO: Função 'criar_tabelas' não encontrada no models.database. Testes podem não ter o DB configurado.")
+            pass
+
     # --- Configuração Inicial para Testes ---
     # Para testar este controller de forma isolada, precisamos de um `vistoriador_id` válido.
     # Em um cenário de aplicação real, este ID seria obtido após o processo de login
@@ -257,29 +498,30 @@ if __name__ == '__main__':
         if horarios_fixos:
             print(f"  Horários fixos para '{nome_vist_teste}' (ID: {id_vist_teste}):")
             for hf in horarios_fixos:
-                # `helpers.traduzir_dia_semana` converte o número do dia (0-6) para nome (Dom, Seg, ...).
-                dia_traduzido = helpers.traduzir_dia_semana(hf.get('dia_semana', -1)) # Usar get com default
+                # `dia_semana` vem do banco como string numérica (0=Dom ... 6=Sáb); consulta direta em `_DIAS`.
+                dia_num = int(hf.get('dia_semana', -1)) # Usar get com default
+                dia_traduzido = _DIAS[dia_num] if 0 <= dia_num < 7 else "?"
                 print(f"    - Dia: {dia_traduzido} (Num: {hf.get('dia_semana')}), Horário: {hf.get('horario')}")
         else:
             print(f"  Nenhum horário fixo cadastrado para o vistoriador ID {id_vist_teste}.")
 
         # Teste 3: Obter agendamentos (vistorias marcadas) para "Hoje".
         print("\n--- Teste 3: Listar Agendamentos do Vistoriador (Filtro: Hoje) ---")
-        agendamentos_hoje = vist_ctrl.obter_minha_agenda_detalhada(filtro_periodo="Hoje", apenas_agendados=True)
+        agendamentos_hoje = vist_ctrl.obter_minha_agenda_detalhada(filtro_periodo=PERIODO_HOJE, apenas_agendados=True)
         if agendamentos_hoje:
             print(f"  Agendamentos para '{nome_vist_teste}' hoje:")
             for ag in agendamentos_hoje:
-                print(f"    ID Agenda: {ag.get('id_agenda')}, Data: {ag.get('data')}, Hora: {ag.get('horario')}, Tipo: {ag.get('tipo_vistoria')}, Imóvel Cód: {ag.get('cod_imovel', 'N/A')}, Cliente: {ag.get('nome_cliente', 'N/A')}")
+                print(f"    ID Agenda: {ag.id_agenda}, Data: {ag.data}, Hora: {ag.horario}, Tipo: {ag.tipo_vistoria}, Imóvel Cód: {ag.cod_imovel or 'N/A'}, Cliente: {ag.nome_cliente or 'N/A'}")
         else:
             print(f"  Nenhum agendamento encontrado para '{nome_vist_teste}' hoje.")
 
         # Teste 4: Obter horários disponíveis para "Esta semana".
         print("\n--- Teste 4: Listar Horários Disponíveis do Vistoriador (Filtro: Esta Semana) ---")
-        disponiveis_semana = vist_ctrl.obter_minha_agenda_detalhada(filtro_periodo="Esta semana", apenas_disponiveis=True)
+        disponiveis_semana = vist_ctrl.obter_minha_agenda_detalhada(filtro_periodo=PERIODO_ESTA_SEMANA, apenas_disponiveis=True)
         if disponiveis_semana:
             print(f"  Horários disponíveis para '{nome_vist_teste}' esta semana:")
             for disp in disponiveis_semana:
-                print(f"    ID Agenda: {disp.get('id_agenda')}, Data: {disp.get('data')}, Hora: {disp.get('horario')}")
+                print(f"    ID Agenda: {disp.id_agenda}, Data: {disp.data}, Hora: {disp.horario}")
         else:
             print(f"  Nenhum horário disponível encontrado para '{nome_vist_teste}' esta semana.")
             print(f"    (Isso pode ser normal se todos os horários fixos já estiverem agendados, se a agenda não foi gerada para este período, ou se não há horários fixos nesta semana.)")
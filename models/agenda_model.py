@@ -1,30 +1,160 @@
 # engentoria/models/agenda_model.py
 import sqlite3 # Biblioteca para interagir com bancos de dados SQLite
 import datetime as dt # Biblioteca para manipulação de datas e horas
+import importlib.util # Detecção do pyarrow (opcional) para os relatórios
+import itertools # Geração das combinações de filtros da listagem da agenda
+import re # Expressões regulares para validar formatos de data e horário
+import threading # Proteção do cache de listagens da agenda
+import time # Marcação de tempo para a validade (TTL) do cache de listagens
+from collections import OrderedDict # Cache LRU de listagens da agenda
+from concurrent.futures import ThreadPoolExecutor # Geração de vários relatórios em paralelo
 import pandas as pd # Biblioteca para manipulação de dados, especialmente para relatórios
-from .database import conectar_banco # Função para conectar ao banco de dados (do mesmo pacote)
+from .database import conectar_banco, transacao, obter_versao_dados, TAMANHO_POOL_CONEXOES # Conexão com o banco de dados, unidade de trabalho, versão dos dados e tamanho do pool (do mesmo pacote)
+from .dto import AgendaRow # Item da agenda retornado pelas listagens
 # Importações de outros modelos para funcionalidades interdependentes:
 # - imovel_model: para regras de horários, obter dados do imóvel, calcular valor, deletar imóvel.
-# - usuario_model: para deletar cliente.
-from .imovel_model import regras_necessita_dois_horarios, obter_imovel_por_id, calcular_valor_vistoriador, listar_todos_imoveis, deletar_imovel_por_id as deletar_imovel_associado
-from .usuario_model import deletar_cliente_por_id, obter_cliente_por_id
-from typing import Optional, List, Dict, Any, Tuple # Tipos para anotações estáticas
+# - usuario_model: para obter dados do cliente.
+from .imovel_model import regras_necessita_dois_horarios, obter_imovel_por_id, listar_todos_imoveis, deletar_imovel_por_id as deletar_imovel_associado
+from .imovel_model import TABELA_VALOR_VISTORIADOR, LIMITE_VALOR_MINIMO_M2, LIMITE_VALOR_FIXO_M2, FATOR_VALOR_CONFERENCIA
+from .usuario_model import obter_cliente_por_id
+from typing import Optional, List, Dict, Any, Tuple, Iterator # Tipos para anotações estáticas
 import logging # Biblioteca para logging de eventos e erros
 
 # Configuração básica do logging para registrar informações, avisos e erros.
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- SQL pré-montado para `listar_horarios_agenda` ---
+# Query base selecionando todos os campos necessários e fazendo os JOINs
+_SQL_LISTAR_AGENDA_BASE = """
+        SELECT a.id, a.data, a.horario, a.disponivel = 1, a.tipo, a.imovel_id,
+               u.nome as nome_vistoriador, a.vistoriador_id,
+               i.cod_imovel, i.endereco as endereco_imovel, i.cep as cep_imovel,
+               i.referencia as referencia_imovel, i.tamanho as tamanho_imovel, i.mobiliado as mobiliado_imovel,
+               c.nome as nome_cliente, c.id as cliente_id, c.email as email_cliente,
+               imob.nome as nome_imobiliaria
+        FROM agenda a
+        JOIN usuarios u ON a.vistoriador_id = u.id /* Informações do vistoriador */
+        LEFT JOIN imoveis i ON a.imovel_id = i.id /* Informações do imóvel, se houver */
+        LEFT JOIN clientes c ON i.cliente_id = c.id /* Informações do cliente do imóvel, se houver */
+        LEFT JOIN imobiliarias imob ON i.imobiliaria_id = imob.id /* Informações da imobiliária do imóvel, se houver */
+        WHERE 1=1 /* Condição base para facilitar a adição de ANDs */
+    """
+# Variante para quando apenas horários livres são pedidos: horários 'LIVRE' não têm imóvel
+# (nem cliente/imobiliária) associado, então os LEFT JOINs são dispensados. As colunas
+# correspondentes vêm como NULL, mantendo exatamente o mesmo formato de linha.
+_SQL_LISTAR_AGENDA_BASE_APENAS_LIVRES = """
+        SELECT a.id, a.data, a.horario, a.disponivel = 1, a.tipo, a.imovel_id,
+               u.nome as nome_vistoriador, a.vistoriador_id,
+               NULL, NULL, NULL, NULL, NULL, NULL, /* Campos do imóvel */
+               NULL, NULL, NULL, /* Campos do cliente */
+               NULL /* Campo da imobiliária */
+        FROM agenda a
+        JOIN usuarios u ON a.vistoriador_id = u.id /* Informações do vistoriador */
+        WHERE 1=1 /* Condição base para facilitar a adição de ANDs */
+    """
+
+
+def _montar_filtro_status_agenda(apenas_agendados: bool, apenas_disponiveis: bool,
+                                 incluir_fechados: bool, incluir_improdutivas: bool) -> str:
+    """
+    Monta o trecho SQL de filtro por status/tipo do horário para uma combinação de flags.
+    Usada apenas na importação do módulo para preencher `_FILTROS_STATUS_AGENDA`.
+
+    Os tipos aceitos são emitidos como `a.tipo IN (...)`: uma igualdade direta sobre a
+    coluna, que pode ser resolvida pelo índice idx_agenda_vist_data_tipo_disp_hora
+    (vistoriador_id, data, tipo, disponivel, ...). Em vez de uma disjunção (OR) por status,
+    cada grupo de tipos que exige um valor de 'disponivel' recebe apenas a sua condição, e
+    ela se reduz a `a.disponivel = ?` quando o grupo é o único aceito. Quando 'LIVRE' não
+    está entre os tipos aceitos, o filtro inclui também `a.tipo != 'LIVRE'` (redundante),
+    condição do índice parcial idx_agenda_data_ocupados.
+    """
+    tipos_filtro: List[str] = []
+    if apenas_disponiveis:
+        tipos_filtro.append('LIVRE')
+    if apenas_agendados: # Vistorias ativas
+        tipos_filtro.extend(['ENTRADA', 'SAIDA', 'CONFERENCIA'])
+    if incluir_fechados:
+        tipos_filtro.append('FECHADO')
+    if incluir_improdutivas:
+        tipos_filtro.append('IMPRODUTIVA')
+
+    if tipos_filtro:
+        # Condições de 'disponivel' por grupo de tipos (os grupos são disjuntos):
+        # - horários livres: disponivel = 1
+        # - vistorias ativas: disponivel = 0
+        # - 'FECHADO' e 'IMPRODUTIVA': sem condição
+        condicoes_disponivel = []
+        if apenas_disponiveis:
+            condicoes_disponivel.append(
+                "a.disponivel = 1" if len(tipos_filtro) == 1
+                else "(a.tipo != 'LIVRE' OR a.disponivel = 1)")
+        if apenas_agendados:
+            condicoes_disponivel.append(
+                "a.disponivel = 0" if len(tipos_filtro) == 3
+                else "(a.tipo NOT IN ('ENTRADA', 'SAIDA', 'CONFERENCIA') OR a.disponivel = 0)")
+        filtro_ocupados = "" if 'LIVRE' in tipos_filtro else " AND a.tipo != 'LIVRE'"
+        return (filtro_ocupados + " AND a.tipo IN (" + ", ".join(f"'{t}'" for t in tipos_filtro) + ")"
+                + "".join(" AND " + condicao for condicao in condicoes_disponivel))
+    # Comportamento padrão se nenhum filtro de status específico for marcado:
+    # não mostramos os horários 'LIVRE', a menos que outro filtro os inclua.
+    # Isso evita listar todos os horários livres futuros por default quando nenhum filtro é ativo.
+    # (Equivale a `a.tipo != 'LIVRE'` pelo CHECK da coluna, mas como lista de igualdades usa o índice.)
+    return " AND a.tipo != 'LIVRE' AND a.tipo IN ('ENTRADA', 'SAIDA', 'CONFERENCIA', 'FECHADO', 'IMPRODUTIVA') "
+
+
+def _chave_filtro_status_agenda(apenas_agendados: Any, apenas_disponiveis: Any,
+                                incluir_fechados: Any, incluir_improdutivas: Any) -> int:
+    """Empacota as quatro flags de status em um inteiro (0-15), usado como chave de `_FILTROS_STATUS_AGENDA`."""
+    return ((bool(apenas_agendados) << 3) | (bool(apenas_disponiveis) << 2)
+            | (bool(incluir_fechados) << 1) | bool(incluir_improdutivas))
+
+
+# Todas as 16 combinações de flags de status são montadas uma única vez, na importação.
+# `listar_horarios_agenda` apenas consulta o trecho pronto pela chave empacotada.
+# Como o texto SQL de cada combinação de filtros é sempre idêntico, o cache de comandos
+# das conexões (ver `database.TAMANHO_CACHE_COMANDOS`) prepara cada formato uma única vez.
+_FILTROS_STATUS_AGENDA: Dict[int, str] = {
+    _chave_filtro_status_agenda(*flags): _montar_filtro_status_agenda(*flags)
+    for flags in itertools.product((False, True), repeat=4)
+}
+# Chave da combinação "apenas disponíveis" (nenhum outro status incluído)
+_CHAVE_APENAS_LIVRES = _chave_filtro_status_agenda(False, True, False, False)
+
+# Validação de formato (mais leve que `datetime.strptime`, usado apenas para validar):
+# - _HHMM_RE: horário "HH:MM" de 00:00 a 23:59
+# - _YMD_RE: data "YYYY-MM-DD" com mês 01-12 e dia 01-31
+_HHMM_RE = re.compile(r"^(?:[01]\d|2[0-3]):[0-5]\d$")
+_YMD_RE = re.compile(r"^\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01])$")
+
+def _data_ymd_valida(data_str_ymd: str) -> bool:
+    """
+    Retorna True se `data_str_ymd` for uma data real no formato "YYYY-MM-DD".
+    A expressão regular descarta rapidamente formatos inválidos; as datas que passam por ela
+    são conferidas com `date.fromisoformat`, que rejeita dias inexistentes (ex: "2026-02-31").
+    """
+    if not _YMD_RE.match(data_str_ymd):
+        return False
+    try:
+        dt.date.fromisoformat(data_str_ymd)
+    except ValueError:
+        return False
+    return True
+
+# Número máximo de parâmetros por comando em operações em lote (cláusulas IN, CASE WHEN).
+# Fica abaixo do limite de parâmetros do SQLite (SQLITE_LIMIT_VARIABLE_NUMBER, 999 em versões antigas).
+_TAMANHO_LOTE_IN = 900
+
 def deletar_agendamentos_antigos_e_dados_relacionados(meses_antiguidade: int = 3) -> Dict[str, int]:
     """
     Deleta agendamentos da tabela 'agenda' mais antigos que um número especificado de meses.
 
-    Antes de deletar uma entrada da agenda, esta função tenta:
-    1. Deletar registros correspondentes na tabela 'vistorias_improdutivas'
-       (devido à constraint ON DELETE RESTRICT na FK `vistorias_improdutivas.agenda_id_original`).
-    Após deletar a entrada da agenda:
+    Os agendamentos antigos são removidos com um único DELETE:
+    1. Os registros correspondentes em 'vistorias_improdutivas' são removidos pelo próprio SQLite
+       (ON DELETE CASCADE na FK `vistorias_improdutivas.agenda_id_original`).
+    Após deletar as entradas da agenda, para cada uma efetivamente deletada:
     2. Deleta o imóvel associado (se houver) através de `deletar_imovel_associado`.
-    3. Se o imóvel foi deletado e tinha um cliente associado, tenta deletar o cliente
-       através de `deletar_cliente_por_id`. Esta é uma ação potencialmente destrutiva.
+    3. Se o imóvel foi deletado e tinha um cliente associado sem outros imóveis, deleta o
+       cliente. Esta é uma ação potencialmente destrutiva.
 
     As deleções em `horarios_fechados` são tratadas por ON DELETE CASCADE na FK `agenda_id`.
 
@@ -49,92 +179,91 @@ def deletar_agendamentos_antigos_e_dados_relacionados(meses_antiguidade: int = 3
     try:
         conexao = conectar_banco() # Estabelece conexão com o banco
         cursor = conexao.cursor() # Cria um cursor para executar queries
-        cursor.execute("PRAGMA foreign_keys = ON;") # Garante que as chaves estrangeiras sejam respeitadas
 
-        # Calcula a data limite para deleção (N meses atrás a partir de hoje)
-        # Aproximação de meses como 30 dias cada
-        data_limite = dt.date.today() - dt.timedelta(days=meses_antiguidade * 30)
-        data_limite_str = data_limite.strftime("%Y-%m-%d") # Formata a data para a query SQL
+        # Calcula a data limite para deleção (N meses de calendário atrás a partir de hoje)
+        # com a função date() do SQLite, já no formato YYYY-MM-DD usado na coluna `agenda.data`.
+        # 'localtime' mantém a mesma referência de "hoje" do restante do sistema (date('now') é UTC).
+        # Calculada uma única vez, para que todos os comandos abaixo usem exatamente o mesmo limite.
+        cursor.execute("SELECT date('now', 'localtime', ?)", (f"-{int(meses_antiguidade)} months",))
+        data_limite_str = cursor.fetchone()[0]
         logging.info(f"Rotina de limpeza: Deletando agendamentos anteriores a {data_limite_str}.")
 
-        # 1. Encontrar agendamentos antigos e seus imóveis/clientes associados
-        # Seleciona IDs de agenda, imóvel e cliente para agendamentos mais antigos que a data_limite.
+        # Toda a limpeza ocorre em uma única transação aberta explicitamente com o bloqueio de escrita
+        # já adquirido (BEGIN IMMEDIATE), em vez de deixar o sqlite3 abrir a transação implicitamente
+        # no primeiro DELETE. Assim o bloqueio é obtido uma vez, antes de qualquer leitura, e não
+        # precisa ser promovido no meio da rotina. Confirmada pelo commit ao final.
+        cursor.execute("BEGIN IMMEDIATE")
+
+        # 1. As vistorias improdutivas dos agendamentos antigos são contadas antes, apenas para o resumo
+        # (a FK `vistorias_improdutivas.agenda_id_original` é ON DELETE CASCADE, ver passo 2).
         cursor.execute("""
-            SELECT a.id as agenda_id, a.imovel_id, i.cliente_id
-            FROM agenda a
-            LEFT JOIN imoveis i ON a.imovel_id = i.id
-            WHERE a.data < ?
+            SELECT COUNT(*) FROM vistorias_improdutivas
+            WHERE agenda_id_original IN (SELECT id FROM agenda WHERE data < ?)
         """, (data_limite_str,))
-        agendamentos_antigos = cursor.fetchall() # Coleta todos os resultados
-
-        if not agendamentos_antigos:
-            logging.info("Nenhum agendamento antigo encontrado para deletar.")
-            return contadores # Retorna contadores zerados se não houver nada a fazer
-
-        logging.info(f"Encontrados {len(agendamentos_antigos)} agendamentos antigos para processar.")
-
-        # Itera sobre cada agendamento antigo encontrado
-        for agenda_id, imovel_id, cliente_id in agendamentos_antigos:
-            logging.info(f"Processando agendamento ID: {agenda_id}, Imóvel ID: {imovel_id}, Cliente ID: {cliente_id}")
-            
+        qtd_improdutivas = cursor.fetchone()[0]
+
+        # 2. Deleção em um único comando. As FKs `vistorias_improdutivas.agenda_id_original` e
+        # `horarios_fechados.agenda_id` são ON DELETE CASCADE: o próprio SQLite remove os registros
+        # dependentes, sem idas e vindas entre Python e o banco para cada linha.
+        # RETURNING devolve, para cada agendamento deletado, o imóvel e o cliente associados
+        # (usados no passo 3). O SQLite aplica toda a deleção no primeiro passo do comando e guarda
+        # as linhas retornadas; o cursor é então percorrido linha a linha, sem montar uma lista
+        # com todos os agendamentos antigos em memória.
+        try:
+            cursor.execute("""
+                DELETE FROM agenda WHERE data < ?
+                RETURNING id, imovel_id, (SELECT i.cliente_id FROM imoveis i WHERE i.id = agenda.imovel_id)
+            """, (data_limite_str,))
+        except sqlite3.IntegrityError as e: # Captura erros de integridade específicos do SQLite
+            contadores['erros_delecao_agendamento'] += 1
+            logging.error(f"  Erro de integridade ao deletar agendamentos antigos: {e}")
+            conexao.rollback()
+            return contadores
+
+        # 3. Imóveis e clientes associados aos agendamentos deletados.
+        # Um segundo cursor executa as deleções enquanto `cursor` ainda está sendo percorrido.
+        # Cada imóvel é processado uma única vez, mesmo que esteja ligado a mais de um agendamento.
+        cursor_interno = conexao.cursor()
+        imoveis_processados = set()
+        for agenda_id, imovel_id, cliente_id in cursor:
+            contadores['agendamentos_deletados'] += 1
+            if not imovel_id or imovel_id in imoveis_processados:
+                continue
+            imoveis_processados.add(imovel_id)
             try:
-                # 2. Tentar deletar vistorias improdutivas associadas ao agendamento
-                # A FK em `vistorias_improdutivas.agenda_id_original` é ON DELETE RESTRICT.
-                # Portanto, é necessário deletar estas entradas antes de deletar o agendamento da `agenda`.
-                cursor.execute("DELETE FROM vistorias_improdutivas WHERE agenda_id_original = ?", (agenda_id,))
-                if cursor.rowcount > 0: # Se alguma linha foi afetada (deletada)
-                    contadores['vistorias_improdutivas_deletadas'] += cursor.rowcount
-                    logging.info(f"  {cursor.rowcount} vistoria(s) improdutiva(s) associada(s) ao agendamento ID {agenda_id} deletada(s).")
-
-                # 3. Tentar deletar o agendamento da tabela 'agenda'
-                # A FK `horarios_fechados.agenda_id` para `agenda.id` é ON DELETE CASCADE,
-                # então entradas em `horarios_fechados` serão deletadas automaticamente.
-                cursor.execute("DELETE FROM agenda WHERE id = ?", (agenda_id,))
-                
-                if cursor.rowcount > 0: # Se o agendamento foi efetivamente deletado
-                    contadores['agendamentos_deletados'] += 1
-                    logging.info(f"  Agendamento ID {agenda_id} deletado.")
-
-                    # 4. Se o agendamento foi deletado e tinha um imóvel associado
-                    if imovel_id:
-                        # Deleta o imóvel associado. A função `deletar_imovel_associado` (alias para `deletar_imovel_por_id`)
-                        # deve lidar com suas próprias FKs (ex: `agenda.imovel_id` que é ON DELETE SET NULL).
-                        # Passa a conexão existente para reuso dentro da mesma transação (se `deletar_imovel_associado` suportar).
-                        if deletar_imovel_associado(imovel_id, conexao_existente=conexao):
-                            contadores['imoveis_deletados'] += 1
-                            logging.info(f"    Imóvel ID {imovel_id} associado ao agendamento antigo deletado.")
-                            
-                            # 5. Se o imóvel foi deletado e tinha um cliente associado
-                            # Esta é uma ação agressiva: deletar o cliente se seu (único?) imóvel associado a um agendamento antigo foi deletado.
-                            # Considerar se esta é a lógica desejada.
-                            if cliente_id:
-                                # Verifica se o cliente ainda existe antes de tentar deletar,
-                                # para evitar erros ou contagem dupla se já foi deletado por outro processo.
-                                cursor.execute("SELECT 1 FROM clientes WHERE id = ?", (cliente_id,))
-                                if cursor.fetchone(): # Se o cliente ainda existe
-                                    # `deletar_cliente_por_id` deve lidar com FKs (ex: `imoveis.cliente_id` é ON DELETE CASCADE).
-                                    if deletar_cliente_por_id(cliente_id, conexao_existente=conexao):
-                                        contadores['clientes_deletados'] += 1
-                                        logging.info(f"      Cliente ID {cliente_id} associado ao imóvel deletado.")
-                                    else:
-                                        logging.warning(f"      Falha ao deletar cliente ID {cliente_id} (pode ter outras dependências não CASCADE).")
-                                else:
-                                    logging.info(f"      Cliente ID {cliente_id} já não existia ou foi deletado anteriormente.")
+                # Deleta o imóvel associado. A função `deletar_imovel_associado` (alias para `deletar_imovel_por_id`)
+                # deve lidar com suas próprias FKs (ex: `agenda.imovel_id` que é ON DELETE SET NULL).
+                # Passa a conexão existente para reuso dentro da mesma transação.
+                if deletar_imovel_associado(imovel_id, conexao_existente=conexao):
+                    contadores['imoveis_deletados'] += 1
+                    logging.info(f"    Imóvel ID {imovel_id} associado ao agendamento antigo ID {agenda_id} deletado.")
+
+                    # Se o imóvel foi deletado e tinha um cliente associado, o cliente também é deletado,
+                    # mas somente se este era seu último imóvel.
+                    if cliente_id:
+                        # A existência do cliente e a ausência de outros imóveis são verificadas pelo próprio
+                        # SQLite no mesmo comando (sem consulta prévia e sem janela entre verificar e deletar).
+                        # As FKs com ON DELETE CASCADE (ex: `vistorias_improdutivas.cliente_id`) removem os dados associados.
+                        cursor_interno.execute("""
+                            DELETE FROM clientes
+                            WHERE id = ? AND NOT EXISTS (SELECT 1 FROM imoveis WHERE cliente_id = ?)
+                        """, (cliente_id, cliente_id))
+                        if cursor_interno.rowcount > 0: # Se o cliente foi deletado
+                            contadores['clientes_deletados'] += 1
+                            logging.info(f"      Cliente ID {cliente_id} associado ao imóvel deletado.")
                         else:
-                            logging.warning(f"    Falha ao deletar imóvel ID {imovel_id} associado ao agendamento antigo.")
+                            logging.info(f"      Cliente ID {cliente_id} mantido (ainda possui imóveis) ou já não existia.")
                 else:
-                    # Agendamento não deletado (pode já ter sido deletado em iteração anterior ou erro)
-                    logging.warning(f"  Agendamento ID {agenda_id} não pode ser deletado (ou já foi deletado).")
-
-            except sqlite3.IntegrityError as e: # Captura erros de integridade específicos do SQLite
-                contadores['erros_delecao_agendamento'] += 1
-                logging.error(f"  Erro de integridade ao tentar deletar agendamento ID {agenda_id} ou seus relacionados: {e}")
-                # Não faz rollback aqui para permitir que outras deleções prossigam.
-                # Idealmente, cada "unidade de trabalho" (deleção de um agendamento e seus dependentes)
-                # poderia ser uma transação separada.
+                    logging.warning(f"    Falha ao deletar imóvel ID {imovel_id} associado ao agendamento antigo ID {agenda_id}.")
             except Exception as e_gen: # Captura outros erros genéricos
                 contadores['erros_delecao_agendamento'] += 1
-                logging.error(f"  Erro geral ao processar agendamento ID {agenda_id}: {e_gen}", exc_info=True)
+                logging.error(f"  Erro geral ao processar imóvel/cliente do agendamento ID {agenda_id}: {e_gen}", exc_info=True)
+
+        if contadores['agendamentos_deletados'] == 0:
+            logging.info("Nenhum agendamento antigo encontrado para deletar.")
+            return contadores # Retorna contadores zerados se não houver nada a fazer
+        contadores['vistorias_improdutivas_deletadas'] = qtd_improdutivas
+        logging.info(f"  {contadores['agendamentos_deletados']} agendamento(s) antigo(s) e {qtd_improdutivas} vistoria(s) improdutiva(s) deletado(s).")
         
         conexao.commit() # Confirma todas as deleções bem-sucedidas no banco
         logging.info(f"Limpeza de agendamentos antigos concluída. Resumo: {contadores}")
@@ -149,6 +278,31 @@ def deletar_agendamentos_antigos_e_dados_relacionados(meses_antiguidade: int = 3
     return contadores
 
 
+# --- SQL de `registrar_vistoria_improdutiva` ---
+# Textos fixos em nível de módulo: cada execução envia exatamente o mesmo SQL, então o cache de
+# comandos preparados da conexão (`cached_statements`, ver database.py) evita recompilá-lo.
+# O campo 'pago' é definido como 0 (False) por padrão.
+_SQL_INSERT_IMPRODUTIVA = """
+    INSERT INTO vistorias_improdutivas (
+        agenda_id_original, cliente_id, imovel_id, imobiliaria_id,
+        data_marcacao, data_vistoria_original, horario_vistoria_original,
+        motivo_improdutividade, valor_cobranca, valor_para_vistoriador, pago
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+"""
+# COALESCE(saldo_devedor_total, 0) trata casos onde o saldo pode ser NULL, convertendo para 0 antes de somar.
+_SQL_UPDATE_SALDO = """
+    UPDATE clientes
+    SET saldo_devedor_total = COALESCE(saldo_devedor_total, 0) + ?
+    WHERE id = ?
+"""
+# A condição `tipo NOT IN ('LIVRE', 'FECHADO', 'IMPRODUTIVA')` previne que horários
+# que já não são vistorias ativas (ex: um horário livre ou já fechado) sejam indevidamente alterados.
+_SQL_MARCAR_IMPRODUTIVA = """
+    UPDATE agenda
+    SET tipo = 'IMPRODUTIVA', disponivel = 0
+    WHERE id = ? AND tipo NOT IN ('LIVRE', 'FECHADO', 'IMPRODUTIVA')
+"""
+
 def registrar_vistoria_improdutiva(
     agenda_id_original: int,
     cliente_id: int,
@@ -184,60 +338,41 @@ def registrar_vistoria_improdutiva(
             - bool: True se o registro foi bem-sucedido, False caso contrário.
             - str: Mensagem de status descrevendo o resultado da operação.
     """
-    conexao = None
     try:
-        conexao = conectar_banco()
-        cursor = conexao.cursor()
-        cursor.execute("PRAGMA foreign_keys = ON;") # Ativa chaves estrangeiras
+        # `transacao()` confirma as alterações ao final do bloco (ou as desfaz em caso de exceção)
+        # e devolve a conexão ao pool
+        with transacao() as conexao:
+            cursor = conexao.cursor()
 
-        # Data em que a vistoria está sendo marcada como improdutiva (hoje)
-        data_marcacao_str = dt.date.today().strftime("%Y-%m-%d")
-        
-        # Calcula o valor a ser repassado ao vistoriador (30% do valor da cobrança ao cliente)
-        valor_para_vistoriador_calc = round(valor_cobranca * 0.30, 2)
-        # Logging para depuração do cálculo
-        logging.debug(f"Calculando valor para vistoriador (improdutiva): {valor_cobranca} * 0.30 = {valor_para_vistoriador_calc}")
+            # Data em que a vistoria está sendo marcada como improdutiva (hoje)
+            data_marcacao_str = dt.date.today().strftime("%Y-%m-%d")
 
-        # 1. Insere o registro na tabela `vistorias_improdutivas`
-        # O campo 'pago' é definido como 0 (False) por padrão.
-        cursor.execute("""
-            INSERT INTO vistorias_improdutivas (
+            # Calcula o valor a ser repassado ao vistoriador (30% do valor da cobrança ao cliente)
+            valor_para_vistoriador_calc = round(valor_cobranca * 0.30, 2)
+            # Logging para depuração do cálculo
+            logging.debug(f"Calculando valor para vistoriador (improdutiva): {valor_cobranca} * 0.30 = {valor_para_vistoriador_calc}")
+
+            # 1. Insere o registro na tabela `vistorias_improdutivas`
+            cursor.execute(_SQL_INSERT_IMPRODUTIVA, (
                 agenda_id_original, cliente_id, imovel_id, imobiliaria_id,
-                data_marcacao, data_vistoria_original, horario_vistoria_original,
-                motivo_improdutividade, valor_cobranca, valor_para_vistoriador, pago
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
-        """, (
-            agenda_id_original, cliente_id, imovel_id, imobiliaria_id,
-            data_marcacao_str, data_vistoria_original_str, horario_vistoria_original_str,
-            motivo, valor_cobranca, valor_para_vistoriador_calc # Salva o valor calculado para o vistoriador
-        ))
-        id_improdutiva = cursor.lastrowid # Obtém o ID do registro recém-inserido
+                data_marcacao_str, data_vistoria_original_str, horario_vistoria_original_str,
+                motivo, valor_cobranca, valor_para_vistoriador_calc # Salva o valor calculado para o vistoriador
+            ))
+            id_improdutiva = cursor.lastrowid # Obtém o ID do registro recém-inserido
 
-        # 2. Atualiza o saldo devedor do cliente
-        # COALESCE(saldo_devedor_total, 0) trata casos onde o saldo pode ser NULL, convertendo para 0 antes de somar.
-        cursor.execute("""
-            UPDATE clientes
-            SET saldo_devedor_total = COALESCE(saldo_devedor_total, 0) + ?
-            WHERE id = ?
-        """, (valor_cobranca, cliente_id))
-
-        # 3. Atualiza o status do agendamento original na tabela `agenda`
-        # Define o tipo como 'IMPRODUTIVA', e `disponivel = 0`.
-        # A condição `tipo NOT IN ('LIVRE', 'FECHADO', 'IMPRODUTIVA')` previne que horários
-        # que já não são vistorias ativas (ex: um horário livre ou já fechado) sejam indevidamente alterados.
-        cursor.execute("""
-            UPDATE agenda
-            SET tipo = 'IMPRODUTIVA', disponivel = 0
-            WHERE id = ? AND tipo NOT IN ('LIVRE', 'FECHADO', 'IMPRODUTIVA')
-        """, (agenda_id_original,))
+            # 2. Atualiza o saldo devedor do cliente
+            cursor.execute(_SQL_UPDATE_SALDO, (valor_cobranca, cliente_id))
+
+            # 3. Atualiza o status do agendamento original na tabela `agenda`
+            # Define o tipo como 'IMPRODUTIVA', e `disponivel = 0`.
+            cursor.execute(_SQL_MARCAR_IMPRODUTIVA, (agenda_id_original,))
         
-        if cursor.rowcount == 0: # Se nenhuma linha na `agenda` foi atualizada
-            # Isso pode ocorrer se o horário original já era 'LIVRE', 'FECHADO' ou já 'IMPRODUTIVA'.
-            # A interface de usuário (View/Controller) deveria idealmente prevenir a tentativa de marcar
-            # tais horários como improdutivos, mas um log aqui é útil.
-            logging.warning(f"Agendamento ID {agenda_id_original} não pôde ser marcado como IMPRODUTIVA (status atual pode impedir ou já é IMPRODUTIVA).")
+            if cursor.rowcount == 0: # Se nenhuma linha na `agenda` foi atualizada
+                # Isso pode ocorrer se o horário original já era 'LIVRE', 'FECHADO' ou já 'IMPRODUTIVA'.
+                # A interface de usuário (View/Controller) deveria idealmente prevenir a tentativa de marcar
+                # tais horários como improdutivos, mas um log aqui é útil.
+                logging.warning(f"Agendamento ID {agenda_id_original} não pôde ser marcado como IMPRODUTIVA (status atual pode impedir ou já é IMPRODUTIVA).")
 
-        conexao.commit() # Confirma as alterações no banco
         # Mensagem de sucesso detalhada
         msg = (f"✅ Vistoria ID {agenda_id_original} marcada como improdutiva (ID Improd.: {id_improdutiva}).\n"
                f"Cobrança de R${valor_cobranca:.2f} registrada para cliente ID {cliente_id}.\n"
@@ -247,17 +382,97 @@ def registrar_vistoria_improdutiva(
         return True, msg
     except sqlite3.IntegrityError as ie: # Erro de integridade (ex: FK não encontrada)
         logging.error(f"Erro de integridade ao registrar vistoria improdutiva para agenda ID {agenda_id_original}: {ie}")
-        if conexao:
-            conexao.rollback()
         return False, f"Erro de integridade: {ie}"
     except Exception as e: # Outros erros
         logging.error(f"Erro ao registrar vistoria improdutiva para agenda ID {agenda_id_original}: {e}", exc_info=True)
-        if conexao:
-            conexao.rollback()
         return False, f"Erro ao registrar vistoria improdutiva: {e}"
-    finally:
-        if conexao:
-            conexao.close()
+
+def registrar_vistorias_improdutivas_em_lote(vistorias: List[Dict[str, Any]]) -> Tuple[bool, str]:
+    """
+    Registra várias vistorias improdutivas de uma só vez, em uma única transação.
+
+    Equivale a chamar `registrar_vistoria_improdutiva` para cada item, mas com um número
+    fixo de comandos em vez de três por vistoria:
+    1. Um `executemany` do INSERT em `vistorias_improdutivas`.
+    2. Um UPDATE em `clientes` com `CASE id WHEN ... THEN ...`, somando as cobranças de cada
+       cliente (agrupadas antes em Python).
+    3. Um UPDATE em `agenda` com `WHERE id IN (...)` marcando os horários como 'IMPRODUTIVA'.
+    Listas grandes são divididas em lotes de `_TAMANHO_LOTE_IN` para respeitar o limite
+    de parâmetros por comando do SQLite. Se qualquer comando falhar, nada é registrado.
+
+    Args:
+        vistorias (List[Dict[str, Any]]): Lista de dicionários com as mesmas chaves dos
+            parâmetros de `registrar_vistoria_improdutiva`: 'agenda_id_original', 'cliente_id',
+            'imovel_id', 'imobiliaria_id', 'data_vistoria_original_str',
+            'horario_vistoria_original_str', 'motivo' e 'valor_cobranca'.
+
+    Returns:
+        Tuple[bool, str]: (sucesso, mensagem de status).
+    """
+    if not vistorias:
+        return False, "Nenhuma vistoria improdutiva informada para registro."
+
+    data_marcacao_str = dt.date.today().strftime("%Y-%m-%d")
+    linhas_insert = []
+    saldo_por_cliente: Dict[int, float] = {} # cliente_id -> soma das cobranças do lote
+    ids_agenda = []
+    for v in vistorias:
+        valor_cobranca = v['valor_cobranca']
+        # Valor a ser repassado ao vistoriador (30% do valor da cobrança ao cliente)
+        valor_para_vistoriador_calc = round(valor_cobranca * 0.30, 2)
+        linhas_insert.append((
+            v['agenda_id_original'], v['cliente_id'], v.get('imovel_id'), v.get('imobiliaria_id'),
+            data_marcacao_str, v['data_vistoria_original_str'], v['horario_vistoria_original_str'],
+            v['motivo'], valor_cobranca, valor_para_vistoriador_calc
+        ))
+        saldo_por_cliente[v['cliente_id']] = saldo_por_cliente.get(v['cliente_id'], 0) + valor_cobranca
+        ids_agenda.append(v['agenda_id_original'])
+
+    try:
+        with transacao() as conexao:
+            cursor = conexao.cursor()
+            # 1. Insere todos os registros com um único comando preparado
+            cursor.executemany(_SQL_INSERT_IMPRODUTIVA, linhas_insert)
+
+            # 2. Atualiza o saldo devedor de todos os clientes envolvidos.
+            # Cada cliente usa 3 parâmetros (WHEN ?, THEN ?, IN ?), daí o lote menor.
+            itens_saldo = list(saldo_por_cliente.items())
+            tamanho_lote_saldo = _TAMANHO_LOTE_IN // 3
+            for inicio in range(0, len(itens_saldo), tamanho_lote_saldo):
+                lote = itens_saldo[inicio:inicio + tamanho_lote_saldo]
+                casos = " ".join("WHEN ? THEN ?" for _ in lote)
+                placeholders = ",".join("?" * len(lote))
+                params = [valor for par in lote for valor in par] + [cliente_id for cliente_id, _ in lote]
+                cursor.execute(f"""
+                    UPDATE clientes
+                    SET saldo_devedor_total = COALESCE(saldo_devedor_total, 0) + CASE id {casos} END
+                    WHERE id IN ({placeholders})
+                """, params)
+
+            # 3. Marca os agendamentos originais como 'IMPRODUTIVA' (mesma condição do registro individual)
+            agendamentos_marcados = 0
+            for inicio in range(0, len(ids_agenda), _TAMANHO_LOTE_IN):
+                lote = ids_agenda[inicio:inicio + _TAMANHO_LOTE_IN]
+                placeholders = ",".join("?" * len(lote))
+                cursor.execute(f"""
+                    UPDATE agenda
+                    SET tipo = 'IMPRODUTIVA', disponivel = 0
+                    WHERE id IN ({placeholders}) AND tipo NOT IN ('LIVRE', 'FECHADO', 'IMPRODUTIVA')
+                """, lote)
+                agendamentos_marcados += cursor.rowcount
+
+        if agendamentos_marcados < len(ids_agenda):
+            logging.warning(f"{len(ids_agenda) - agendamentos_marcados} agendamento(s) do lote não puderam ser marcados como IMPRODUTIVA (status atual pode impedir ou já é IMPRODUTIVA).")
+        msg = (f"✅ {len(linhas_insert)} vistoria(s) marcada(s) como improdutiva(s).\n"
+               f"Cobranças registradas para {len(saldo_por_cliente)} cliente(s); saldos atualizados.")
+        logging.info(msg)
+        return True, msg
+    except sqlite3.IntegrityError as ie: # Erro de integridade (ex: FK não encontrada)
+        logging.error(f"Erro de integridade ao registrar lote de vistorias improdutivas: {ie}")
+        return False, f"Erro de integridade: {ie}"
+    except Exception as e: # Outros erros
+        logging.error(f"Erro ao registrar lote de vistorias improdutivas: {e}", exc_info=True)
+        return False, f"Erro ao registrar vistorias improdutivas: {e}"
 
 # --- Funções de Gerenciamento de Horários Fixos dos Vistoriadores ---
 def cadastrar_horarios_fixos_vistoriador(vistoriador_id: int, dias_semana_num_str: List[str], horarios_str_lista: List[str]) -> bool:
@@ -294,38 +509,34 @@ def cadastrar_horarios_fixos_vistoriador(vistoriador_id: int, dias_semana_num_st
         conexao = conectar_banco()
         cursor = conexao.cursor()
 
-        # Itera sobre cada dia da semana fornecido
+        # Valida os dias ('0' a '6') e os horários (HH:MM) uma única vez, fora do produto dias × horários
+        dias_validos = []
         for dia_num_str_atual in dias_semana_num_str:
-            # Valida se o número do dia é um dos permitidos ('0' a '6')
             if dia_num_str_atual not in dias_map_nomes:
                 logging.warning(f"Dia da semana inválido fornecido: '{dia_num_str_atual}'. Ignorando.")
                 continue # Pula para o próximo dia
-
-            # Itera sobre cada horário fornecido para o dia atual
-            for horario_str_atual in horarios_str_lista:
-                try:
-                    # Valida o formato do horário (HH:MM)
-                    dt.datetime.strptime(horario_str_atual, "%H:%M")
-                except ValueError:
-                    logging.warning(f"Formato de horário inválido: '{horario_str_atual}'. Ignorando para o dia {dias_map_nomes.get(dia_num_str_atual, dia_num_str_atual)}.")
-                    continue # Pula para o próximo horário
-
-                # Tenta inserir o horário fixo no banco de dados
-                # A tabela `horarios_fixos` tem uma constraint UNIQUE em (vistoriador_id, dia_semana, horario)
-                # para evitar duplicatas.
-                try:
-                    cursor.execute("INSERT INTO horarios_fixos (vistoriador_id, dia_semana, horario) VALUES (?, ?, ?)",
-                                   (vistoriador_id, dia_num_str_atual, horario_str_atual))
-                    horarios_adicionados_count += 1 # Incrementa se a inserção foi bem-sucedida
-                except sqlite3.IntegrityError:
-                    # Ocorre se o horário fixo já existir (devido à constraint UNIQUE)
-                    logging.info(f"Horário fixo já existente (ou conflito): Vist. ID {vistoriador_id}, Dia {dias_map_nomes.get(dia_num_str_atual, dia_num_str_atual)}, Hora {horario_str_atual}")
-                except Exception as e_inner: # Outro erro durante a inserção
-                    logging.error(f"Erro ao inserir horário fixo ({dias_map_nomes.get(dia_num_str_atual, dia_num_str_atual)}, {horario_str_atual}) para Vist. ID {vistoriador_id}: {e_inner}")
+            dias_validos.append(dia_num_str_atual)
+        horarios_validos = []
+        for horario_str_atual in horarios_str_lista:
+            if not _HHMM_RE.match(horario_str_atual):
+                logging.warning(f"Formato de horário inválido: '{horario_str_atual}'. Ignorando.")
+                continue # Pula para o próximo horário
+            horarios_validos.append(horario_str_atual)
+
+        linhas = [(vistoriador_id, dia, horario) for dia in dias_validos for horario in horarios_validos]
+
+        # Insere todas as combinações em uma única transação, com um único comando preparado.
+        # A tabela `horarios_fixos` tem uma constraint UNIQUE em (vistoriador_id, dia_semana, horario):
+        # com INSERT OR IGNORE, horários já existentes são simplesmente ignorados.
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.executemany("INSERT OR IGNORE INTO horarios_fixos (vistoriador_id, dia_semana, horario) VALUES (?, ?, ?)",
+                           linhas)
+        horarios_adicionados_count = cursor.rowcount # Soma das linhas inseridas (ignoradas não contam)
+        if horarios_adicionados_count < len(linhas):
+            logging.info(f"{len(linhas) - horarios_adicionados_count} horário(s) fixo(s) já existente(s) ignorado(s) para o vistoriador ID {vistoriador_id}.")
         
-        # Se algum horário foi adicionado, commita as alterações
+        conexao.commit() # Encerra a transação aberta com BEGIN IMMEDIATE
         if horarios_adicionados_count > 0:
-            conexao.commit()
             logging.info(f"{horarios_adicionados_count} horários fixos adicionados para o vistoriador ID {vistoriador_id}.")
         else:
             logging.info(f"Nenhum novo horário fixo foi adicionado para o vistoriador ID {vistoriador_id} (podem já existir ou dados inválidos).")
@@ -353,13 +564,10 @@ def remover_horario_fixo_especifico(vistoriador_id: int, dia_semana_num_str: str
     if not vistoriador_id or not dia_semana_num_str or not horario_str:
         logging.warning("Vistoriador ID, dia da semana e horário são obrigatórios para remoção de horário fixo.")
         return False
-    conexao = None
     try:
-        conexao = conectar_banco()
-        cursor = conexao.cursor()
-        cursor.execute("DELETE FROM horarios_fixos WHERE vistoriador_id = ? AND dia_semana = ? AND horario = ?",
-                       (vistoriador_id, dia_semana_num_str, horario_str))
-        conexao.commit()
+        with transacao() as conexao:
+            cursor = conexao.execute("DELETE FROM horarios_fixos WHERE vistoriador_id = ? AND dia_semana = ? AND horario = ?",
+                                     (vistoriador_id, dia_semana_num_str, horario_str))
         if cursor.rowcount > 0: # `rowcount` indica o número de linhas afetadas
             logging.info(f"Horário fixo (Dia: {dia_semana_num_str}, Hora: {horario_str}) removido para o vistoriador ID {vistoriador_id}.")
             return True
@@ -368,10 +576,50 @@ def remover_horario_fixo_especifico(vistoriador_id: int, dia_semana_num_str: str
             return False # Horário não existia ou não pertencia ao vistoriador
     except Exception as e:
         logging.error(f"Erro ao remover horário fixo específico para Vist. ID {vistoriador_id}: {e}", exc_info=True)
-        if conexao: conexao.rollback()
         return False
-    finally:
-        if conexao: conexao.close()
+
+def remover_horarios_fixos_em_lote(vistoriador_id: int, pares_dia_horario: List[Tuple[str, str]]) -> int:
+    """
+    Remove vários horários de trabalho fixos de um vistoriador de uma só vez.
+
+    Versão em lote de `remover_horario_fixo_especifico`: uma única conexão e transação, com
+    `DELETE ... WHERE (dia_semana, horario) IN (VALUES ...)` em vez de um comando por horário.
+    Listas grandes são divididas em lotes para respeitar o limite de parâmetros do SQLite.
+
+    Args:
+        vistoriador_id (int): ID do vistoriador.
+        pares_dia_horario (List[Tuple[str, str]]): Lista de pares (dia da semana '0'-'6', horário "HH:MM").
+
+    Returns:
+        int: Número de horários fixos efetivamente removidos (0 em caso de erro ou entrada inválida).
+    """
+    # Entrada inválida: retorna sem abrir conexão
+    if not vistoriador_id or not pares_dia_horario:
+        logging.warning("Vistoriador ID e ao menos um par (dia da semana, horário) são obrigatórios para remoção de horários fixos.")
+        return 0
+    removidos = 0
+    # Cada par usa 2 parâmetros, mais 1 para o vistoriador_id
+    tamanho_lote = (_TAMANHO_LOTE_IN - 1) // 2
+    try:
+        with transacao() as conexao:
+            for inicio in range(0, len(pares_dia_horario), tamanho_lote):
+                lote = pares_dia_horario[inicio:inicio + tamanho_lote]
+                placeholders = ",".join("(?, ?)" for _ in lote)
+                params = [vistoriador_id] + [valor for par in lote for valor in par]
+                cursor = conexao.execute(f"""
+                    DELETE FROM horarios_fixos
+                    WHERE vistoriador_id = ? AND (dia_semana, horario) IN (VALUES {placeholders})
+                """, params)
+                removidos += cursor.rowcount
+        logging.info(f"{removidos} horário(s) fixo(s) removido(s) para o vistoriador ID {vistoriador_id}.")
+        return removidos
+    except Exception as e:
+        logging.error(f"Erro ao remover horários fixos em lote para Vist. ID {vistoriador_id}: {e}", exc_info=True)
+        return 0
+
+def _linha_horario_fixo(cursor: sqlite3.Cursor, row: tuple) -> Dict[str, str]:
+    """`row_factory` de `listar_horarios_fixos_por_vistoriador`. Função auxiliar interna."""
+    return {'dia_semana': row[0], 'horario': row[1]}
 
 def listar_horarios_fixos_por_vistoriador(vistoriador_id: int) -> List[Dict[str, str]]:
     """
@@ -387,18 +635,20 @@ def listar_horarios_fixos_por_vistoriador(vistoriador_id: int) -> List[Dict[str,
     """
     conexao = None
     try:
+        # Somente leitura: conexão simples do pool, sem `transacao()` (nada a confirmar)
         conexao = conectar_banco()
         cursor = conexao.cursor()
+        # As linhas já são montadas como dicionários pelo próprio cursor (sem lista intermediária de tuplas)
+        cursor.row_factory = _linha_horario_fixo
         # Ordena por dia da semana e depois por horário para uma listagem consistente
         cursor.execute("SELECT dia_semana, horario FROM horarios_fixos WHERE vistoriador_id = ? ORDER BY dia_semana, horario", (vistoriador_id,))
-        fixos_db = cursor.fetchall() # Lista de tuplas
-        # Converte a lista de tuplas em uma lista de dicionários para facilitar o uso
-        return [{'dia_semana': row[0], 'horario': row[1]} for row in fixos_db]
+        return cursor.fetchall()
     except Exception as e:
         logging.error(f"Erro ao listar horários fixos do vistoriador ID {vistoriador_id}: {e}", exc_info=True)
         return [] # Retorna lista vazia em caso de erro
     finally:
-        if conexao: conexao.close()
+        if conexao:
+            conexao.close() # --> Devolve ao pool
 
 def adicionar_entrada_agenda_unica(vistoriador_id: int, data_str_ymd: str, horario_str_hm: str,
                                    tipo: str = 'LIVRE', disponivel: bool = True,
@@ -423,40 +673,71 @@ def adicionar_entrada_agenda_unica(vistoriador_id: int, data_str_ymd: str, horar
     # Validações dos argumentos
     if not all([vistoriador_id, data_str_ymd, horario_str_hm]):
         return False, "Vistoriador ID, data e horário são obrigatórios para adicionar entrada na agenda."
-    try:
-        # Valida o formato da data e do horário
-        dt.datetime.strptime(data_str_ymd, "%Y-%m-%d")
-        dt.datetime.strptime(horario_str_hm, "%H:%M")
-    except ValueError:
+    # Valida o formato da data e do horário
+    if not _data_ymd_valida(data_str_ymd) or not _HHMM_RE.match(horario_str_hm):
         return False, "Formato de data (YYYY-MM-DD) ou horário (HH:MM) inválido."
         
-    conexao = None
     try:
-        conexao = conectar_banco()
-        cursor = conexao.cursor()
-        # Insere a nova entrada na agenda.
-        # A tabela `agenda` tem UNIQUE (vistoriador_id, data, horario).
-        cursor.execute("INSERT INTO agenda (vistoriador_id, data, horario, disponivel, tipo, imovel_id) VALUES (?, ?, ?, ?, ?, ?)",
-                       (vistoriador_id, data_str_ymd, horario_str_hm, 1 if disponivel else 0, tipo, imovel_id))
-        conexao.commit()
+        with transacao() as conexao:
+            # Insere a nova entrada na agenda.
+            # A tabela `agenda` tem UNIQUE (vistoriador_id, data, horario).
+            cursor = conexao.execute("INSERT INTO agenda (vistoriador_id, data, horario, disponivel, tipo, imovel_id) VALUES (?, ?, ?, ?, ?, ?)",
+                                     (vistoriador_id, data_str_ymd, horario_str_hm, 1 if disponivel else 0, tipo, imovel_id))
         id_agenda = cursor.lastrowid # ID da entrada recém-criada
         return True, f"Horário avulso (ID Agenda: {id_agenda}) adicionado para {data_str_ymd} às {horario_str_hm} para o vistoriador ID {vistoriador_id}."
     except sqlite3.IntegrityError: # Ocorre se já existe uma entrada para mesmo vistoriador, data e hora
         return False, f"Este horário ({data_str_ymd} às {horario_str_hm}) já existe na agenda para este vistoriador."
     except Exception as e:
-        if conexao: conexao.rollback()
         logging.error(f"Erro ao adicionar horário avulso na agenda para Vist. ID {vistoriador_id}: {e}", exc_info=True)
         return False, f"Erro ao adicionar horário avulso na agenda: {e}"
-    finally:
-        if conexao: conexao.close()
+
+def adicionar_entradas_agenda_em_lote(entradas: List[Tuple[int, str, str, bool, str, Optional[int]]]) -> Tuple[bool, str]:
+    """
+    Adiciona várias entradas avulsas na tabela `agenda` de uma só vez.
+
+    Versão em lote de `adicionar_entrada_agenda_unica`: uma única conexão, uma única transação
+    e um único comando preparado (`executemany`), em vez de abrir/fechar uma conexão por horário.
+    Entradas que já existem (UNIQUE (vistoriador_id, data, horario)) são ignoradas.
+
+    Args:
+        entradas (List[Tuple[int, str, str, bool, str, Optional[int]]]): Lista de tuplas
+            (vistoriador_id, data "YYYY-MM-DD", horário "HH:MM", disponivel, tipo, imovel_id).
+
+    Returns:
+        Tuple[bool, str]: (sucesso, mensagem de status com a quantidade de entradas adicionadas).
+    """
+    if not entradas:
+        return False, "Nenhuma entrada informada para adicionar na agenda."
+    linhas = []
+    for vistoriador_id, data_str_ymd, horario_str_hm, disponivel, tipo, imovel_id in entradas:
+        if not all([vistoriador_id, data_str_ymd, horario_str_hm]):
+            return False, "Vistoriador ID, data e horário são obrigatórios para adicionar entrada na agenda."
+        # Valida o formato da data e do horário
+        if not _data_ymd_valida(data_str_ymd) or not _HHMM_RE.match(horario_str_hm):
+            return False, f"Formato de data (YYYY-MM-DD) ou horário (HH:MM) inválido: {data_str_ymd} {horario_str_hm}."
+        linhas.append((vistoriador_id, data_str_ymd, horario_str_hm, 1 if disponivel else 0, tipo, imovel_id))
+
+    try:
+        with transacao() as conexao:
+            # ON CONFLICT ... DO NOTHING ignora apenas o horário já existente (UNIQUE); ao contrário de
+            # INSERT OR IGNORE, violações de CHECK/NOT NULL (ex: tipo inválido) geram erro e desfazem o lote.
+            cursor = conexao.executemany("INSERT INTO agenda (vistoriador_id, data, horario, disponivel, tipo, imovel_id) VALUES (?, ?, ?, ?, ?, ?) "
+                                         "ON CONFLICT (vistoriador_id, data, horario) DO NOTHING",
+                                         linhas)
+        adicionadas = cursor.rowcount # Entradas já existentes não contam
+        logging.info(f"{adicionadas} horário(s) avulso(s) adicionado(s) na agenda ({len(linhas) - adicionadas} já existente(s)).")
+        return True, f"{adicionadas} horário(s) avulso(s) adicionado(s) na agenda ({len(linhas) - adicionadas} já existente(s) ignorado(s))."
+    except Exception as e:
+        logging.error(f"Erro ao adicionar horários avulsos em lote na agenda: {e}", exc_info=True)
+        return False, f"Erro ao adicionar horários avulsos na agenda: {e}"
 
 def gerar_agenda_baseada_em_horarios_fixos(semanas_a_frente: int = 4) -> bool:
     """
     Popula a tabela `agenda` com horários disponíveis baseados nos `horarios_fixos`
     dos vistoriadores para um número especificado de semanas à frente.
 
-    Verifica se já existe uma entrada para o vistoriador, data e horário antes de inserir,
-    usando "INSERT OR IGNORE" para evitar duplicatas e erros.
+    As entradas são geradas por um único INSERT ... SELECT (CTE recursiva de datas + JOIN
+    com `horarios_fixos`), usando "INSERT OR IGNORE" para evitar duplicatas e erros.
 
     Args:
         semanas_a_frente (int): Número de semanas futuras para as quais a agenda será gerada. Padrão 4.
@@ -465,68 +746,155 @@ def gerar_agenda_baseada_em_horarios_fixos(semanas_a_frente: int = 4) -> bool:
         bool: True se o processo foi concluído (mesmo que nenhuma nova entrada seja criada),
               False se ocorreu um erro grave.
     """
-    conexao = None
+    # Período: de hoje até (semanas_a_frente * 7 - 1) dias à frente, inclusive
+    hoje = dt.date.today() # Data atual
+    data_final = hoje + dt.timedelta(days=semanas_a_frente * 7 - 1)
+    if data_final < hoje:
+        logging.info("Período de geração da agenda vazio; nada a fazer.")
+        return True
+
     try:
-        conexao = conectar_banco()
-        cursor = conexao.cursor()
-        # Busca IDs de todos os vistoriadores que possuem horários fixos cadastrados
-        cursor.execute("SELECT DISTINCT vistoriador_id FROM horarios_fixos")
-        vistoriadores_ids = [row[0] for row in cursor.fetchall()]
-
-        if not vistoriadores_ids:
-            logging.info("Nenhum vistoriador com horários fixos cadastrados para gerar agenda.")
-            return True # Considera sucesso, pois não há o que fazer
-
-        hoje = dt.date.today() # Data atual
-        entradas_criadas = 0 # Contador de novas entradas na agenda
-
-        # Itera sobre cada vistoriador que tem horários fixos
-        for vist_id_atual in vistoriadores_ids:
-            # Busca os horários fixos específicos deste vistoriador
-            cursor.execute("SELECT dia_semana, horario FROM horarios_fixos WHERE vistoriador_id = ?", (vist_id_atual,))
-            horarios_fixos_do_vistoriador = cursor.fetchall()
-
-            # Itera sobre os próximos N dias (semanas_a_frente * 7)
-            for i in range(semanas_a_frente * 7):
-                data_iteracao = hoje + dt.timedelta(days=i) # Calcula a data futura
-                # Converte o dia da semana da data_iteracao para o formato numérico string ('0'-'6')
-                # Usando isoweekday(): 1 (Segunda) a 7 (Domingo). Ajusta para 0 (Domingo) a 6 (Sábado)
-                # se a convenção de `horarios_fixos.dia_semana` for 0=Dom, 1=Seg, ...
-                # Se `horarios_fixos.dia_semana` é 0=Seg, 1=Ter, ..., 6=Dom, então:
-                # dia_semana_sqlite_num_str = str(data_iteracao.weekday()) # weekday(): 0 (Segunda) a 6 (Domingo)
-                # Assumindo que a convenção no DB para dia_semana é:
-                # 0=Dom, 1=Seg, ..., 6=Sab. Python: date.weekday() é 0=Seg..6=Dom. date.isoweekday() é 1=Seg..7=Dom.
-                # Se `dia_semana` na DB é 0-6 (Seg-Dom), usamos `data_iteracao.weekday()`
-                # Se `dia_semana` na DB é 0-6 (Dom-Sab), usamos `(data_iteracao.isoweekday() % 7)`
-                dia_semana_iteracao_num_str = str(data_iteracao.isoweekday() % 7) # Converte para 0 (Domingo) a 6 (Sábado)
-
-                # Compara com os horários fixos do vistoriador
-                for dia_fixo_db_num_str, horario_fixo_str_db in horarios_fixos_do_vistoriador:
-                    if dia_fixo_db_num_str == dia_semana_iteracao_num_str: # Se o dia da semana bate
-                        data_formatada_db = data_iteracao.strftime("%Y-%m-%d") # Formato YYYY-MM-DD
-                        try:
-                            # Tenta inserir na agenda. "INSERT OR IGNORE" previne erro se a entrada já existir
-                            # (devido à constraint UNIQUE na agenda).
-                            cursor.execute("""
-                                INSERT OR IGNORE INTO agenda 
-                                (vistoriador_id, data, horario, disponivel, imovel_id, tipo) 
-                                VALUES (?, ?, ?, 1, NULL, 'LIVRE')
-                            """, (vist_id_atual, data_formatada_db, horario_fixo_str_db))
-                            if cursor.rowcount > 0: # Se uma nova linha foi inserida
-                                entradas_criadas +=1
-                        except Exception as e_inner: # Erro específico na inserção (improvável com OR IGNORE, mas por segurança)
-                            logging.error(f"Erro ao tentar inserir na agenda para vist. {vist_id_atual} em {data_formatada_db} {horario_fixo_str_db}: {e_inner}")
-        
+        # Todas as entradas são inseridas numa única transação (um único commit ao final),
+        # desfeita por inteiro em caso de erro.
+        with transacao() as conexao:
+            cursor = conexao.cursor()
+            # BEGIN IMMEDIATE reserva a escrita já no início: o comando abaixo lê `horarios_fixos` e
+            # depois escreve na agenda, e uma transação adiada (padrão) poderia falhar com SQLITE_BUSY
+            # ao passar de leitura para escrita se outro processo gravasse nesse intervalo.
+            cursor.execute("BEGIN IMMEDIATE")
+
+            # Um único comando gera todas as entradas: a CTE recursiva produz as datas do período
+            # e o JOIN com `horarios_fixos` casa cada data com os horários do mesmo dia da semana.
+            # O dia da semana de cada data é calculado uma única vez, na própria CTE (tabela de consulta
+            # data -> dia), e não a cada par (data, horário fixo) comparado no JOIN.
+            # strftime('%w') retorna '0' (Domingo) a '6' (Sábado), a mesma convenção de `horarios_fixos.dia_semana`.
+            # "INSERT OR IGNORE" previne erro se a entrada já existir (devido à constraint UNIQUE na agenda).
+            # O comando começa por INSERT (CTE dentro do SELECT) para que o módulo sqlite3 o trate como DML:
+            # transação implícita e `cursor.rowcount` preenchido.
+            cursor.execute("""
+                INSERT OR IGNORE INTO agenda
+                (vistoriador_id, data, horario, disponivel, imovel_id, tipo)
+                WITH RECURSIVE datas(d) AS (
+                    SELECT ?
+                    UNION ALL
+                    SELECT date(d, '+1 day') FROM datas WHERE d < ?
+                ),
+                dias(d, dow) AS MATERIALIZED (
+                    SELECT d, strftime('%w', d) FROM datas
+                )
+                SELECT hf.vistoriador_id, dias.d, hf.horario, 1, NULL, 'LIVRE'
+                FROM horarios_fixos hf
+                JOIN dias ON hf.dia_semana = dias.dow
+            """, (hoje.strftime("%Y-%m-%d"), data_final.strftime("%Y-%m-%d")))
+            entradas_criadas = cursor.rowcount # Número de novas entradas na agenda
+        # Neste ponto a transação já foi confirmada por `transacao()`
+
         if entradas_criadas > 0:
-            conexao.commit() # Salva as novas entradas criadas
             logging.info(f"Agenda gerada/atualizada com {entradas_criadas} novas entradas.")
         else:
             logging.info("Nenhuma nova entrada necessária na agenda (pode já estar atualizada ou sem horários fixos aplicáveis no período).")
         return True # Processo concluído
     except Exception as e:
         logging.error(f"Erro geral ao gerar agenda baseada em horários fixos: {e}", exc_info=True)
-        if conexao: conexao.rollback()
         return False # Indica falha
+
+def _montar_sql_listar_agenda(chave_status: int, tem_vistoriador: bool, tem_inicio: bool, tem_fim: bool) -> str:
+    """
+    Monta o texto SQL completo da listagem da agenda para uma combinação de filtros.
+    Usada apenas na importação do módulo para preencher `_SQL_LISTAR_AGENDA`.
+    """
+    # Query base. Se só horários livres foram pedidos, usa a variante sem os JOINs de imóvel/cliente/imobiliária.
+    if chave_status == _CHAVE_APENAS_LIVRES:
+        query = _SQL_LISTAR_AGENDA_BASE_APENAS_LIVRES
+    else:
+        query = _SQL_LISTAR_AGENDA_BASE
+    # Os parâmetros são ligados na mesma ordem: vistoriador, data de início, data de fim
+    if tem_vistoriador:
+        query += " AND a.vistoriador_id = ?"
+    if tem_inicio:
+        query += " AND a.data >= ?"
+    if tem_fim:
+        query += " AND a.data <= ?"
+    # Filtro de status/tipo do horário
+    query += _FILTROS_STATUS_AGENDA[chave_status]
+    # Ordenação dos resultados
+    query += " ORDER BY a.data ASC, a.horario ASC, u.nome ASC"
+    return query
+
+
+# Todas as combinações de filtros (16 de status x vistoriador x início x fim) têm o texto SQL
+# montado uma única vez, na importação: cada chamada apenas consulta a tabela e liga os parâmetros.
+# Chave: (chave de status empacotada, filtra por vistoriador, tem data de início, tem data de fim)
+_SQL_LISTAR_AGENDA: Dict[Tuple[int, bool, bool, bool], str] = {
+    (chave_status, *presencas): _montar_sql_listar_agenda(chave_status, *presencas)
+    for chave_status in _FILTROS_STATUS_AGENDA
+    for presencas in itertools.product((False, True), repeat=3)
+}
+
+def _montar_query_listar_agenda(
+    vistoriador_id: Optional[int],
+    data_inicio: Optional[str],
+    data_fim: Optional[str],
+    apenas_disponiveis: Optional[bool],
+    apenas_agendados: Optional[bool],
+    incluir_fechados: bool,
+    incluir_improdutivas: bool
+) -> Tuple[str, tuple]:
+    """
+    Obtém a consulta SQL (pré-montada em `_SQL_LISTAR_AGENDA`) e os parâmetros usados por
+    `listar_horarios_agenda` e `iter_horarios_agenda`. Os argumentos têm o mesmo significado
+    que nessas funções.
+
+    Returns:
+        Tuple[str, tuple]: A consulta SQL e a tupla de parâmetros correspondente.
+    """
+    chave_status = _chave_filtro_status_agenda(
+        apenas_agendados, apenas_disponiveis, incluir_fechados, incluir_improdutivas)
+    params = [] # Lista para armazenar os parâmetros da query
+
+    # Filtro por ID do vistoriador, se fornecido
+    if vistoriador_id is not None:
+        params.append(vistoriador_id)
+
+    # Lógica para filtro de datas:
+    # Se data_inicio e data_fim não são fornecidos, e estamos buscando disponíveis ou agendados,
+    # por padrão, filtramos por datas a partir de hoje.
+    if data_inicio is None and data_fim is None:
+        if apenas_disponiveis or apenas_agendados:
+            data_inicio = dt.date.today().strftime("%Y-%m-%d") # Filtra para hoje ou datas futuras
+    if data_inicio:
+        params.append(data_inicio)
+    if data_fim:
+        params.append(data_fim)
+
+    query = _SQL_LISTAR_AGENDA[(chave_status, vistoriador_id is not None, bool(data_inicio), bool(data_fim))]
+    return query, tuple(params)
+
+# Cache de resultados de `listar_horarios_agenda`.
+# Chave: (query SQL, parâmetros) -- a data de hoje já está nos parâmetros quando o filtro padrão a usa.
+# Valor: (instante de armazenamento, versão dos dados, tupla imutável de itens)
+# Uma entrada é válida enquanto nenhum commit ocorreu desde o seu preenchimento (ver
+# `database.obter_versao_dados`) e dentro do TTL, que limita alterações feitas por outros processos.
+TTL_CACHE_LISTAGEM_AGENDA_SEG = 30.0
+_MAX_ENTRADAS_CACHE_LISTAGEM_AGENDA = 256
+_cache_listagem_agenda: "OrderedDict[Tuple[str, tuple], Tuple[float, int, Tuple[AgendaRow, ...]]]" = OrderedDict()
+_trava_cache_listagem_agenda = threading.Lock()
+
+def _iterar_linhas_agenda(query: str, params: tuple) -> Iterator[AgendaRow]:
+    """
+    Executa a consulta da agenda e produz os itens um a um, lendo as linhas
+    diretamente do cursor (sem `fetchall()`). A conexão permanece aberta até o
+    fim da iteração (ou até o gerador ser fechado). Erros são propagados.
+    """
+    conexao = None
+    try:
+        conexao = conectar_banco()
+        cursor = conexao.cursor()
+        cursor.execute(query, params) # Executa a query com os parâmetros
+        # Lê uma linha por vez do SQLite. A ordem das colunas do SELECT base coincide com a ordem
+        # dos campos de `AgendaRow`, e 'disponivel' já vem normalizado pelo SQL (`a.disponivel = 1`),
+        # então cada tupla é passada diretamente ao construtor, sem conversões em Python.
+        yield from itertools.starmap(AgendaRow, cursor)
     finally:
         if conexao: conexao.close()
 
@@ -538,7 +906,7 @@ def listar_horarios_agenda(
     apenas_agendados: Optional[bool] = None,   # True para listar apenas horários com vistorias (ENTRADA, SAIDA, CONFERENCIA)
     incluir_fechados: bool = False,         # True para incluir horários com tipo 'FECHADO'
     incluir_improdutivas: bool = False      # True para incluir horários com tipo 'IMPRODUTIVA'
-) -> List[Dict[str, Any]]:
+) -> List[AgendaRow]:
     """
     Lista horários da agenda com base em múltiplos filtros.
 
@@ -547,6 +915,9 @@ def listar_horarios_agenda(
     Junta dados das tabelas agenda, usuarios (vistoriador), imoveis, clientes (do imóvel) e
     imobiliarias (do imóvel) para fornecer informações detalhadas.
 
+    Os resultados ficam em cache (`_cache_listagem_agenda`) por consulta e parâmetros, e são
+    descartados assim que qualquer alteração é confirmada no banco (commit) ou após o TTL.
+
     Args:
         vistoriador_id (Optional[int]): ID do vistoriador para filtrar. Se None, lista para todos.
         data_inicio (Optional[str]): Data de início do período (formato "YYYY-MM-DD").
@@ -557,105 +928,120 @@ def listar_horarios_agenda(
         incluir_improdutivas (bool): Inclui vistorias marcadas como 'IMPRODUTIVA'.
 
     Returns:
-        List[Dict[str, Any]]: Uma lista de dicionários, cada um representando um item da agenda
-                               com detalhes do vistoriador, imóvel, cliente e imobiliária.
+        List[AgendaRow]: Uma lista de itens da agenda (ver `models.dto.AgendaRow`), com detalhes
+                         do vistoriador, imóvel, cliente e imobiliária. Os itens aceitam
+                         leitura por atributo e também no estilo dicionário (`item['data']`).
     """
-    # Query base selecionando todos os campos necessários e fazendo os JOINs
-    query = """
-        SELECT a.id, a.data, a.horario, a.disponivel, a.tipo, a.imovel_id,
-               u.nome as nome_vistoriador, a.vistoriador_id,
-               i.cod_imovel, i.endereco as endereco_imovel, i.cep as cep_imovel,
-               i.referencia as referencia_imovel, i.tamanho as tamanho_imovel, i.mobiliado as mobiliado_imovel,
-               c.nome as nome_cliente, c.id as cliente_id, c.email as email_cliente,
-               imob.nome as nome_imobiliaria, imob.id as imobiliaria_id_imovel
-        FROM agenda a
-        JOIN usuarios u ON a.vistoriador_id = u.id /* Informações do vistoriador */
-        LEFT JOIN imoveis i ON a.imovel_id = i.id /* Informações do imóvel, se houver */
-        LEFT JOIN clientes c ON i.cliente_id = c.id /* Informações do cliente do imóvel, se houver */
-        LEFT JOIN imobiliarias imob ON i.imobiliaria_id = imob.id /* Informações da imobiliária do imóvel, se houver */
-        WHERE 1=1 /* Condição base para facilitar a adição de ANDs */
+    query, params = _montar_query_listar_agenda(
+        vistoriador_id, data_inicio, data_fim, apenas_disponiveis, apenas_agendados,
+        incluir_fechados, incluir_improdutivas)
+    chave_cache = (query, params)
+    # A versão é lida antes da consulta: se um commit ocorrer durante a leitura,
+    # o resultado armazenado já nasce desatualizado e será descartado no próximo acesso.
+    versao = obter_versao_dados()
+    with _trava_cache_listagem_agenda:
+        entrada = _cache_listagem_agenda.get(chave_cache)
+        if entrada is not None:
+            instante, versao_entrada, itens = entrada
+            if versao_entrada == versao and time.monotonic() - instante < TTL_CACHE_LISTAGEM_AGENDA_SEG:
+                _cache_listagem_agenda.move_to_end(chave_cache)
+                return list(itens) # Nova lista: o chamador pode alterá-la sem afetar o cache
+            del _cache_listagem_agenda[chave_cache] # Entrada obsoleta
+    try:
+        # Materializa a versão em fluxo (`iter_horarios_agenda`) em uma tupla
+        itens = tuple(_iterar_linhas_agenda(query, params))
+    except Exception as e:
+        logging.error(f"Erro ao listar horários da agenda: {e}", exc_info=True)
+        return []
+    # Armazena o resultado (itens `AgendaRow` são imutáveis), descartando a entrada menos usada se o limite for atingido
+    with _trava_cache_listagem_agenda:
+        _cache_listagem_agenda[chave_cache] = (time.monotonic(), versao, itens)
+        _cache_listagem_agenda.move_to_end(chave_cache)
+        if len(_cache_listagem_agenda) > _MAX_ENTRADAS_CACHE_LISTAGEM_AGENDA:
+            _cache_listagem_agenda.popitem(last=False)
+    return list(itens)
+
+def iter_horarios_agenda(
+    vistoriador_id: Optional[int] = None,
+    data_inicio: Optional[str] = None, # Formato YYYY-MM-DD ou DD/MM/YYYY (helper deve normalizar)
+    data_fim: Optional[str] = None,    # Formato YYYY-MM-DD ou DD/MM/YYYY (helper deve normalizar)
+    apenas_disponiveis: Optional[bool] = None, # True para listar apenas horários com status 'LIVRE' e disponivel=1
+    apenas_agendados: Optional[bool] = None,   # True para listar apenas horários com vistorias (ENTRADA, SAIDA, CONFERENCIA)
+    incluir_fechados: bool = False,         # True para incluir horários com tipo 'FECHADO'
+    incluir_improdutivas: bool = False      # True para incluir horários com tipo 'IMPRODUTIVA'
+) -> Iterator[AgendaRow]:
     """
-    params = [] # Lista para armazenar os parâmetros da query
+    Versão em fluxo de `listar_horarios_agenda`: mesmos filtros e mesmo formato
+    de item, mas os itens são produzidos sob demanda, um por linha lida do cursor.
 
-    # Adiciona filtro por ID do vistoriador, se fornecido
-    if vistoriador_id is not None:
-        query += " AND a.vistoriador_id = ?"
-        params.append(vistoriador_id)
+    Útil quando o chamador consome apenas parte do resultado (ex: paginação),
+    evitando montar todos os dicionários de uma vez. Em caso de erro, o erro é
+    registrado no log e a iteração termina.
 
-    # Lógica para filtro de datas:
-    # Se data_inicio e data_fim não são fornecidos, e estamos buscando disponíveis ou agendados,
-    # por padrão, filtramos por datas a partir de hoje.
-    if data_inicio is None and data_fim is None:
-        if apenas_disponiveis or apenas_agendados:
-            data_hoje_str = dt.date.today().strftime("%Y-%m-%d")
-            query += " AND a.data >= ?" # Filtra para hoje ou datas futuras
-            params.append(data_hoje_str)
-    else: # Se datas específicas são fornecidas
-        if data_inicio:
-            query += " AND a.data >= ?"
-            params.append(data_inicio)
-        if data_fim:
-            query += " AND a.data <= ?"
-            params.append(data_fim)
-
-    # Constrói as condições de status/tipo do horário
-    status_conditions = []
-    if apenas_disponiveis:
-        status_conditions.append(" (a.disponivel = 1 AND a.tipo = 'LIVRE') ")
-    if apenas_agendados: # Vistorias ativas
-        status_conditions.append(" (a.disponivel = 0 AND a.tipo IN ('ENTRADA', 'SAIDA', 'CONFERENCIA')) ")
-    if incluir_fechados:
-        status_conditions.append(" (a.tipo = 'FECHADO') ")
-    if incluir_improdutivas:
-        status_conditions.append(" (a.tipo = 'IMPRODUTIVA') ")
-
-    # Adiciona as condições de status à query principal se alguma foi definida
-    if status_conditions:
-        query += " AND (" + " OR ".join(status_conditions) + ")"
-    else: 
-        # Comportamento padrão se nenhum filtro de status específico for marcado:
-        # Se NÃO estamos buscando `apenas_disponiveis` (ou seja, `apenas_disponiveis` é False ou None),
-        # por padrão, não mostramos os horários 'LIVRE', a menos que outro filtro os inclua.
-        # Isso evita listar todos os horários livres futuros por default quando nenhum filtro é ativo.
-        if not apenas_disponiveis : 
-             query += " AND a.tipo != 'LIVRE' "
-
-
-    # Ordenação dos resultados
-    query += " ORDER BY a.data ASC, a.horario ASC, u.nome ASC"
-    
-    conexao = None
+    Yields:
+        AgendaRow: Um item da agenda, no mesmo formato de `listar_horarios_agenda`.
+    """
+    query, params = _montar_query_listar_agenda(
+        vistoriador_id, data_inicio, data_fim, apenas_disponiveis, apenas_agendados,
+        incluir_fechados, incluir_improdutivas)
     try:
-        conexao = conectar_banco()
-        cursor = conexao.cursor()
-        cursor.execute(query, tuple(params)) # Executa a query com os parâmetros
-        horarios_db = cursor.fetchall() # Lista de tuplas
-        colunas = [desc[0] for desc in cursor.description] # Nomes das colunas
-        
-        # Converte a lista de tuplas em uma lista de dicionários
-        lista_horarios = []
-        for row_tuple in horarios_db:
-            dict_row = dict(zip(colunas, row_tuple)) # Mapeia nome da coluna para valor
-            # Monta o dicionário final com chaves mais amigáveis/consistentes
-            lista_horarios.append({
-                'id_agenda': dict_row['id'], 'data': dict_row['data'], 'horario': dict_row['horario'],
-                'disponivel': bool(dict_row['disponivel']), 'tipo_vistoria': dict_row['tipo'], # 'tipo' da agenda é o tipo da vistoria se agendado
-                'imovel_id': dict_row['imovel_id'],
-                'nome_vistoriador': dict_row['nome_vistoriador'], 'vistoriador_id': dict_row['vistoriador_id'],
-                'cod_imovel': dict_row.get('cod_imovel'), 'endereco_imovel': dict_row.get('endereco_imovel'),
-                'cep': dict_row.get('cep_imovel'), 'referencia': dict_row.get('referencia_imovel'),
-                'tamanho': dict_row.get('tamanho_imovel'), 'mobiliado': dict_row.get('mobiliado_imovel'),
-                'nome_cliente': dict_row.get('nome_cliente'), 'cliente_id': dict_row.get('cliente_id'),
-                'email_cliente': dict_row.get('email_cliente'),
-                'nome_imobiliaria': dict_row.get('nome_imobiliaria'),
-                'imobiliaria_id_imovel': dict_row.get('imobiliaria_id_imovel')
-            })
-        return lista_horarios
+        yield from _iterar_linhas_agenda(query, params)
     except Exception as e:
-        logging.error(f"Erro ao listar horários da agenda: {e}", exc_info=True)
-        return []
-    finally:
-        if conexao: conexao.close()
+        logging.error(f"Erro ao iterar horários da agenda: {e}", exc_info=True)
+
+# --- SQL pré-montado para agendamento, cancelamento, fechamento e reabertura de horários ---
+# Textos constantes: o cache de comandos das conexões (`database.TAMANHO_CACHE_COMANDOS`)
+# reaproveita o comando já compilado a cada chamada.
+# Slot principal (se LIVRE) e o candidato a slot secundário (ver `agendar_vistoria_em_horario`)
+_SQL_AGENDAR_SELECIONAR_PRINCIPAL = """
+    SELECT a.id, (
+        SELECT s.id FROM agenda s
+        WHERE s.vistoriador_id = a.vistoriador_id AND s.data = a.data AND s.horario > a.horario
+          AND s.periodo = a.periodo AND s.disponivel = 1 AND s.tipo = 'LIVRE'
+        ORDER BY s.horario ASC LIMIT 1
+    )
+    FROM agenda a
+    WHERE a.id = ? AND a.disponivel = 1 AND a.tipo = 'LIVRE'
+"""
+# Reserva/liberação de slots por lista de IDs; `{placeholders}` recebe um "?" por ID
+_SQL_RESERVAR_SLOTS = "UPDATE agenda SET disponivel = 0, imovel_id = ?, tipo = ? WHERE id IN ({placeholders})"
+# Agendamento ativo a ser cancelado, com o código do imóvel
+_SQL_CANCELAR_SELECIONAR_AGENDAMENTO = """
+    SELECT a.imovel_id, a.data, a.horario, a.tipo, a.vistoriador_id, i.cod_imovel, a.periodo
+    FROM agenda a
+    LEFT JOIN imoveis i ON a.imovel_id = i.id
+    WHERE a.id = ? AND a.disponivel = 0 AND a.tipo IN ('ENTRADA', 'SAIDA', 'CONFERENCIA')
+"""
+# Vizinhos (anterior e posterior) do slot principal no mesmo período (ver `cancelar_agendamento_vistoria`)
+_SQL_CANCELAR_BUSCAR_VIZINHOS = """
+    SELECT id FROM (
+        SELECT id, periodo FROM agenda
+        WHERE vistoriador_id = ? AND data = ? AND horario < ? AND imovel_id = ? AND tipo = ? AND disponivel = 0
+        ORDER BY horario DESC LIMIT 1
+    )
+    WHERE periodo = ?
+    UNION ALL
+    SELECT id FROM (
+        SELECT id, periodo FROM agenda
+        WHERE vistoriador_id = ? AND data = ? AND horario > ? AND imovel_id = ? AND tipo = ? AND disponivel = 0
+        ORDER BY horario ASC LIMIT 1
+    )
+    WHERE periodo = ?
+"""
+_SQL_LIBERAR_SLOTS = "UPDATE agenda SET disponivel = 1, imovel_id = NULL, tipo = 'LIVRE' WHERE id IN ({placeholders})"
+# Fechamento/reabertura de horários: verificação de estado e alteração em um único comando
+_SQL_FECHAR_HORARIO = """
+    UPDATE agenda SET disponivel = 0, tipo = 'FECHADO', imovel_id = NULL
+    WHERE id = ? AND vistoriador_id = ? AND disponivel = 1 AND tipo = 'LIVRE'
+    RETURNING id
+"""
+_SQL_INSERIR_MOTIVO_FECHAMENTO = "INSERT INTO horarios_fechados (agenda_id, motivo) VALUES (?, ?)"
+_SQL_GARANTIR_HORARIO_FECHADO = "UPDATE agenda SET disponivel = 0, tipo = 'FECHADO', imovel_id = NULL WHERE id = ? AND tipo != 'FECHADO'"
+_SQL_REABRIR_HORARIO = """
+    UPDATE agenda SET disponivel = 1, tipo = 'LIVRE'
+    WHERE id = ? AND vistoriador_id = ? AND tipo = 'FECHADO'
+    RETURNING id
+"""
 
 def agendar_vistoria_em_horario(
     id_agenda: int, # ID do slot de horário na tabela 'agenda' a ser usado
@@ -693,15 +1079,22 @@ def agendar_vistoria_em_horario(
     try:
         conexao = conectar_banco()
         cursor = conexao.cursor()
-        cursor.execute("PRAGMA foreign_keys = ON;") # Ativa FKs
-
-        # 1. Verifica se o horário principal (id_agenda) está disponível e é 'LIVRE'
-        cursor.execute("SELECT id, vistoriador_id, data, horario FROM agenda WHERE id = ? AND disponivel = 1 AND tipo = 'LIVRE'", (id_agenda,))
+        # A transação começa com o bloqueio de escrita já adquirido (BEGIN IMMEDIATE): entre a verificação
+        # abaixo e o UPDATE final nenhuma outra conexão pode ocupar os mesmos slots (dois agendamentos
+        # simultâneos não conseguem ambos ver o horário como 'LIVRE'). Nos retornos antecipados,
+        # a transação é desfeita ao devolver a conexão ao pool.
+        cursor.execute("BEGIN IMMEDIATE")
+
+        # 1. Verifica se o horário principal (id_agenda) está disponível e é 'LIVRE'.
+        #    Na mesma consulta, a subconsulta escolhe o candidato a slot secundário: o primeiro horário
+        #    'LIVRE' do mesmo vistoriador, no mesmo dia, posterior ao principal e no mesmo período
+        #    (manhã/tarde; coluna gerada `periodo`). Usado apenas se forem necessários dois horários.
+        cursor.execute(_SQL_AGENDAR_SELECIONAR_PRINCIPAL, (id_agenda,))
         horario_principal_db = cursor.fetchone()
         if not horario_principal_db:
             return False, "Horário principal selecionado não está disponível ou não é do tipo 'LIVRE'."
         
-        id_agenda_principal, vist_id, data_vist_str, horario_vist_principal_str = horario_principal_db
+        id_agenda_principal, id_slot_secundario_candidato = horario_principal_db
 
         # 2. Verifica se são necessários dois horários para esta vistoria/imóvel
         necessita_dois_slots = regras_necessita_dois_horarios(imovel_id, tipo_vistoria_agendada)
@@ -711,27 +1104,8 @@ def agendar_vistoria_em_horario(
 
         # 3. Se dois slots são necessários E não estamos forçando agendamento único:
         if necessita_dois_slots and not ignorar_regras_horario_duplo:
-            # Converte o horário principal para objeto datetime para facilitar a comparação de período (manhã/tarde)
-            horario_principal_dt_obj = dt.datetime.strptime(horario_vist_principal_str, "%H:%M")
-            # Determina se o horário principal é de manhã (< 12h) ou tarde (>= 12h)
-            periodo_principal = 'manha' if horario_principal_dt_obj.hour < 12 else 'tarde'
-
-            # Busca por um slot secundário disponível para o mesmo vistoriador, no mesmo dia,
-            # em horário posterior ao principal, e que seja 'LIVRE'.
-            cursor.execute("""
-                SELECT id, horario FROM agenda 
-                WHERE vistoriador_id = ? AND data = ? AND horario > ? AND disponivel = 1 AND tipo = 'LIVRE' 
-                ORDER BY horario ASC
-            """, (vist_id, data_vist_str, horario_vist_principal_str))
-            possiveis_slots_secundarios = cursor.fetchall()
-
-            # Itera sobre os possíveis slots secundários para encontrar um no mesmo período (manhã/tarde)
-            for id_sec, horario_sec_str_db in possiveis_slots_secundarios:
-                horario_secundario_dt_obj = dt.datetime.strptime(horario_sec_str_db, "%H:%M")
-                periodo_secundario = 'manha' if horario_secundario_dt_obj.hour < 12 else 'tarde'
-                if periodo_secundario == periodo_principal: # Se encontrou um slot no mesmo período
-                    id_agenda_secundario_encontrado = id_sec
-                    break # Para de procurar, já encontrou o primeiro adequado
+            # O slot secundário já foi escolhido pela subconsulta do passo 1
+            id_agenda_secundario_encontrado = id_slot_secundario_candidato
             
             if not id_agenda_secundario_encontrado:
                 # Se necessita de dois slots mas não encontrou um segundo adequado
@@ -744,10 +1118,10 @@ def agendar_vistoria_em_horario(
             # Log se o agendamento está sendo forçado em um único slot
             logging.info(f"Agendamento para imóvel ID {imovel_id} (tipo: {tipo_vistoria_agendada}) necessitaria de dois slots, mas foi forçado em um único slot (ID Agenda: {id_agenda_principal}).")
 
-        # 4. Atualiza todos os slots selecionados (um ou dois) na tabela 'agenda'
-        for id_slot_agenda_atualizar in ids_dos_slots_para_reservar:
-            cursor.execute("UPDATE agenda SET disponivel = 0, imovel_id = ?, tipo = ? WHERE id = ?", 
-                           (imovel_id, tipo_vistoria_agendada, id_slot_agenda_atualizar))
+        # 4. Atualiza todos os slots selecionados (um ou dois) na tabela 'agenda' com um único comando
+        placeholders = ", ".join("?" * len(ids_dos_slots_para_reservar))
+        cursor.execute(_SQL_RESERVAR_SLOTS.format(placeholders=placeholders),
+                       (imovel_id, tipo_vistoria_agendada, *ids_dos_slots_para_reservar))
         
         conexao.commit() # Confirma as atualizações
         
@@ -785,22 +1159,16 @@ def cancelar_agendamento_vistoria(id_agenda_principal: int, id_cliente_responsav
     try:
         conexao = conectar_banco()
         cursor = conexao.cursor()
-        cursor.execute("PRAGMA foreign_keys = ON;")
 
         # 1. Busca dados do agendamento principal para verificar se ele é cancelável
         #    e para obter informações necessárias para encontrar um possível segundo slot.
-        cursor.execute("""
-            SELECT a.imovel_id, a.data, a.horario, a.tipo, a.vistoriador_id, i.cod_imovel 
-            FROM agenda a 
-            LEFT JOIN imoveis i ON a.imovel_id = i.id 
-            WHERE a.id = ? AND a.disponivel = 0 AND a.tipo IN ('ENTRADA', 'SAIDA', 'CONFERENCIA')
-        """, (id_agenda_principal,))
+        cursor.execute(_SQL_CANCELAR_SELECIONAR_AGENDAMENTO, (id_agenda_principal,))
         agendamento_db = cursor.fetchone()
 
         if not agendamento_db:
             return False, "Agendamento não encontrado, já está livre/fechado, é improdutivo, ou não é uma vistoria ativa passível de cancelamento."
         
-        imovel_id, data_ag_str, hora_ag_principal_str, tipo_ag, vist_id, cod_imovel = agendamento_db
+        imovel_id, data_ag_str, hora_ag_principal_str, tipo_ag, vist_id, cod_imovel, periodo_principal = agendamento_db
         
         slots_a_liberar_ids = [id_agenda_principal] # Começa com o slot principal
 
@@ -810,46 +1178,20 @@ def cancelar_agendamento_vistoria(id_agenda_principal: int, id_cliente_responsav
             # O segundo slot teria o mesmo vistoriador, data, imóvel, tipo de vistoria,
             # status não disponível, e estaria em um horário adjacente no mesmo período.
 
-            # Procura por um slot ANTERIOR no mesmo período
-            cursor.execute("""
-                SELECT id, horario FROM agenda 
-                WHERE vistoriador_id = ? AND data = ? AND horario < ? AND imovel_id = ? AND tipo = ? AND disponivel = 0 
-                ORDER BY horario DESC LIMIT 1
-            """, (vist_id, data_ag_str, hora_ag_principal_str, imovel_id, tipo_ag))
-            slot_anterior_info = cursor.fetchone()
-            
-            if slot_anterior_info:
-                id_slot_anterior, horario_anterior_str = slot_anterior_info
-                # Verifica se o slot anterior está no mesmo período (manhã/tarde)
-                horario_anterior_dt_obj = dt.datetime.strptime(horario_anterior_str, "%H:%M")
-                periodo_principal_dt_obj = dt.datetime.strptime(hora_ag_principal_str, "%H:%M")
-                if (horario_anterior_dt_obj.hour < 12) == (periodo_principal_dt_obj.hour < 12) and id_slot_anterior not in slots_a_liberar_ids:
-                    slots_a_liberar_ids.append(id_slot_anterior)
-
-            # Procura por um slot POSTERIOR no mesmo período
-            cursor.execute("""
-                SELECT id, horario FROM agenda 
-                WHERE vistoriador_id = ? AND data = ? AND horario > ? AND imovel_id = ? AND tipo = ? AND disponivel = 0 
-                ORDER BY horario ASC LIMIT 1
-            """, (vist_id, data_ag_str, hora_ag_principal_str, imovel_id, tipo_ag))
-            slot_posterior_info = cursor.fetchone()
-
-            if slot_posterior_info:
-                id_slot_posterior, horario_posterior_str = slot_posterior_info
-                 # Verifica se o slot posterior está no mesmo período (manhã/tarde)
-                horario_posterior_dt_obj = dt.datetime.strptime(horario_posterior_str, "%H:%M")
-                periodo_principal_dt_obj = dt.datetime.strptime(hora_ag_principal_str, "%H:%M")
-                if (horario_posterior_dt_obj.hour < 12) == (periodo_principal_dt_obj.hour < 12) and id_slot_posterior not in slots_a_liberar_ids:
-                    slots_a_liberar_ids.append(id_slot_posterior)
-            
-            # Garante que não haja duplicatas (embora a lógica de adicionar 'if not in' já previna)
-            slots_a_liberar_ids = list(set(slots_a_liberar_ids))
+            # Uma única consulta procura os vizinhos mais próximos do slot principal: o slot ANTERIOR
+            # e o POSTERIOR (cada um com LIMIT 1). Cada vizinho só é retornado se estiver no mesmo
+            # período (manhã/tarde; coluna gerada `periodo`) do slot principal.
+            cursor.execute(_SQL_CANCELAR_BUSCAR_VIZINHOS, (vist_id, data_ag_str, hora_ag_principal_str, imovel_id, tipo_ag, periodo_principal,
+                  vist_id, data_ag_str, hora_ag_principal_str, imovel_id, tipo_ag, periodo_principal))
+            # Os vizinhos têm horários diferentes do principal, então não há IDs repetidos
+            slots_a_liberar_ids.extend(id_vizinho for (id_vizinho,) in cursor)
 
 
-        # 3. Libera todos os slots identificados
-        for slot_id_atual in slots_a_liberar_ids:
-            # Reseta o slot para 'LIVRE', disponível, e remove a associação com o imóvel
-            cursor.execute("UPDATE agenda SET disponivel = 1, imovel_id = NULL, tipo = 'LIVRE' WHERE id = ?", (slot_id_atual,))
+        # 3. Libera todos os slots identificados (no máximo três) com um único comando:
+        #    reseta cada slot para 'LIVRE', disponível, e remove a associação com o imóvel
+        placeholders = ", ".join("?" * len(slots_a_liberar_ids))
+        cursor.execute(_SQL_LIBERAR_SLOTS.format(placeholders=placeholders),
+                       slots_a_liberar_ids)
         
         conexao.commit()
         logging.info(f"Agendamento(s) para imóvel '{cod_imovel or 'N/A'}' nos slots de agenda ID(s) {slots_a_liberar_ids} cancelado(s) e horário(s) liberado(s). Solicitado por cliente ID {id_cliente_responsavel}.")
@@ -889,22 +1231,16 @@ def fechar_horario_agenda(id_agenda: int, motivo: str, vistoriador_id_responsave
     try:
         conexao = conectar_banco()
         cursor = conexao.cursor()
-        cursor.execute("PRAGMA foreign_keys = ON;")
-
-        # Verifica se o horário pode ser fechado: pertence ao vistoriador, está livre e disponível
-        cursor.execute("""
-            SELECT id FROM agenda 
-            WHERE id = ? AND vistoriador_id = ? AND disponivel = 1 AND tipo = 'LIVRE'
-        """, (id_agenda, vistoriador_id_responsavel_fechamento))
-        horario_db = cursor.fetchone()
 
-        if not horario_db:
+        # Atualiza a agenda para 'FECHADO' e não disponível, apenas se o horário pode ser fechado:
+        # pertence ao vistoriador, está livre e disponível. A verificação e a alteração são um único
+        # comando; RETURNING indica se alguma linha atendeu às condições.
+        cursor.execute(_SQL_FECHAR_HORARIO, (id_agenda, vistoriador_id_responsavel_fechamento))
+        if cursor.fetchone() is None:
             return False, "Horário não encontrado, já está ocupado/fechado, não é do tipo 'LIVRE', ou não pertence ao vistoriador especificado."
 
-        # Atualiza a agenda para 'FECHADO' e não disponível
-        cursor.execute("UPDATE agenda SET disponivel = 0, tipo = 'FECHADO', imovel_id = NULL WHERE id = ?", (id_agenda,))
         # Insere o motivo na tabela `horarios_fechados`
-        cursor.execute("INSERT INTO horarios_fechados (agenda_id, motivo) VALUES (?, ?)", (id_agenda, motivo))
+        cursor.execute(_SQL_INSERIR_MOTIVO_FECHAMENTO, (id_agenda, motivo))
         
         conexao.commit()
         logging.info(f"Horário ID {id_agenda} do vistoriador ID {vistoriador_id_responsavel_fechamento} fechado. Motivo: {motivo}")
@@ -916,7 +1252,7 @@ def fechar_horario_agenda(id_agenda: int, motivo: str, vistoriador_id_responsave
         logging.warning(f"Aviso: Horário ID {id_agenda} já parece estar registrado como fechado ou houve uma falha de integridade ao inserir motivo.")
         # Tenta garantir que o status na agenda seja 'FECHADO' mesmo que a inserção do motivo falhe (ou já exista)
         if conexao: # Garante que há conexão para executar o update de fallback
-            cursor.execute("UPDATE agenda SET disponivel = 0, tipo = 'FECHADO', imovel_id = NULL WHERE id = ? AND tipo != 'FECHADO'", (id_agenda,))
+            cursor.execute(_SQL_GARANTIR_HORARIO_FECHADO, (id_agenda,))
             conexao.commit() # Tenta commitar a atualização do status da agenda
         return False, f"Horário ID {id_agenda} já estava fechado ou ocorreu um erro de integridade ao registrar o motivo."
     except Exception as e:
@@ -931,8 +1267,8 @@ def reabrir_horario_agenda(id_agenda: int, vistoriador_id_responsavel_reabertura
     Reabre um horário na agenda que estava marcado como 'FECHADO'.
 
     Verifica se o horário pertence ao `vistoriador_id_responsavel_reabertura` e está 'FECHADO'.
-    Remove o registro da tabela `horarios_fechados` e atualiza a entrada na `agenda`
-    para 'LIVRE' e disponível.
+    Atualiza a entrada na `agenda` para 'LIVRE' e disponível; o registro em `horarios_fechados`
+    é removido pelo gatilho `trg_horarios_fechados_limpeza` (ver database.py).
 
     Args:
         id_agenda (int): ID da entrada na agenda a ser reaberta.
@@ -948,43 +1284,20 @@ def reabrir_horario_agenda(id_agenda: int, vistoriador_id_responsavel_reabertura
     try:
         conexao = conectar_banco()
         cursor = conexao.cursor()
-        cursor.execute("PRAGMA foreign_keys = ON;")
-
-        # Verifica se o horário está realmente 'FECHADO' e pertence ao vistoriador
-        cursor.execute("""
-            SELECT id FROM agenda 
-            WHERE id = ? AND vistoriador_id = ? AND tipo = 'FECHADO'
-        """, (id_agenda, vistoriador_id_responsavel_reabertura))
-        horario_db = cursor.fetchone()
 
-        if not horario_db:
+        # Atualiza a agenda para 'LIVRE' e disponível, apenas se o horário está realmente 'FECHADO' e
+        # pertence ao vistoriador. A verificação e a alteração são um único comando; RETURNING indica
+        # se alguma linha atendeu às condições.
+        cursor.execute(_SQL_REABRIR_HORARIO, (id_agenda, vistoriador_id_responsavel_reabertura))
+        if cursor.fetchone() is None:
             return False, "Horário não está 'FECHADO', não foi encontrado para este vistoriador, ou não pertence ao vistoriador especificado."
 
-        # Remove da tabela `horarios_fechados` (ON DELETE CASCADE da agenda também trataria, mas explícito é bom)
-        cursor.execute("DELETE FROM horarios_fechados WHERE agenda_id = ?", (id_agenda,))
-        # Atualiza a agenda para 'LIVRE' e disponível
-        cursor.execute("UPDATE agenda SET disponivel = 1, tipo = 'LIVRE' WHERE id = ?", (id_agenda,))
+        # O motivo em `horarios_fechados` é removido pelo gatilho `trg_horarios_fechados_limpeza`,
+        # na mesma transação do UPDATE acima
         
         conexao.commit()
-        
-        if cursor.rowcount > 0 : # Se a agenda foi atualizada
-            logging.info(f"Horário ID {id_agenda} do vistoriador ID {vistoriador_id_responsavel_reabertura} reaberto com sucesso.")
-            return True, f"Horário ID {id_agenda} reaberto com sucesso."
-        else:
-            # Caso estranho: DELETE em horarios_fechados pode ter funcionado, mas UPDATE na agenda não afetou linhas.
-            # Verifica o estado atual para dar uma mensagem mais precisa.
-            logging.warning(f"Tentativa de reabrir horário ID {id_agenda}, mas o estado da agenda pode não ter sido alterado como esperado.")
-            cursor.execute("SELECT tipo FROM agenda WHERE id = ?", (id_agenda,))
-            tipo_atual_na_agenda = cursor.fetchone()
-            if tipo_atual_na_agenda and tipo_atual_na_agenda[0] == 'LIVRE':
-                # Provavelmente o DELETE em horarios_fechados ocorreu, e a agenda já estava LIVRE,
-                # ou o UPDATE não registrou rowcount mas funcionou.
-                logging.info(f"Horário ID {id_agenda} já se encontra como 'LIVRE'. Reabertura considerada bem-sucedida (entrada em horarios_fechados removida se existia).")
-                return True, f"Horário ID {id_agenda} reaberto com sucesso (entrada em horarios_fechados pode não ter existido ou foi removida)."
-            else:
-                # Se não está LIVRE após a tentativa, algo deu errado.
-                if conexao: conexao.rollback() # Garante rollback se o estado é inconsistente
-                return False, f"Não foi possível reabrir o horário ID {id_agenda} (estado inconsistente ou não alterado)."
+        logging.info(f"Horário ID {id_agenda} do vistoriador ID {vistoriador_id_responsavel_reabertura} reaberto com sucesso.")
+        return True, f"Horário ID {id_agenda} reaberto com sucesso."
     except Exception as e:
         if conexao: conexao.rollback()
         logging.error(f"Erro ao reabrir horário ID {id_agenda}: {e}", exc_info=True)
@@ -1015,8 +1328,8 @@ def listar_horarios_fechados_por_vistoriador(vistoriador_id: int) -> List[Dict[s
             WHERE a.vistoriador_id = ? AND a.tipo = 'FECHADO' 
             ORDER BY a.data, a.horario
         """, (vistoriador_id,))
-        fechados_db = cursor.fetchall()
-        return [{'id_agenda': row[0], 'data': row[1], 'horario': row[2], 'motivo': row[3]} for row in fechados_db]
+        # Monta os dicionários lendo as linhas diretamente do cursor (sem a lista intermediária do `fetchall()`)
+        return [{'id_agenda': row[0], 'data': row[1], 'horario': row[2], 'motivo': row[3]} for row in cursor]
     except Exception as e:
         logging.error(f"Erro ao listar horários fechados do vistoriador ID {vistoriador_id}: {e}", exc_info=True)
         return []
@@ -1025,10 +1338,59 @@ def listar_horarios_fechados_por_vistoriador(vistoriador_id: int) -> List[Dict[s
 
 # --- Funções para Geração de Relatórios de Vistorias (Entrada/Saída) ---
 
+# Valor a pagar ao vistoriador, calculado pelo SQLite para cada linha dos relatórios de vistoria.
+# Montado uma única vez, na importação, a partir da tabela de `imovel_model` usada por
+# `calcular_valor_vistoriador` (faixas de tamanho por estado de mobília, 50% para 'CONFERENCIA'
+# e 0.0 para mobília desconhecida). Os valores são numéricos da própria tabela (repr de float/int),
+# sem entrada do usuário. O arredondamento para 2 casas é feito em `_executar_query_relatorio_vistoria`.
+def _montar_sql_valor_vistoriador() -> str:
+    """Monta a expressão CASE de `_SQL_VALOR_VISTORIADOR`. Função auxiliar interna."""
+    casos_mobilia = "".join(
+        f"""
+                WHEN i.mobiliado = '{mobilia}' THEN
+                    CASE WHEN i.tamanho < {LIMITE_VALOR_MINIMO_M2!r} THEN {faixas.valor_minimo!r}
+                         WHEN i.tamanho < {LIMITE_VALOR_FIXO_M2!r} THEN i.tamanho * {faixas.valor_m2_intermediario!r}
+                         WHEN i.tamanho <= {faixas.limite_valor_fixo_m2!r} THEN {faixas.valor_fixo!r}
+                         ELSE i.tamanho * {faixas.valor_m2_acima!r} END"""
+        for mobilia, faixas in TABELA_VALOR_VISTORIADOR.items()
+    )
+    return f"""
+            CASE{casos_mobilia}
+                ELSE 0.0
+            END * CASE WHEN a.tipo = 'CONFERENCIA' THEN {FATOR_VALOR_CONFERENCIA!r} ELSE 1.0 END"""
+
+_SQL_VALOR_VISTORIADOR = _montar_sql_valor_vistoriador()
+
+# Backend de tipos dos DataFrames de relatório: com o pyarrow instalado (opcional, pandas >= 2.0),
+# as colunas de texto (datas formatadas, nomes, endereços) ficam em arrays Arrow, e não em arrays
+# de objetos Python, o que reduz a memória do DataFrame. Sem o pyarrow, usa o backend padrão do pandas.
+_DTYPE_BACKEND_RELATORIOS: Optional[str] = (
+    'pyarrow'
+    if importlib.util.find_spec('pyarrow') is not None and int(pd.__version__.split('.')[0]) >= 2
+    else None
+)
+
+# Colunas dos relatórios de vistorias convertidas para o tipo 'category' do pandas
+# (texto repetido em muitas linhas: poucos vistoriadores, imobiliárias e tipos de vistoria)
+_COLUNAS_CATEGORICAS_RELATORIOS: Tuple[str, ...] = ("Vistoriador", "Imobiliária", "Tipo de Vistoria")
+
+# Cache dos DataFrames de relatório de vistorias (o mesmo período costuma ser gerado várias vezes seguidas).
+# Chave: (query SQL, parâmetros). Valor: (instante de armazenamento, versão dos dados, DataFrame)
+# Mesma política do cache de `listar_horarios_agenda`: a entrada vale enquanto nenhum commit ocorreu
+# desde o seu preenchimento (`database.obter_versao_dados`) e dentro do TTL.
+TTL_CACHE_RELATORIOS_VISTORIA_SEG = 60.0
+_MAX_ENTRADAS_CACHE_RELATORIOS_VISTORIA = 16
+_cache_relatorios_vistoria: "OrderedDict[Tuple[str, tuple], Tuple[float, int, pd.DataFrame]]" = OrderedDict()
+_trava_cache_relatorios_vistoria = threading.Lock()
+
 def _executar_query_relatorio_vistoria(query: str, params: tuple) -> pd.DataFrame:
     """
     Função auxiliar interna para executar uma query SQL de relatório e retornar um DataFrame pandas.
-    Também aplica o cálculo do "Valor Vistoriador (R$)" ao DataFrame resultante.
+    A coluna "Valor Vistoriador (R$)" é calculada pela própria query; aqui ela só é arredondada.
+
+    O resultado fica em cache (`_cache_relatorios_vistoria`) por consulta e parâmetros, e é
+    descartado assim que qualquer alteração é confirmada no banco (commit) ou após o TTL.
+    Cada chamada recebe uma cópia do DataFrame armazenado.
 
     Args:
         query (str): A string da query SQL.
@@ -1038,185 +1400,216 @@ def _executar_query_relatorio_vistoria(query: str, params: tuple) -> pd.DataFram
         pd.DataFrame: DataFrame com os resultados da query, incluindo a coluna calculada
                       "Valor Vistoriador (R$)" ou um DataFrame vazio em caso de erro.
     """
+    chave_cache = (query, params)
+    # Versão lida antes da consulta (ver `listar_horarios_agenda`)
+    versao = obter_versao_dados()
+    with _trava_cache_relatorios_vistoria:
+        entrada = _cache_relatorios_vistoria.get(chave_cache)
+        if entrada is not None:
+            instante, versao_entrada, df = entrada
+            if versao_entrada == versao and time.monotonic() - instante < TTL_CACHE_RELATORIOS_VISTORIA_SEG:
+                _cache_relatorios_vistoria.move_to_end(chave_cache)
+                return df.copy() # Cópia: o chamador pode alterá-la sem afetar o cache
+            del _cache_relatorios_vistoria[chave_cache] # Entrada obsoleta
+
     conexao = None
     logging.debug(f"Executando query de relatório: {query} com parâmetros: {params}")
     try:
         conexao = conectar_banco()
-        # Usa pandas para ler diretamente o resultado da query SQL em um DataFrame
-        df = pd.read_sql_query(query, conexao, params=params)
+        cursor = conexao.execute(query, params)
+        # Monta o DataFrame diretamente com as tuplas do cursor e os nomes das colunas do SELECT
+        # (é o que `pd.read_sql_query` faz internamente, sem a sua camada de acesso a bancos SQL)
+        colunas = [descricao[0] for descricao in cursor.description]
+        df = pd.DataFrame.from_records(cursor.fetchall(), columns=colunas, coerce_float=True)
         logging.debug(f"Query de relatório retornou {len(df)} linhas.")
         
+        # Sem linhas (comum em períodos filtrados), o DataFrame vazio já tem as colunas do
+        # relatório e nenhum pós-processamento é necessário.
         if not df.empty:
-            # Calcula a coluna "Valor Vistoriador (R$)" aplicando a função `calcular_valor_vistoriador`
-            # a cada linha do DataFrame.
-            # As colunas "Tipo Mobília" e "Tipo Vistoria Agenda" são usadas para este cálculo.
-            df["Valor Vistoriador (R$)"] = df.apply(
-                lambda row: calcular_valor_vistoriador(
-                    tamanho_m2=row["Tamanho (m2)"], 
-                    mobiliado_status=row["Tipo Mobília"],
-                    tipo_vistoria_agenda=row["Tipo Vistoria Agenda"]
-                ), axis=1 # `axis=1` para aplicar a função por linha
-            )
-            # Remove a coluna auxiliar "Tipo Mobília"
-            df = df.drop(columns=["Tipo Mobília"], errors='ignore')
-            # Renomeia a coluna "Tipo Vistoria Agenda" para "Tipo de Vistoria" para exibição no relatório
-            if "Tipo Vistoria Agenda" in df.columns:
-                df = df.rename(columns={"Tipo Vistoria Agenda": "Tipo de Vistoria"})
-        return df
+            # "Valor Vistoriador (R$)" já vem calculado pelo SQL (`_SQL_VALOR_VISTORIADOR`);
+            # aqui só é arredondado para 2 casas com o `round` do Python, como em
+            # `calcular_valor_vistoriador` (o `round` do SQLite arredonda meio centavo para cima).
+            # Valores nulos (None) são mantidos.
+            df["Valor Vistoriador (R$)"] = [
+                round(valor, 2) if isinstance(valor, float) else valor for valor in df["Valor Vistoriador (R$)"].tolist()
+            ]
+            # Colunas de texto com poucos valores distintos viram categorias (códigos inteiros
+            # + um dicionário de valores), em vez de um objeto str por linha.
+            for coluna in _COLUNAS_CATEGORICAS_RELATORIOS:
+                if coluna in df.columns:
+                    df[coluna] = df[coluna].astype('category')
+            if _DTYPE_BACKEND_RELATORIOS:
+                df = df.convert_dtypes(dtype_backend=_DTYPE_BACKEND_RELATORIOS)
     except Exception as e:
         logging.error(f"Erro ao executar query de relatório de vistoria ou calcular valor do vistoriador: {e}", exc_info=True)
-        return pd.DataFrame() # Retorna DataFrame vazio em caso de erro
+        return pd.DataFrame() # Retorna DataFrame vazio em caso de erro (não armazenado no cache)
     finally:
         if conexao: conexao.close()
 
-# As funções seguintes constroem e executam queries SQL para diferentes tipos de relatórios de vistoria.
-# Todas utilizam `_executar_query_relatorio_vistoria` para processamento.
+    # Armazena o resultado, descartando a entrada menos usada se o limite for atingido
+    with _trava_cache_relatorios_vistoria:
+        _cache_relatorios_vistoria[chave_cache] = (time.monotonic(), versao, df)
+        _cache_relatorios_vistoria.move_to_end(chave_cache)
+        if len(_cache_relatorios_vistoria) > _MAX_ENTRADAS_CACHE_RELATORIOS_VISTORIA:
+            _cache_relatorios_vistoria.popitem(last=False)
+    return df.copy()
+
+# --- SQL pré-montado para os relatórios de vistorias ---
+# Condição de tipo de cada relatório: 'entrada' (ENTRADA), 'saida' (SAIDA e CONFERENCIA)
+# e 'entrada_e_saida' (os dois juntos, separados depois pela coluna "Tipo de Vistoria")
+_TIPOS_RELATORIO_VISTORIA: Dict[str, str] = {
+    'entrada': "a.tipo = 'ENTRADA'",
+    'saida': "a.tipo IN ('SAIDA', 'CONFERENCIA')",
+    'entrada_e_saida': "a.tipo IN ('ENTRADA', 'SAIDA', 'CONFERENCIA')",
+}
+
+def _montar_sql_relatorio_vistoria(tipo: str, filtro: Optional[str], ordenar: bool) -> str:
+    """
+    Monta a query de um relatório de vistorias. Usada apenas na importação do módulo
+    para preencher `_SQL_RELATORIO_VISTORIA`.
 
-def obter_dados_relatorio_entrada_geral(data_inicio: str, data_fim: str) -> pd.DataFrame:
-    """Relatório geral de vistorias de ENTRADA dentro de um período."""
-    query = """
-        SELECT
-            strftime('%d/%m/%Y', a.data) AS "Data Vistoria", /* Formata data para DD/MM/YYYY */
-            a.horario AS "Horário",
-            u.nome AS "Vistoriador",
-            i.cod_imovel AS "Cód. Imóvel",
-            i.endereco AS "Endereço",
-            i.tamanho AS "Tamanho (m2)",      /* Para cálculo e exibição */
-            c.nome AS "Cliente",
-            imob.nome AS "Imobiliária",
-            i.valor AS "Valor Base (R$)",     /* Valor base da Engentoria para a vistoria */
-            i.mobiliado AS "Tipo Mobília",    /* Usado para cálculo do valor do vistoriador */
-            a.tipo AS "Tipo Vistoria Agenda"  /* Usado para cálculo do valor do vistoriador */
-        FROM agenda a
-        JOIN usuarios u ON a.vistoriador_id = u.id
-        LEFT JOIN imoveis i ON a.imovel_id = i.id
-        LEFT JOIN clientes c ON i.cliente_id = c.id
-        LEFT JOIN imobiliarias imob ON i.imobiliaria_id = imob.id
-        WHERE a.tipo = 'ENTRADA' AND a.data BETWEEN ? AND ? /* Filtra por tipo ENTRADA e período */
-        ORDER BY a.data, a.horario
+    Args:
+        tipo (str): 'entrada', 'saida' ou 'entrada_e_saida' (chave de `_TIPOS_RELATORIO_VISTORIA`).
+        filtro (Optional[str]): None (relatório geral), 'vistoriador' ou 'imobiliaria'.
+                                Com filtro, o primeiro parâmetro da query é o ID filtrado,
+                                seguido de data_inicio e data_fim.
+        ordenar (bool): Se True, ordena por data e horário (ORDER BY a.data, a.horario).
+
+    Returns:
+        str: A query SQL. A coluna filtrada ("Vistoriador" ou "Imobiliária") não é exibida,
+             e o JOIN que só serviria a ela é omitido.
     """
-    return _executar_query_relatorio_vistoria(query, (data_inicio, data_fim))
+    exibe_vistoriador = filtro != 'vistoriador'
+    exibe_imobiliaria = filtro != 'imobiliaria'
+    colunas = [
+        "strftime('%d/%m/%Y', a.data) AS \"Data Vistoria\"", # Formata data para DD/MM/YYYY
+        "a.horario AS \"Horário\"",
+    ]
+    if exibe_vistoriador:
+        colunas.append("u.nome AS \"Vistoriador\"")
+    colunas += [
+        "i.cod_imovel AS \"Cód. Imóvel\"",
+        "i.endereco AS \"Endereço\"",
+        "CAST(i.tamanho AS REAL) AS \"Tamanho (m2)\"", # Sempre numérico (coluna float no DataFrame)
+        "c.nome AS \"Cliente\"",
+    ]
+    if exibe_imobiliaria:
+        colunas.append("imob.nome AS \"Imobiliária\"")
+    colunas += [
+        "i.valor AS \"Valor Base (R$)\"", # Valor base da Engentoria para a vistoria
+        "a.tipo AS \"Tipo de Vistoria\"",
+        f"{_SQL_VALOR_VISTORIADOR} AS \"Valor Vistoriador (R$)\"", # Calculado pelo SQLite
+    ]
+
+    joins = []
+    if exibe_vistoriador:
+        joins.append("JOIN usuarios u ON a.vistoriador_id = u.id")
+    joins += [
+        "LEFT JOIN imoveis i ON a.imovel_id = i.id",
+        "LEFT JOIN clientes c ON i.cliente_id = c.id",
+    ]
+    if exibe_imobiliaria:
+        joins.append("LEFT JOIN imobiliarias imob ON i.imobiliaria_id = imob.id")
+
+    condicoes = [_TIPOS_RELATORIO_VISTORIA[tipo]]
+    if filtro == 'vistoriador':
+        condicoes.append("a.vistoriador_id = ?")
+    elif filtro == 'imobiliaria':
+        condicoes.append("i.imobiliaria_id = ?") # Filtra por imobiliaria_id do imóvel
+    condicoes.append("a.data BETWEEN ? AND ?")
+
+    return (
+        "\n        SELECT\n            " + ",\n            ".join(colunas) +
+        "\n        FROM agenda a\n        " + "\n        ".join(joins) +
+        "\n        WHERE " + " AND ".join(condicoes) +
+        ("\n        ORDER BY a.data, a.horario\n" if ordenar else "\n")
+    )
+
+# Texto SQL de cada relatório, indexado por (tipo, filtro, ordenar). O texto de cada relatório é
+# sempre o mesmo objeto, então o cache de comandos preparados da conexão é reaproveitado.
+_SQL_RELATORIO_VISTORIA: Dict[Tuple[str, Optional[str], bool], str] = {
+    (tipo, filtro, ordenar): _montar_sql_relatorio_vistoria(tipo, filtro, ordenar)
+    for tipo in _TIPOS_RELATORIO_VISTORIA
+    for filtro in (None, 'vistoriador', 'imobiliaria')
+    for ordenar in (True, False)
+}
+
+# As funções seguintes executam as queries de `_SQL_RELATORIO_VISTORIA` para os diferentes
+# relatórios de vistoria. Todas utilizam `_executar_query_relatorio_vistoria` para processamento.
+# Com `ordenar=False` as linhas vêm sem ordem definida (sem a ordenação do SQLite), para quem
+# vai reordenar o DataFrame por conta própria.
+
+def obter_dados_relatorio_entrada_geral(data_inicio: str, data_fim: str, *, ordenar: bool = True) -> pd.DataFrame:
+    """Relatório geral de vistorias de ENTRADA dentro de um período."""
+    return _executar_query_relatorio_vistoria(_SQL_RELATORIO_VISTORIA[('entrada', None, ordenar)], (data_inicio, data_fim))
 
-def obter_dados_relatorio_saida_geral(data_inicio: str, data_fim: str) -> pd.DataFrame:
+def obter_dados_relatorio_saida_geral(data_inicio: str, data_fim: str, *, ordenar: bool = True) -> pd.DataFrame:
     """Relatório geral de vistorias de SAIDA e CONFERENCIA dentro de um período."""
-    query = """
-        SELECT
-            strftime('%d/%m/%Y', a.data) AS "Data Vistoria",
-            a.horario AS "Horário",
-            u.nome AS "Vistoriador",
-            i.cod_imovel AS "Cód. Imóvel",
-            i.endereco AS "Endereço",
-            i.tamanho AS "Tamanho (m2)",
-            c.nome AS "Cliente",
-            imob.nome AS "Imobiliária",
-            i.valor AS "Valor Base (R$)",
-            i.mobiliado AS "Tipo Mobília",
-            a.tipo AS "Tipo Vistoria Agenda"
-        FROM agenda a
-        JOIN usuarios u ON a.vistoriador_id = u.id
-        LEFT JOIN imoveis i ON a.imovel_id = i.id
-        LEFT JOIN clientes c ON i.cliente_id = c.id
-        LEFT JOIN imobiliarias imob ON i.imobiliaria_id = imob.id
-        WHERE a.tipo IN ('SAIDA', 'CONFERENCIA') AND a.data BETWEEN ? AND ? /* Filtra por tipo SAIDA ou CONFERENCIA e período */
-        ORDER BY a.data, a.horario
-    """
-    return _executar_query_relatorio_vistoria(query, (data_inicio, data_fim))
+    return _executar_query_relatorio_vistoria(_SQL_RELATORIO_VISTORIA[('saida', None, ordenar)], (data_inicio, data_fim))
 
-def obter_dados_relatorio_entrada_por_vistoriador(data_inicio: str, data_fim: str, vistoriador_id: int) -> pd.DataFrame:
+def obter_dados_relatorio_entrada_por_vistoriador(data_inicio: str, data_fim: str, vistoriador_id: int, *, ordenar: bool = True) -> pd.DataFrame:
     """Relatório de vistorias de ENTRADA para um vistoriador específico, dentro de um período."""
-    query = """
-        SELECT
-            strftime('%d/%m/%Y', a.data) AS "Data Vistoria",
-            a.horario AS "Horário",
-            /* u.nome AS "Vistoriador", -- Removido pois já estamos filtrando por vistoriador */
-            i.cod_imovel AS "Cód. Imóvel",
-            i.endereco AS "Endereço",
-            i.tamanho AS "Tamanho (m2)",
-            c.nome AS "Cliente",
-            imob.nome AS "Imobiliária",
-            i.valor AS "Valor Base (R$)",
-            i.mobiliado AS "Tipo Mobília",
-            a.tipo AS "Tipo Vistoria Agenda"
-        FROM agenda a
-        /* JOIN usuarios u ON a.vistoriador_id = u.id -- Join com usuarios não é estritamente necessário se não exibir o nome */
-        LEFT JOIN imoveis i ON a.imovel_id = i.id
-        LEFT JOIN clientes c ON i.cliente_id = c.id
-        LEFT JOIN imobiliarias imob ON i.imobiliaria_id = imob.id
-        WHERE a.tipo = 'ENTRADA' AND a.vistoriador_id = ? AND a.data BETWEEN ? AND ? /* Filtra por vistoriador_id */
-        ORDER BY a.data, a.horario
-    """
-    return _executar_query_relatorio_vistoria(query, (vistoriador_id, data_inicio, data_fim))
+    return _executar_query_relatorio_vistoria(_SQL_RELATORIO_VISTORIA[('entrada', 'vistoriador', ordenar)], (vistoriador_id, data_inicio, data_fim))
 
-def obter_dados_relatorio_saida_por_vistoriador(data_inicio: str, data_fim: str, vistoriador_id: int) -> pd.DataFrame:
+def obter_dados_relatorio_saida_por_vistoriador(data_inicio: str, data_fim: str, vistoriador_id: int, *, ordenar: bool = True) -> pd.DataFrame:
     """Relatório de vistorias de SAIDA e CONFERENCIA para um vistoriador específico, dentro de um período."""
-    query = """
-        SELECT
-            strftime('%d/%m/%Y', a.data) AS "Data Vistoria",
-            a.horario AS "Horário",
-            i.cod_imovel AS "Cód. Imóvel",
-            i.endereco AS "Endereço",
-            i.tamanho AS "Tamanho (m2)",
-            c.nome AS "Cliente",
-            imob.nome AS "Imobiliária",
-            i.valor AS "Valor Base (R$)",
-            i.mobiliado AS "Tipo Mobília",
-            a.tipo AS "Tipo Vistoria Agenda"
-        FROM agenda a
-        LEFT JOIN imoveis i ON a.imovel_id = i.id
-        LEFT JOIN clientes c ON i.cliente_id = c.id
-        LEFT JOIN imobiliarias imob ON i.imobiliaria_id = imob.id
-        WHERE a.tipo IN ('SAIDA', 'CONFERENCIA') AND a.vistoriador_id = ? AND a.data BETWEEN ? AND ?
-        ORDER BY a.data, a.horario
-    """
-    return _executar_query_relatorio_vistoria(query, (vistoriador_id, data_inicio, data_fim))
+    return _executar_query_relatorio_vistoria(_SQL_RELATORIO_VISTORIA[('saida', 'vistoriador', ordenar)], (vistoriador_id, data_inicio, data_fim))
 
-def obter_dados_relatorio_entrada_por_imobiliaria(data_inicio: str, data_fim: str, imobiliaria_id: int) -> pd.DataFrame:
+def obter_dados_relatorio_entrada_por_imobiliaria(data_inicio: str, data_fim: str, imobiliaria_id: int, *, ordenar: bool = True) -> pd.DataFrame:
     """Relatório de vistorias de ENTRADA para uma imobiliária específica, dentro de um período."""
-    query = """
-        SELECT
-            strftime('%d/%m/%Y', a.data) AS "Data Vistoria",
-            a.horario AS "Horário",
-            u.nome AS "Vistoriador",
-            i.cod_imovel AS "Cód. Imóvel",
-            i.endereco AS "Endereço",
-            i.tamanho AS "Tamanho (m2)",
-            c.nome AS "Cliente",
-            /* imob.nome AS "Imobiliária", -- Removido pois já estamos filtrando por imobiliária */
-            i.valor AS "Valor Base (R$)",
-            i.mobiliado AS "Tipo Mobília",
-            a.tipo AS "Tipo Vistoria Agenda"
-        FROM agenda a
-        JOIN usuarios u ON a.vistoriador_id = u.id
-        LEFT JOIN imoveis i ON a.imovel_id = i.id
-        LEFT JOIN clientes c ON i.cliente_id = c.id
-        /* LEFT JOIN imobiliarias imob ON i.imobiliaria_id = imob.id -- Join não estritamente necessário se não exibir o nome */
-        WHERE a.tipo = 'ENTRADA' AND i.imobiliaria_id = ? AND a.data BETWEEN ? AND ? /* Filtra por imobiliaria_id do imóvel */
-        ORDER BY a.data, a.horario
-    """
-    return _executar_query_relatorio_vistoria(query, (imobiliaria_id, data_inicio, data_fim))
+    return _executar_query_relatorio_vistoria(_SQL_RELATORIO_VISTORIA[('entrada', 'imobiliaria', ordenar)], (imobiliaria_id, data_inicio, data_fim))
 
-def obter_dados_relatorio_saida_por_imobiliaria(data_inicio: str, data_fim: str, imobiliaria_id: int) -> pd.DataFrame:
+def obter_dados_relatorio_saida_por_imobiliaria(data_inicio: str, data_fim: str, imobiliaria_id: int, *, ordenar: bool = True) -> pd.DataFrame:
     """Relatório de vistorias de SAIDA e CONFERENCIA para uma imobiliária específica, dentro de um período."""
-    query = """
-        SELECT
-            strftime('%d/%m/%Y', a.data) AS "Data Vistoria",
-            a.horario AS "Horário",
-            u.nome AS "Vistoriador",
-            i.cod_imovel AS "Cód. Imóvel",
-            i.endereco AS "Endereço",
-            i.tamanho AS "Tamanho (m2)",
-            c.nome AS "Cliente",
-            i.valor AS "Valor Base (R$)",
-            i.mobiliado AS "Tipo Mobília",
-            a.tipo AS "Tipo Vistoria Agenda"
-        FROM agenda a
-        JOIN usuarios u ON a.vistoriador_id = u.id
-        LEFT JOIN imoveis i ON a.imovel_id = i.id
-        LEFT JOIN clientes c ON i.cliente_id = c.id
-        WHERE a.tipo IN ('SAIDA', 'CONFERENCIA') AND i.imobiliaria_id = ? AND a.data BETWEEN ? AND ?
-        ORDER BY a.data, a.horario
+    return _executar_query_relatorio_vistoria(_SQL_RELATORIO_VISTORIA[('saida', 'imobiliaria', ordenar)], (imobiliaria_id, data_inicio, data_fim))
+
+def obter_dados_relatorio_entrada_e_saida_geral(data_inicio: str, data_fim: str, *, ordenar: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Relatórios gerais de ENTRADA e de SAIDA/CONFERENCIA de um mesmo período, obtidos com uma
+    única consulta (uma só leitura da agenda) e separados pela coluna "Tipo de Vistoria".
+    Para quem precisa dos dois relatórios juntos (ex: exibição lado a lado).
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: (relatório de entrada, relatório de saída), com as mesmas
+                                           colunas e ordem de `obter_dados_relatorio_entrada_geral` e
+                                           `obter_dados_relatorio_saida_geral`.
+    """
+    df = _executar_query_relatorio_vistoria(_SQL_RELATORIO_VISTORIA[('entrada_e_saida', None, ordenar)], (data_inicio, data_fim))
+    if df.empty:
+        return df, df.copy()
+    eh_entrada = df["Tipo de Vistoria"] == 'ENTRADA'
+    return df[eh_entrada].reset_index(drop=True), df[~eh_entrada].reset_index(drop=True)
+
+def obter_relatorios_por_vistoriadores(data_inicio: str, data_fim: str, vistoriador_ids: List[int],
+                                       tipo: str = 'entrada') -> Dict[int, pd.DataFrame]:
+    """
+    Relatórios de vistorias de vários vistoriadores no mesmo período, gerados em paralelo.
+
+    Cada relatório é obtido em uma thread, com a sua própria conexão do pool (o banco usa WAL,
+    que permite várias leituras simultâneas, e o sqlite3 libera o GIL durante a consulta).
+    O número de threads é limitado ao tamanho do pool de conexões.
+
+    Args:
+        data_inicio (str): Data de início do período (formato "YYYY-MM-DD").
+        data_fim (str): Data de fim do período (formato "YYYY-MM-DD").
+        vistoriador_ids (List[int]): IDs dos vistoriadores.
+        tipo (str): 'entrada' (ENTRADA), 'saida' (SAIDA e CONFERENCIA) ou 'entrada_e_saida' (todos).
+
+    Returns:
+        Dict[int, pd.DataFrame]: Relatório de cada vistoriador, indexado pelo ID
+                                 (mesmo formato de `obter_dados_relatorio_entrada_por_vistoriador`).
+                                 Dicionário vazio se o tipo for inválido.
     """
-    return _executar_query_relatorio_vistoria(query, (imobiliaria_id, data_inicio, data_fim))
+    query = _SQL_RELATORIO_VISTORIA.get((tipo, 'vistoriador', True))
+    if query is None:
+        logging.warning(f"Tipo de relatório por vistoriador inválido: '{tipo}'.")
+        return {}
+    ids = list(dict.fromkeys(vistoriador_ids)) # Remove repetidos, mantendo a ordem
+    if len(ids) <= 1: # Nada a paralelizar
+        return {vid: _executar_query_relatorio_vistoria(query, (vid, data_inicio, data_fim)) for vid in ids}
+    with ThreadPoolExecutor(max_workers=min(TAMANHO_POOL_CONEXOES, len(ids))) as executor:
+        relatorios = executor.map(lambda vid: _executar_query_relatorio_vistoria(query, (vid, data_inicio, data_fim)), ids)
+        return dict(zip(ids, relatorios))
 
 # Bloco para testes rápidos do model (executado quando o script é rodado diretamente)
 if __name__ == '__main__':
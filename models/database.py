@@ -1,7 +1,12 @@
 # engentoria/models/database.py
 import sqlite3 # Biblioteca para interagir com bancos de dados SQLite
 import hashlib # Biblioteca para criar hashes (usado para senhas)
+import hmac # Comparação de hashes de senha em tempo constante
 import os # Biblioteca para interagir com o sistema operacional (ex: caminhos de arquivo)
+import queue # Fila thread-safe usada como pool de conexões
+import atexit # Encerramento das conexões do pool ao final do programa
+from contextlib import contextmanager # Criação do gerenciador de contexto `transacao`
+from typing import Iterator # Tipos para anotações estáticas
 
 # Nome do arquivo do banco de dados
 DB_NAME = "engentoria.db"
@@ -10,10 +15,121 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Caminho completo para o arquivo do banco de dados
 DB_PATH = DB_NAME
 
+# Número máximo de conexões ociosas mantidas no pool para reutilização
+TAMANHO_POOL_CONEXOES = 4
+# Tamanho do cache de comandos preparados de cada conexão (padrão do sqlite3: 128).
+# O sqlite3 reaproveita o comando já compilado sempre que recebe exatamente o mesmo texto SQL;
+# como as conexões são reutilizadas pelo pool, cada formato de consulta é preparado uma vez por conexão.
+# Comporta todas as variantes pré-montadas da listagem da agenda (128) e os demais comandos dos modelos.
+TAMANHO_CACHE_COMANDOS = 512
+
+# Versão dos dados: incrementada a cada commit feito por uma conexão do pool.
+# Caches de consultas guardam a versão com a qual foram preenchidos; se divergir, descartam o resultado.
+_versao_dados: int = 0
+
+
+class _ConexaoPool(sqlite3.Connection):
+    """
+    Conexão SQLite que pertence ao pool de conexões.
+
+    Chamar `close()` não encerra a conexão: ela é devolvida ao pool para ser
+    reutilizada pela próxima chamada de `conectar_banco()`. Assim, o código
+    existente (`conexao = conectar_banco()` ... `conexao.close()`) passa a
+    reaproveitar conexões sem nenhuma alteração.
+    """
+
+    def close(self) -> None:
+        _devolver_conexao(self)
+
+    def commit(self) -> None:
+        global _versao_dados
+        # Sem transação aberta (ex: apenas SELECTs), não há o que confirmar: a versão dos dados
+        # não muda e os caches de consultas continuam válidos.
+        houve_escrita = self.in_transaction
+        super().commit()
+        if houve_escrita:
+            _versao_dados += 1 # --> Dados possivelmente alterados: invalida os caches de consultas
+
+
+# Pool de conexões ociosas (LIFO: a conexão usada mais recentemente é reutilizada primeiro)
+_pool_conexoes: "queue.LifoQueue[_ConexaoPool]" = queue.LifoQueue(maxsize=TAMANHO_POOL_CONEXOES)
+
+
+def _abrir_nova_conexao() -> _ConexaoPool:
+    """Abre uma nova conexão física com o banco. Função auxiliar interna."""
+    # check_same_thread=False: a conexão pode ser devolvida ao pool por uma thread
+    # e reutilizada por outra (nunca por duas ao mesmo tempo).
+    conexao = sqlite3.connect(DB_PATH, factory=_ConexaoPool, check_same_thread=False,
+                              cached_statements=TAMANHO_CACHE_COMANDOS)
+    conexao._db_path = DB_PATH # --> Caminho usado na abertura, para descartar conexões de outro arquivo
+    conexao._no_pool = False # --> Marca se a conexão está ociosa no pool (evita devolução dupla)
+    # Configurações por conexão, aplicadas uma única vez na abertura (a conexão é reutilizada pelo pool):
+    conexao.execute("PRAGMA foreign_keys = ON;") # --> Respeita as chaves estrangeiras (ON DELETE CASCADE etc.)
+    # Tamanho de página explícito; só tem efeito em um arquivo novo (vazio) e precisa vir antes do WAL,
+    # que grava o cabeçalho do arquivo. Em bancos existentes o comando é ignorado.
+    conexao.execute("PRAGMA page_size = 4096;")
+    conexao.execute("PRAGMA journal_mode = WAL;") # --> Leitores não bloqueiam o escritor e vice-versa
+    conexao.execute("PRAGMA journal_size_limit = 67108864;") # --> Após o checkpoint, trunca o arquivo WAL para até 64 MiB
+    conexao.execute("PRAGMA synchronous = NORMAL;") # --> Seguro com WAL e com bem menos fsync por commit
+    conexao.execute("PRAGMA temp_store = MEMORY;") # --> Tabelas/índices temporários em memória
+    conexao.execute("PRAGMA mmap_size = 268435456;") # --> Leitura do arquivo via memória mapeada (até 256 MiB)
+    conexao.execute("PRAGMA cache_size = -65536;") # --> Cache de páginas de até 64 MiB (valor negativo = KiB)
+    # Algumas builds do SQLite vêm com secure_delete ligado, que sobrescreve com zeros todo conteúdo
+    # apagado (escrita extra em cada DELETE/UPDATE). FAST só zera o que já está na página sendo gravada.
+    conexao.execute("PRAGMA secure_delete = FAST;")
+    return conexao
+
+
+def _devolver_conexao(conexao: _ConexaoPool) -> None:
+    """
+    Devolve uma conexão ao pool. Transações não confirmadas são desfeitas,
+    exatamente como aconteceria ao fechar a conexão. Se o pool estiver cheio,
+    a conexão é encerrada de fato. Função auxiliar interna.
+    """
+    if getattr(conexao, '_no_pool', False):
+        return # --> Conexão já devolvida (close() chamado mais de uma vez)
+    try:
+        if conexao.in_transaction:
+            conexao.rollback() # --> Mesmo efeito de close(): alterações sem commit são descartadas
+        conexao.row_factory = None # --> Restaura a configuração padrão para o próximo usuário
+        conexao._no_pool = True
+        _pool_conexoes.put_nowait(conexao)
+    except (queue.Full, sqlite3.Error):
+        conexao._no_pool = True
+        _encerrar_conexao(conexao) # --> Pool cheio ou conexão inutilizável: encerra de fato
+
+
+def _encerrar_conexao(conexao: sqlite3.Connection) -> None:
+    """
+    Encerra de fato uma conexão física. Antes, executa `PRAGMA optimize`, que atualiza
+    as estatísticas do planejador (ANALYZE) apenas das tabelas em que isso pode
+    melhorar as consultas feitas por esta conexão. Função auxiliar interna.
+    """
+    try:
+        conexao.execute("PRAGMA optimize;")
+    except sqlite3.Error:
+        pass # --> Otimização é opcional: a conexão é encerrada de qualquer forma
+    sqlite3.Connection.close(conexao)
+
+
+@atexit.register
+def _encerrar_pool() -> None:
+    """Encerra as conexões ociosas do pool ao final do programa. Função auxiliar interna."""
+    while True:
+        try:
+            conexao = _pool_conexoes.get_nowait()
+        except queue.Empty:
+            return
+        _encerrar_conexao(conexao)
+
 
 def conectar_banco() -> sqlite3.Connection:
     """
-    Estabelece e retorna uma conexão com o banco de dados SQLite.
+    Obtém uma conexão com o banco de dados SQLite.
+
+    As conexões são reaproveitadas a partir de um pool: se houver uma conexão
+    ociosa, ela é retornada; caso contrário, uma nova é aberta. Ao chamar
+    `close()` na conexão retornada, ela volta para o pool em vez de ser encerrada.
 
     O arquivo do banco de dados (`engentoria.db`) será localizado no diretório
     raiz do projeto. Se o arquivo não existir, o SQLite o criará automaticamente
@@ -22,24 +138,126 @@ def conectar_banco() -> sqlite3.Connection:
     Returns:
         sqlite3.Connection: Objeto de conexão com o banco de dados.
     """
-    # sqlite3.connect() abre uma conexão com o arquivo SQLite especificado por DB_PATH.
-    # Se o arquivo não existir, ele será criado.
-    return sqlite3.connect(DB_PATH)
+    while True:
+        try:
+            conexao = _pool_conexoes.get_nowait()
+        except queue.Empty:
+            # Nenhuma conexão ociosa: abre uma nova com o arquivo especificado por DB_PATH.
+            # Se o arquivo não existir, ele será criado.
+            return _abrir_nova_conexao()
+        if conexao._db_path != DB_PATH:
+            sqlite3.Connection.close(conexao) # --> DB_PATH mudou desde a abertura: descarta
+            continue
+        conexao._no_pool = False
+        return conexao
+
+
+def obter_versao_dados() -> int:
+    """
+    Retorna a versão atual dos dados, incrementada a cada commit feito através de
+    `conectar_banco()`/`transacao()`. Usada para invalidar caches de consultas.
+    """
+    return _versao_dados
+
+
+@contextmanager
+def transacao() -> Iterator[sqlite3.Connection]:
+    """
+    Gerenciador de contexto para uma unidade de trabalho no banco de dados.
+
+    Obtém uma conexão do pool, confirma (commit) as alterações ao final do bloco
+    ou as desfaz (rollback) se ocorrer uma exceção, e devolve a conexão ao pool.
+    A exceção é propagada para quem chamou.
+
+    Exemplo:
+        with transacao() as conexao:
+            conexao.execute("DELETE FROM ...", (...))
+
+    Yields:
+        sqlite3.Connection: Conexão com o banco de dados.
+    """
+    conexao = conectar_banco()
+    try:
+        yield conexao
+        conexao.commit()
+    except BaseException:
+        conexao.rollback()
+        raise
+    finally:
+        conexao.close() # --> Devolve ao pool
+
+# Parâmetros do scrypt (KDF com sal e alto consumo de memória) usado nas senhas.
+# N=2**14, r=8 usa 16 MiB por cálculo (128 * r * N bytes) e leva dezenas de milissegundos por
+# login; o custo de memória é o que impede ataques de força bruta em massa com GPU, ao contrário
+# do SHA-256 puro. Os parâmetros ficam gravados junto com o hash, então podem ser aumentados no
+# futuro sem invalidar as senhas já armazenadas.
+_SCRYPT_N = 2 ** 14
+_SCRYPT_R = 8
+_SCRYPT_P = 1
+_SCRYPT_TAMANHO_SAL = 16 # --> Bytes de sal aleatório por senha
+_SCRYPT_TAMANHO_HASH = 32 # --> Bytes do hash derivado
+_PREFIXO_HASH_SCRYPT = "scrypt"
+
+def _derivar_scrypt(senha: str, sal: bytes, n: int, r: int, p: int, tamanho: int) -> bytes:
+    """Deriva `tamanho` bytes da senha com o scrypt. Função auxiliar interna."""
+    # maxmem com folga sobre os 128 * r * n bytes exigidos (o limite padrão do OpenSSL é 32 MiB)
+    return hashlib.scrypt(senha.encode('utf-8'), salt=sal, n=n, r=r, p=p,
+                          maxmem=2 * 128 * r * n, dklen=tamanho)
 
 def hash_senha(senha: str) -> str:
     """
-    Gera um hash SHA-256 para uma senha fornecida.
+    Gera o hash de uma senha com scrypt e um sal aleatório.
 
     Args:
         senha (str): A senha em texto plano a ser criptografada.
 
     Returns:
-        str: A representação hexadecimal do hash SHA-256 da senha.
+        str: O hash no formato 'scrypt$N$r$p$sal$hash' (sal e hash em hexadecimal),
+             que guarda tudo o que `verificar_senha` precisa para conferir a senha.
     """
-    # A senha é primeiro codificada para UTF-8 (bytes).
-    # hashlib.sha256() cria um objeto hash SHA-256.
-    # .hexdigest() retorna a string hexadecimal do hash.
-    return hashlib.sha256(senha.encode('utf-8')).hexdigest()
+    sal = os.urandom(_SCRYPT_TAMANHO_SAL) # --> Sal novo a cada hash: senhas iguais geram hashes diferentes
+    derivado = _derivar_scrypt(senha, sal, _SCRYPT_N, _SCRYPT_R, _SCRYPT_P, _SCRYPT_TAMANHO_HASH)
+    return f"{_PREFIXO_HASH_SCRYPT}${_SCRYPT_N}${_SCRYPT_R}${_SCRYPT_P}${sal.hex()}${derivado.hex()}"
+
+def verificar_senha(senha_armazenada: str, senha: str) -> bool:
+    """
+    Confere uma senha em texto plano contra o hash armazenado no banco.
+
+    Aceita o formato atual ('scrypt$...') e o formato antigo (SHA-256 em hexadecimal, sem sal),
+    para que os usuários cadastrados antes da troca continuem conseguindo entrar.
+
+    Args:
+        senha_armazenada (str): O hash gravado na coluna `usuarios.senha`.
+        senha (str): A senha em texto plano fornecida pelo usuário.
+
+    Returns:
+        bool: True se a senha corresponder ao hash, False caso contrário (inclusive se o
+              hash armazenado estiver em um formato desconhecido).
+    """
+    if not senha_armazenada:
+        return False
+    if senha_armazenada.startswith(_PREFIXO_HASH_SCRYPT + "$"):
+        try:
+            _, n, r, p, sal_hex, hash_hex = senha_armazenada.split("$")
+            esperado = bytes.fromhex(hash_hex)
+            derivado = _derivar_scrypt(senha, bytes.fromhex(sal_hex), int(n), int(r), int(p), len(esperado))
+        except ValueError:
+            return False # --> Hash corrompido ou com parâmetros inválidos
+        # Comparação em tempo constante (não revela quantos bytes iniciais coincidem)
+        return hmac.compare_digest(derivado, esperado)
+    # Formato antigo: SHA-256 puro em hexadecimal
+    return hmac.compare_digest(hashlib.sha256(senha.encode('utf-8')).hexdigest().encode('ascii'),
+                               senha_armazenada.encode('utf-8'))
+
+def senha_precisa_rehash(senha_armazenada: str) -> bool:
+    """
+    Indica se o hash armazenado deve ser regravado com `hash_senha`: formato antigo (SHA-256)
+    ou scrypt com parâmetros diferentes dos atuais. Usada no login, quando a senha em texto
+    plano está disponível para gerar o novo hash.
+    """
+    return not senha_armazenada.startswith(
+        f"{_PREFIXO_HASH_SCRYPT}${_SCRYPT_N}${_SCRYPT_R}${_SCRYPT_P}$"
+    )
 
 def _table_has_column(cursor: sqlite3.Cursor, table_name: str, column_name: str) -> bool:
     """
@@ -54,12 +272,95 @@ def _table_has_column(cursor: sqlite3.Cursor, table_name: str, column_name: str)
     Returns:
         bool: True se a coluna existir na tabela, False caso contrário.
     """
-    # PRAGMA table_info(nome_da_tabela) retorna metadados sobre as colunas da tabela.
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    # Extrai os nomes das colunas (o segundo elemento, índice 1, de cada tupla retornada).
-    columns = [info[1] for info in cursor.fetchall()]
-    # Verifica se a `column_name` está na lista de colunas encontradas.
-    return column_name in columns
+    # pragma_table_xinfo(nome_da_tabela) é a forma de função-tabela do PRAGMA table_xinfo: retorna
+    # uma linha por coluna da tabela, incluindo as colunas geradas (que o PRAGMA table_info omite).
+    # A procura pela coluna é feita pelo próprio SQLite, com os nomes passados como parâmetros:
+    # uma única linha (ou nenhuma) volta para o Python, sem `fetchall()` da lista de colunas.
+    cursor.execute("SELECT 1 FROM pragma_table_xinfo(?) WHERE name = ?", (table_name, column_name))
+    return cursor.fetchone() is not None
+
+# Coluna gerada 'periodo' da tabela 'agenda': 0 = manhã (hora < 12), 1 = tarde (hora >= 12).
+# Calculada pelo próprio SQLite a partir de 'horario' (VIRTUAL: não ocupa espaço na tabela), permite
+# comparar o período de dois horários no SQL sem converter o texto "HH:MM" em Python.
+# Compartilhada entre a criação da tabela e a migração de bancos antigos (ALTER TABLE ADD COLUMN).
+_SQL_COLUNA_PERIODO_AGENDA = "periodo INTEGER GENERATED ALWAYS AS (CASE WHEN CAST(substr(horario, 1, 2) AS INTEGER) < 12 THEN 0 ELSE 1 END) VIRTUAL"
+
+# Definição das colunas da tabela 'vistorias_improdutivas'.
+# Compartilhada entre a criação da tabela e a reconstrução feita em `_migrar_tabela_vistorias_improdutivas`.
+_SQL_COLUNAS_VISTORIAS_IMPRODUTIVAS = """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        agenda_id_original INTEGER NOT NULL,
+        cliente_id INTEGER NOT NULL,
+        imovel_id INTEGER,
+        imobiliaria_id INTEGER,
+        data_marcacao DATE NOT NULL,
+        data_vistoria_original DATE NOT NULL,
+        horario_vistoria_original TEXT NOT NULL,
+        motivo_improdutividade TEXT NOT NULL,
+        valor_cobranca REAL NOT NULL,
+        valor_para_vistoriador REAL,
+        pago BOOLEAN DEFAULT 0,
+        data_pagamento DATE,
+        FOREIGN KEY (agenda_id_original) REFERENCES agenda(id) ON DELETE CASCADE,
+        FOREIGN KEY (cliente_id) REFERENCES clientes(id) ON DELETE CASCADE,
+        FOREIGN KEY (imovel_id) REFERENCES imoveis(id) ON DELETE SET NULL,
+        FOREIGN KEY (imobiliaria_id) REFERENCES imobiliarias(id) ON DELETE SET NULL
+    """
+
+def _migrar_tabela_vistorias_improdutivas(conexao: sqlite3.Connection) -> None:
+    """
+    Atualiza a tabela `vistorias_improdutivas` de bancos criados com o esquema antigo:
+    - FK `agenda_id_original` com ON DELETE RESTRICT passa a ON DELETE CASCADE;
+    - `valor_para_vistoriador` como coluna gerada volta a ser uma coluna comum, preenchida
+      pelo Python (o `round()` do SQLite arredonda alguns centavos de forma diferente).
+    Os valores já gravados são copiados como estão, nunca recalculados.
+    Função auxiliar interna (prefixo '_').
+
+    O SQLite não permite alterar uma FK ou a definição de uma coluna gerada com ALTER TABLE,
+    então a tabela é reconstruída
+    (criar nova tabela, copiar os dados, remover a antiga e renomear a nova), seguindo
+    o procedimento recomendado na documentação do SQLite.
+
+    Args:
+        conexao (sqlite3.Connection): Conexão aberta com o banco de dados.
+    """
+    cursor = conexao.cursor()
+    # PRAGMA foreign_key_list retorna (id, seq, table, from, to, on_update, on_delete, match)
+    cursor.execute("PRAGMA foreign_key_list(vistorias_improdutivas)")
+    fk_em_cascata = all(fk[3] != "agenda_id_original" or fk[6] == "CASCADE" for fk in cursor.fetchall())
+    # PRAGMA table_xinfo retorna (cid, name, type, notnull, dflt_value, pk, hidden);
+    # hidden = 2 (VIRTUAL) ou 3 (STORED) indica coluna gerada
+    cursor.execute("PRAGMA table_xinfo(vistorias_improdutivas)")
+    colunas_info = cursor.fetchall()
+    valor_gerado = any(info[1] == "valor_para_vistoriador" and info[6] in (2, 3) for info in colunas_info)
+    if fk_em_cascata and not valor_gerado:
+        return # Esquema já atualizado
+
+    print("INFO: Atualizando esquema da tabela 'vistorias_improdutivas' (FK em cascata, valor do vistoriador como coluna comum)...")
+    # A verificação de FKs precisa ser desligada fora de transação para que DROP TABLE
+    # não dispare ações nas tabelas relacionadas durante a reconstrução.
+    conexao.commit()
+    cursor.execute("PRAGMA foreign_keys = OFF;")
+    try:
+        # Copia apenas as colunas existentes na tabela antiga (colunas adicionadas
+        # por ALTER TABLE ficam no fim, então a ordem pode diferir da definição atual).
+        # `valor_para_vistoriador` também é copiada quando era gerada: o valor gravado é preservado.
+        colunas = ", ".join(info[1] for info in colunas_info)
+        cursor.execute("BEGIN")
+        cursor.execute(f"CREATE TABLE vistorias_improdutivas_nova ({_SQL_COLUNAS_VISTORIAS_IMPRODUTIVAS})")
+        cursor.execute(f"INSERT INTO vistorias_improdutivas_nova ({colunas}) SELECT {colunas} FROM vistorias_improdutivas")
+        cursor.execute("DROP TABLE vistorias_improdutivas")
+        cursor.execute("ALTER TABLE vistorias_improdutivas_nova RENAME TO vistorias_improdutivas")
+        cursor.execute("PRAGMA foreign_key_check(vistorias_improdutivas)")
+        if cursor.fetchone():
+            raise sqlite3.IntegrityError("violação de chave estrangeira após reconstruir 'vistorias_improdutivas'")
+        conexao.commit()
+        print("INFO: Tabela 'vistorias_improdutivas' atualizada.")
+    except sqlite3.Error as e:
+        conexao.rollback()
+        print(f"AVISO: Não foi possível atualizar a tabela 'vistorias_improdutivas' (mantida como estava): {e}")
+    finally:
+        cursor.execute("PRAGMA foreign_keys = ON;")
 
 def criar_tabelas():
     """
@@ -83,10 +384,15 @@ def criar_tabelas():
     conexao = conectar_banco() # Obtém uma conexão com o banco
     cursor = conexao.cursor() # Cria um cursor para executar comandos SQL
     
-    # Habilita o suporte a chaves estrangeiras para esta conexão.
+    # O suporte a chaves estrangeiras já é habilitado na abertura de cada conexão (`_abrir_nova_conexao`).
     # É importante para manter a integridade dos dados (ex: não permitir
     # um imovel_id na agenda que não exista na tabela imoveis).
-    cursor.execute("PRAGMA foreign_keys = ON;")
+
+    # Todo o esquema (tabelas, migrações, gatilhos, índices e estatísticas) é criado em uma única
+    # transação: o sqlite3 não abre transações implícitas para comandos DDL, então, sem este BEGIN,
+    # cada CREATE/ALTER seria confirmado (e sincronizado em disco) isoladamente.
+    # A transação é confirmada pelo `conexao.commit()` ao final.
+    cursor.execute("BEGIN IMMEDIATE")
 
     # Tabela de Usuários (para administradores e vistoriadores)
     # - id: Chave primária autoincrementável.
@@ -188,9 +494,10 @@ def criar_tabelas():
     # - data, horario: Data e hora da vistoria/disponibilidade.
     # - disponivel: Booleano indicando se o horário está livre (1) ou ocupado (0).
     # - tipo: Estado do horário ('LIVRE', 'ENTRADA', 'SAIDA', 'CONFERENCIA', 'FECHADO', 'IMPRODUTIVA').
+    # - periodo: Coluna gerada a partir de 'horario' (0 = manhã, 1 = tarde).
     # - UNIQUE (vistoriador_id, data, horario): Garante que um vistoriador não pode ter
     #   duas entradas na agenda para o mesmo dia e horário.
-    cursor.execute("""
+    cursor.execute(f"""
     CREATE TABLE IF NOT EXISTS agenda (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         imovel_id INTEGER,
@@ -199,6 +506,7 @@ def criar_tabelas():
         horario TEXT NOT NULL,
         disponivel BOOLEAN DEFAULT 1,
         tipo TEXT DEFAULT 'LIVRE' CHECK(tipo IN ('ENTRADA', 'SAIDA', 'CONFERENCIA', 'FECHADO', 'LIVRE', 'IMPRODUTIVA')),
+        {_SQL_COLUNA_PERIODO_AGENDA},
         UNIQUE (vistoriador_id, data, horario),
         FOREIGN KEY (imovel_id) REFERENCES imoveis(id) ON DELETE SET NULL,
         FOREIGN KEY (vistoriador_id) REFERENCES usuarios(id) ON DELETE CASCADE
@@ -211,6 +519,14 @@ def criar_tabelas():
             cursor.execute("ALTER TABLE agenda ADD COLUMN tipo TEXT DEFAULT 'LIVRE' NOT NULL CHECK(tipo IN ('ENTRADA', 'SAIDA', 'CONFERENCIA', 'FECHADO', 'LIVRE', 'IMPRODUTIVA'))")
         except sqlite3.OperationalError as e:
              print(f"AVISO: Não foi possível adicionar 'tipo' a 'agenda' (pode já existir ou outro erro): {e}")
+    # Verificação e adição da coluna gerada 'periodo' na tabela 'agenda' (colunas geradas VIRTUAL podem ser
+    # adicionadas com ALTER TABLE; os valores das linhas existentes são calculados na leitura)
+    if not _table_has_column(cursor, "agenda", "periodo"):
+        print("INFO: Adicionando coluna 'periodo' à tabela 'agenda'...")
+        try:
+            cursor.execute(f"ALTER TABLE agenda ADD COLUMN {_SQL_COLUNA_PERIODO_AGENDA}")
+        except sqlite3.OperationalError as e:
+             print(f"AVISO: Não foi possível adicionar 'periodo' a 'agenda' (pode já existir ou outro erro): {e}")
 
 
     # Tabela de Horários Fixos de Trabalho dos Vistoriadores
@@ -246,14 +562,24 @@ def criar_tabelas():
         FOREIGN KEY (agenda_id) REFERENCES agenda(id) ON DELETE CASCADE
     );
     """)
+    # Gatilho: quando um horário deixa de ser 'FECHADO' (ex: reaberto), o registro do motivo em
+    # 'horarios_fechados' é removido pelo próprio SQLite, na mesma transação da alteração da agenda.
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_horarios_fechados_limpeza
+    AFTER UPDATE OF tipo ON agenda
+    WHEN OLD.tipo = 'FECHADO' AND NEW.tipo != 'FECHADO'
+    BEGIN
+        DELETE FROM horarios_fechados WHERE agenda_id = NEW.id;
+    END;
+    """)
 
     # Tabela de Vistorias Improdutivas
     # Registra informações sobre vistorias que foram agendadas mas não ocorreram,
     # gerando possível cobrança para o cliente e remuneração para o vistoriador.
     # - id: Chave primária.
     # - agenda_id_original: ID da entrada na tabela 'agenda' que era a vistoria original.
-    #   ON DELETE RESTRICT impede que a entrada original na agenda seja deletada enquanto
-    #   houver um registro de vistoria improdutiva associado (importante para histórico e auditoria).
+    #   ON DELETE CASCADE: ao deletar a entrada original da agenda (ex: limpeza de agendamentos
+    #   antigos), o próprio SQLite remove os registros de vistoria improdutiva associados.
     # - cliente_id: Cliente responsável. ON DELETE CASCADE (se o cliente for deletado, as improdutivas dele também são).
     # - imovel_id, imobiliaria_id: IDs opcionais do imóvel e imobiliária. ON DELETE SET NULL.
     # - data_marcacao: Data em que a vistoria foi marcada como improdutiva.
@@ -263,26 +589,8 @@ def criar_tabelas():
     # - valor_para_vistoriador: Valor a ser pago ao vistoriador pela disponibilidade/deslocamento.
     # - pago: Booleano indicando se a cobrança foi paga pelo cliente.
     # - data_pagamento: Data do pagamento, se ocorrido.
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS vistorias_improdutivas (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        agenda_id_original INTEGER NOT NULL, 
-        cliente_id INTEGER NOT NULL,
-        imovel_id INTEGER,
-        imobiliaria_id INTEGER,
-        data_marcacao DATE NOT NULL,
-        data_vistoria_original DATE NOT NULL,
-        horario_vistoria_original TEXT NOT NULL,
-        motivo_improdutividade TEXT NOT NULL,
-        valor_cobranca REAL NOT NULL,
-        valor_para_vistoriador REAL,
-        pago BOOLEAN DEFAULT 0,
-        data_pagamento DATE,
-        FOREIGN KEY (agenda_id_original) REFERENCES agenda(id) ON DELETE RESTRICT, -- Mantido RESTRICT
-        FOREIGN KEY (cliente_id) REFERENCES clientes(id) ON DELETE CASCADE,
-        FOREIGN KEY (imovel_id) REFERENCES imoveis(id) ON DELETE SET NULL,
-        FOREIGN KEY (imobiliaria_id) REFERENCES imobiliarias(id) ON DELETE SET NULL
-    );
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS vistorias_improdutivas ({_SQL_COLUNAS_VISTORIAS_IMPRODUTIVAS});
     """)
     # Verificação e adição da coluna 'valor_para_vistoriador' (migração simples)
     if not _table_has_column(cursor, "vistorias_improdutivas", "valor_para_vistoriador"):
@@ -292,6 +600,73 @@ def criar_tabelas():
             print("INFO: Coluna 'valor_para_vistoriador' adicionada.")
         except sqlite3.OperationalError as e:
             print(f"AVISO: Não foi possível adicionar 'valor_para_vistoriador' (pode já existir ou outro erro): {e}")
+    # Bancos com a FK `agenda_id_original` ainda como ON DELETE RESTRICT, ou com
+    # `valor_para_vistoriador` como coluna gerada, têm a tabela reconstruída
+    _migrar_tabela_vistorias_improdutivas(conexao)
+    # A reconstrução precisa confirmar a transação para desligar as FKs (PRAGMA sem efeito dentro
+    # de transação); nesse caso, reabre a transação para que índices, gatilhos e estatísticas
+    # continuem sendo criados como uma única unidade.
+    if not conexao.in_transaction:
+        cursor.execute("BEGIN IMMEDIATE")
+
+    # --- Índices ---
+    # Criados com IF NOT EXISTS, podendo ser executados a cada inicialização.
+    # - idx_agenda_vist_data_tipo_disp_hora: atende às consultas da agenda filtradas por vistoriador,
+    #   intervalo de datas (a.data >= ? AND a.data <= ?) e tipo do horário (a.tipo IN (...)).
+    #   Também contém 'disponivel', 'horario' e 'imovel_id', então cobre todas as colunas de 'agenda'
+    #   lidas por `listar_horarios_agenda` (o id é o próprio rowid): a tabela não precisa ser consultada.
+    #   Substitui o antigo idx_agenda_vist_data_tipo (mesmo prefixo de colunas).
+    cursor.execute("DROP INDEX IF EXISTS idx_agenda_vist_data_tipo")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_agenda_vist_data_tipo_disp_hora ON agenda(vistoriador_id, data, tipo, disponivel, horario, imovel_id)")
+    # - idx_agenda_data_ocupados: índice parcial, apenas dos horários que não estão livres (a grande
+    #   maioria das linhas é 'LIVRE'). Atende às listagens sem filtro de vistoriador que excluem os
+    #   horários livres (o filtro inclui `a.tipo != 'LIVRE'`, condição do índice).
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_agenda_data_ocupados ON agenda(data, tipo) WHERE tipo != 'LIVRE'")
+    # - idx_agenda_data_imovel: atende à limpeza de agendamentos antigos (a.data < ?), que lê
+    #   também a.imovel_id para o JOIN com 'imoveis' (imoveis.id é a chave primária). O índice cobre a consulta.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_agenda_data_imovel ON agenda(data, imovel_id)")
+    # - idx_agenda_tipo_data: relatórios de vistorias sem filtro de vistoriador (a.tipo = 'ENTRADA' ou
+    #   a.tipo IN ('SAIDA', 'CONFERENCIA') e a.data BETWEEN ? AND ?). Lê apenas as linhas do tipo pedido,
+    #   sem passar pelos horários livres, e já na ordem (data, horario) do ORDER BY para cada tipo.
+    #   (Os relatórios por vistoriador já usam o índice UNIQUE (vistoriador_id, data, horario) da tabela.)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_agenda_tipo_data ON agenda(tipo, data, horario)")
+    # - idx_vistorias_improd_agenda: busca das vistorias improdutivas de um agendamento, usada pelo
+    #   ON DELETE CASCADE da FK `agenda_id_original` (sem o índice, cada agenda deletada varre a tabela).
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vistorias_improd_agenda ON vistorias_improdutivas(agenda_id_original)")
+    # - idx_vistorias_improd_cliente / _imovel / _imobiliaria: demais FKs de vistorias_improdutivas.
+    #   O SQLite não indexa colunas de FK sozinho; sem estes índices, cada cliente, imóvel ou imobiliária
+    #   removido varre a tabela inteira para aplicar o ON DELETE CASCADE / SET NULL.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vistorias_improd_cliente ON vistorias_improdutivas(cliente_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vistorias_improd_imovel ON vistorias_improdutivas(imovel_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vistorias_improd_imobiliaria ON vistorias_improdutivas(imobiliaria_id)")
+    # - idx_agenda_imovel: FK `agenda.imovel_id` (ON DELETE SET NULL) e a verificação de imóveis sem
+    #   agendamento. O idx_agenda_data_imovel começa por `data` e não serve para buscas só por imóvel.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_agenda_imovel ON agenda(imovel_id)")
+    # - idx_imoveis_cliente / idx_imoveis_imobiliaria: buscas de imóveis por cliente e por imobiliária
+    #   (listagens, verificação de imóveis restantes de um cliente e as FKs ON DELETE CASCADE/RESTRICT).
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_cliente ON imoveis(cliente_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_imoveis_imobiliaria ON imoveis(imobiliaria_id)")
+    # - idx_agenda_fechados: índice parcial, apenas dos horários 'FECHADO' (poucas linhas). Atende à listagem
+    #   dos horários fechados de um vistoriador já na ordem (data, horario), sem ordenação adicional.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_agenda_fechados ON agenda(vistoriador_id, data, horario) WHERE tipo = 'FECHADO'")
+    # - idx_horarios_fechados_agenda_motivo: cobre o JOIN com 'horarios_fechados' (agenda_id -> motivo)
+    #   sem consultar a tabela. (O índice UNIQUE de agenda_id continua garantindo a unicidade.)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_horarios_fechados_agenda_motivo ON horarios_fechados(agenda_id, motivo)")
+
+    # Estatísticas do planejador de consultas: na primeira inicialização (sem a tabela sqlite_stat1)
+    # executa ANALYZE, para que os índices acima sejam escolhidos. Nas seguintes, analisa apenas os
+    # índices ainda sem estatísticas (ex: criados por uma versão mais nova deste arquivo). Depois disso,
+    # as estatísticas são mantidas pelo `PRAGMA optimize` executado ao encerrar as conexões.
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+    if cursor.fetchone() is None:
+        cursor.execute("ANALYZE")
+    else:
+        cursor.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'index' AND name NOT IN (SELECT idx FROM sqlite_stat1 WHERE idx IS NOT NULL)
+        """)
+        for (nome_indice,) in cursor.fetchall():
+            cursor.execute(f'ANALYZE "{nome_indice}"')
 
     # Salva todas as alterações no banco de dados
     conexao.commit()
@@ -0,0 +1,58 @@
+# engentoria/models/dto.py
+
+# Objetos de transferência de dados (DTOs) retornados pelos modelos.
+from dataclasses import dataclass, fields # Definição de classes de dados compactas e imutáveis
+from typing import Optional, Any, Tuple # Tipos para anotações estáticas
+
+
+@dataclass(slots=True, frozen=True)
+class AgendaRow:
+    """
+    Item da agenda retornado por `agenda_model.listar_horarios_agenda` e
+    `agenda_model.iter_horarios_agenda`.
+
+    Usa `__slots__` e é imutável: ocupa bem menos memória que um dicionário por
+    linha e o acesso por atributo (`item.id_agenda`) é direto. Para manter a
+    compatibilidade com o código que trata os itens como dicionários, também
+    aceita leitura no estilo `item['data']` e `item.get('cod_imovel', 'N/D')`.
+    """
+    id_agenda: int
+    data: str
+    horario: str
+    disponivel: int # 1 = disponível, 0 = ocupado (normalizado pelo SQL; use como booleano)
+    tipo_vistoria: str # 'tipo' da agenda é o tipo da vistoria se agendado
+    imovel_id: Optional[int] = None
+    nome_vistoriador: Optional[str] = None
+    vistoriador_id: Optional[int] = None
+    cod_imovel: Optional[str] = None
+    endereco_imovel: Optional[str] = None
+    cep: Optional[str] = None
+    referencia: Optional[str] = None
+    tamanho: Optional[float] = None
+    mobiliado: Optional[str] = None
+    nome_cliente: Optional[str] = None
+    cliente_id: Optional[int] = None
+    email_cliente: Optional[str] = None
+    nome_imobiliaria: Optional[str] = None
+
+    # --- Compatibilidade com o acesso no estilo dicionário ---
+    # Apenas os campos declarados são expostos como chaves (não métodos como 'keys' ou '__class__')
+    def __getitem__(self, chave: str) -> Any:
+        if chave not in _CAMPOS_AGENDA_ROW:
+            raise KeyError(chave)
+        return getattr(self, chave)
+
+    def get(self, chave: str, padrao: Any = None) -> Any:
+        if chave not in _CAMPOS_AGENDA_ROW:
+            return padrao
+        return getattr(self, chave)
+
+    def __contains__(self, chave: object) -> bool:
+        return isinstance(chave, str) and chave in _CAMPOS_AGENDA_ROW
+
+    def keys(self) -> Tuple[str, ...]:
+        return _CAMPOS_AGENDA_ROW
+
+
+# Nomes dos campos de AgendaRow, na ordem de declaração
+_CAMPOS_AGENDA_ROW: Tuple[str, ...] = tuple(f.name for f in fields(AgendaRow))
@@ -255,10 +255,8 @@ def deletar_imobiliaria(imobiliaria_id: int) -> bool:
     try:
         conexao = conectar_banco()
         cursor = conexao.cursor()
-        # Ativa o PRAGMA foreign_keys para garantir que as restrições sejam verificadas.
-        # Embora geralmente configurado na conexão, reiterar pode ser útil ou necessário
-        # dependendo da configuração do driver/conexão.
-        cursor.execute("PRAGMA foreign_keys = ON;")
+        # O PRAGMA foreign_keys já é ativado na abertura da conexão (`conectar_banco`),
+        # garantindo que as restrições sejam verificadas.
         
         cursor.execute("DELETE FROM imobiliarias WHERE id = ?", (imobiliaria_id,))
         conexao.commit()
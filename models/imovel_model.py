@@ -1,8 +1,9 @@
 # engentoria/models/imovel_model.py
 import sqlite3 # Biblioteca para interagir com bancos de dados SQLite
+from functools import lru_cache # Memoização das regras de horários por imóvel
 from .database import conectar_banco # Função para conectar ao banco de dados (do mesmo pacote)
 from .imobiliaria_model import obter_imobiliaria_por_id # Função para buscar dados da imobiliária associada
-from typing import Optional, List, Dict, Any, Tuple # Tipos para anotações estáticas
+from typing import Optional, List, Dict, Any, Tuple, NamedTuple # Tipos para anotações estáticas
 import logging # Biblioteca para logging de eventos e erros
 
 # Configuração básica do logging
@@ -39,7 +40,6 @@ def deletar_imovel_por_id(imovel_id: int, conexao_existente: Optional[sqlite3.Co
     
     try:
         cursor = conexao.cursor()
-        cursor.execute("PRAGMA foreign_keys = ON;") # Assegura que as restrições de FK sejam aplicadas
 
         # Executa o comando DELETE para remover o imóvel com o ID fornecido
         cursor.execute("DELETE FROM imoveis WHERE id = ?", (imovel_id,))
@@ -93,7 +93,6 @@ def deletar_imoveis_orfaos() -> int:
     try:
         conexao = conectar_banco()
         cursor = conexao.cursor()
-        cursor.execute("PRAGMA foreign_keys = ON;")
 
         # Query para encontrar IDs de imóveis que NÃO existem na coluna 'imovel_id' da tabela 'agenda'.
         # `DISTINCT imovel_id` é usado para otimizar o subselect.
@@ -252,6 +251,7 @@ def cadastrar_imovel(cod_imovel: str, cliente_id: int, imobiliaria_id: int,
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (cod_imovel, cliente_id, imobiliaria_id, endereco, cep, referencia, tamanho, mobiliado, valor_calculado_vistoria_base))
         conexao.commit()
+        limpar_cache_regras_horarios() # --> Descarta um eventual "imóvel não encontrado" em cache para este ID
         imovel_id = cursor.lastrowid # ID do imóvel inserido
         logging.info(f"✅ Imóvel '{cod_imovel}' cadastrado com sucesso! ID: {imovel_id}, Valor Vistoria (Base Engentoria): R${valor_calculado_vistoria_base:.2f}")
         return imovel_id
@@ -553,6 +553,7 @@ def atualizar_imovel(imovel_id: int, **kwargs) -> bool:
         cursor = conexao.cursor()
         cursor.execute(f"UPDATE imoveis SET {query_set_string} WHERE id = ?", tuple(valores_para_query))
         conexao.commit()
+        limpar_cache_regras_horarios() # --> Tamanho/mobília podem ter mudado: as regras em cache ficam obsoletas
         if cursor.rowcount > 0:
             logging.info(f"✅ Imóvel ID {imovel_id} atualizado com sucesso.")
             return True
@@ -615,11 +616,26 @@ def regras_necessita_dois_horarios(imovel_id: int, tipo_vistoria: str) -> bool:
     if tipo_vistoria == "CONFERENCIA":
         return False # Conferências sempre usam um único horário
 
+    # Aplica as regras do imóvel (resultado memoizado por imóvel; ver `_imovel_necessita_dois_horarios`)
+    necessita = _imovel_necessita_dois_horarios(imovel_id)
+    if necessita is None:
+        logging.warning(f"Imóvel ID {imovel_id} não encontrado ao verificar regras de necessidade de dois horários.")
+        return False # Não pode determinar sem dados do imóvel
+    return necessita
+
+@lru_cache(maxsize=4096)
+def _imovel_necessita_dois_horarios(imovel_id: int) -> Optional[bool]:
+    """
+    Aplica as regras de `regras_necessita_dois_horarios` para 'ENTRADA'/'SAIDA' a um imóvel.
+    Retorna None se o imóvel não for encontrado. Função auxiliar interna.
+
+    O resultado depende apenas do tamanho e da mobília do imóvel, então é memoizado por ID;
+    `cadastrar_imovel` e `atualizar_imovel` limpam o cache (ver `limpar_cache_regras_horarios`).
+    """
     # Busca os dados do imóvel para aplicar as regras
     imovel = obter_imovel_por_id(imovel_id)
     if not imovel:
-        logging.warning(f"Imóvel ID {imovel_id} não encontrado ao verificar regras de necessidade de dois horários.")
-        return False # Não pode determinar sem dados do imóvel
+        return None
 
     tamanho_imovel = float(imovel['tamanho'])
     status_mobilia_imovel = imovel['mobiliado']
@@ -627,10 +643,15 @@ def regras_necessita_dois_horarios(imovel_id: int, tipo_vistoria: str) -> bool:
     # Aplica as regras:
     # 1. Se o tamanho for 100m² ou mais, necessita de dois horários.
     # 2. OU, se o imóvel for 'mobiliado', necessita de dois horários.
-    if tamanho_imovel >= 100 or status_mobilia_imovel == "mobiliado":
-        return True
-    
-    return False # Caso contrário, um horário é suficiente
+    # Caso contrário, um horário é suficiente.
+    return tamanho_imovel >= 100 or status_mobilia_imovel == "mobiliado"
+
+def limpar_cache_regras_horarios() -> None:
+    """
+    Descarta as regras de horários memoizadas por imóvel. Deve ser chamada sempre que
+    o tamanho ou a mobília de um imóvel forem alterados fora de `atualizar_imovel`.
+    """
+    _imovel_necessita_dois_horarios.cache_clear()
 
 
 def calcular_valor_final_vistoria(imovel_id: int, tipo_vistoria: str) -> Optional[float]:
@@ -667,13 +688,35 @@ def calcular_valor_final_vistoria(imovel_id: int, tipo_vistoria: str) -> Optiona
     else: # Para 'ENTRADA' ou 'SAIDA'
         return round(valor_base_do_imovel, 2) # Valor completo
 
+# --- Tabela de valores pagos ao vistoriador ---
+# Fonte única das regras de `calcular_valor_vistoriador`; o SQL dos relatórios de vistoria
+# (`agenda_model._SQL_VALOR_VISTORIADOR`) é montado a partir destas mesmas constantes.
+class FaixasValorVistoriador(NamedTuple):
+    """Valores pagos ao vistoriador para um estado de mobília, por faixa de tamanho do imóvel."""
+    valor_minimo: float # Valor fixo abaixo de LIMITE_VALOR_MINIMO_M2
+    valor_m2_intermediario: float # Valor por m² de LIMITE_VALOR_MINIMO_M2 até LIMITE_VALOR_FIXO_M2 (exclusivo)
+    valor_fixo: float # Valor fixo de LIMITE_VALOR_FIXO_M2 até `limite_valor_fixo_m2` (inclusivo)
+    limite_valor_fixo_m2: float # Maior tamanho (m²) que ainda recebe o valor fixo
+    valor_m2_acima: float # Valor por m² acima de `limite_valor_fixo_m2`
+
+LIMITE_VALOR_MINIMO_M2 = 50 # Abaixo deste tamanho (m²), paga-se o valor mínimo
+LIMITE_VALOR_FIXO_M2 = 100 # A partir deste tamanho (m²), paga-se o valor fixo
+FATOR_VALOR_CONFERENCIA = 0.5 # Vistorias de 'CONFERENCIA' pagam 50% do valor base
+
+# Estado de mobília -> faixas de valores
+TABELA_VALOR_VISTORIADOR: Dict[str, FaixasValorVistoriador] = {
+    'mobiliado': FaixasValorVistoriador(65.00, 1.25, 125.00, 140, 0.90),
+    'semi_mobiliado': FaixasValorVistoriador(50.00, 1.00, 100.00, 135, 0.75),
+    'sem_mobilia': FaixasValorVistoriador(50.00, 1.00, 100.00, 135, 0.75),
+}
+
 def calcular_valor_vistoriador(tamanho_m2: float, mobiliado_status: str, tipo_vistoria_agenda: str) -> float:
     """
     Calcula o valor a ser pago ao vistoriador por uma vistoria específica.
 
     As regras de cálculo são baseadas no tamanho do imóvel (m²), no estado de mobília
     ('mobiliado', 'semi_mobiliado', 'sem_mobilia') e no tipo de vistoria agendada
-    ('ENTRADA', 'SAIDA', 'CONFERENCIA').
+    ('ENTRADA', 'SAIDA', 'CONFERENCIA'); os valores ficam em `TABELA_VALOR_VISTORIADOR`.
     Vistorias de 'CONFERENCIA' pagam 50% do valor base calculado para o vistoriador.
 
     Args:
@@ -685,36 +728,26 @@ def calcular_valor_vistoriador(tamanho_m2: float, mobiliado_status: str, tipo_vi
         float: O valor calculado a ser pago ao vistoriador, arredondado para 2 casas decimais.
                Retorna 0.0 se o tipo de mobília for desconhecido.
     """
-    valor_base_para_vistoriador = 0.0 # Valor antes de aplicar fator de conferência
-
-    # Lógica de cálculo baseada no estado de mobília e tamanho
-    if mobiliado_status == 'mobiliado':
-        if tamanho_m2 < 50:
-            valor_base_para_vistoriador = 65.00
-        elif 50 <= tamanho_m2 < 100: 
-            valor_base_para_vistoriador = tamanho_m2 * 1.25
-        elif 100 <= tamanho_m2 <= 140:
-            valor_base_para_vistoriador = 125.00
-        else: # Acima de 140m²
-            valor_base_para_vistoriador = tamanho_m2 * 0.90
-    elif mobiliado_status in ['sem_mobilia', 'semi_mobiliado']:
-        if tamanho_m2 < 50:
-            valor_base_para_vistoriador = 50.00
-        elif 50 <= tamanho_m2 < 100:
-            valor_base_para_vistoriador = tamanho_m2 * 1.00
-        elif 100 <= tamanho_m2 <= 135:
-            valor_base_para_vistoriador = 100.00
-        else: # Acima de 135m²
-            valor_base_para_vistoriador = tamanho_m2 * 0.75
-    else:
+    faixas = TABELA_VALOR_VISTORIADOR.get(mobiliado_status)
+    if faixas is None:
         # Caso o status da mobília não seja um dos esperados
         logging.warning(f"Tipo de mobília desconhecido '{mobiliado_status}' recebido para cálculo do valor do vistoriador.")
         return 0.0 # Retorna 0 ou poderia levantar uma exceção
 
+    # Lógica de cálculo baseada no tamanho, com as faixas do estado de mobília
+    if tamanho_m2 < LIMITE_VALOR_MINIMO_M2:
+        valor_base_para_vistoriador = faixas.valor_minimo
+    elif tamanho_m2 < LIMITE_VALOR_FIXO_M2:
+        valor_base_para_vistoriador = tamanho_m2 * faixas.valor_m2_intermediario
+    elif tamanho_m2 <= faixas.limite_valor_fixo_m2:
+        valor_base_para_vistoriador = faixas.valor_fixo
+    else: # Acima do limite da faixa fixa
+        valor_base_para_vistoriador = tamanho_m2 * faixas.valor_m2_acima
+
     # Aplica o redutor de 50% se a vistoria for do tipo 'CONFERENCIA'
     valor_final_para_vistoriador = 0.0
     if tipo_vistoria_agenda == 'CONFERENCIA':
-        valor_final_para_vistoriador = valor_base_para_vistoriador * 0.5
+        valor_final_para_vistoriador = valor_base_para_vistoriador * FATOR_VALOR_CONFERENCIA
     else: # Para 'ENTRADA' ou 'SAIDA', o valor base é o valor final
         valor_final_para_vistoriador = valor_base_para_vistoriador
         
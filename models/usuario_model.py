@@ -2,12 +2,14 @@
 
 import sqlite3
 import datetime as dt
+import time
 import pandas as pd
 import logging
+from collections import OrderedDict
 
 # Tentativa de importação relativa para uso dentro do pacote
 try:
-    from .database import conectar_banco, hash_senha
+    from .database import conectar_banco, hash_senha, verificar_senha, senha_precisa_rehash
 except ImportError:
     # Bloco de fallback para permitir execução direta do script (ex: para testes isolados)
     # Isso ajusta o sys.path para encontrar o módulo 'models' no diretório pai
@@ -17,7 +19,7 @@ except ImportError:
     parent_dir = os.path.dirname(current_dir)
     if parent_dir not in sys.path:
         sys.path.insert(0, parent_dir)
-    from models.database import conectar_banco, hash_senha, criar_tabelas
+    from models.database import conectar_banco, hash_senha, verificar_senha, senha_precisa_rehash, criar_tabelas
 
 from typing import Optional, Tuple, List, Dict, Any # Tipos para anotações estáticas, melhorando a legibilidade e manutenção
 
@@ -26,6 +28,39 @@ from typing import Optional, Tuple, List, Dict, Any # Tipos para anotações est
 # Formato: Inclui timestamp, nível do log e a mensagem.
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- Cache negativo de e-mails inexistentes (login) ---
+# Guarda, por um curto período, os e-mails para os quais `login_usuario` não encontrou usuário.
+# Tentativas repetidas com o mesmo e-mail inexistente (ex: ataques de força bruta) são
+# rejeitadas sem consultar o banco. O TTL curto evita bloquear cadastros legítimos, e
+# `cadastrar_usuario` remove o e-mail do cache assim que ele passa a existir.
+# O cache é limitado: com muitos e-mails distintos (ex: credential stuffing), as entradas
+# expiradas são descartadas a cada inserção e, acima do limite, as mais antigas também.
+_TTL_CACHE_EMAIL_INEXISTENTE_SEG = 60.0
+_MAX_ENTRADAS_CACHE_EMAIL_INEXISTENTE = 1024
+_cache_emails_inexistentes: "OrderedDict[str, float]" = OrderedDict() # --> email -> instante (monotonic) de expiração, em ordem de inserção
+
+def _email_em_cache_negativo(email: str) -> bool:
+    """Retorna True se o e-mail foi recentemente confirmado como inexistente (entrada ainda válida)."""
+    expira_em = _cache_emails_inexistentes.get(email)
+    if expira_em is None:
+        return False
+    if expira_em <= time.monotonic():
+        _cache_emails_inexistentes.pop(email, None) # --> Entrada expirada: descarta
+        return False
+    return True
+
+def _registrar_email_inexistente(email: str) -> None:
+    """Registra o e-mail no cache negativo, descartando entradas expiradas e as excedentes."""
+    agora = time.monotonic()
+    _cache_emails_inexistentes[email] = agora + _TTL_CACHE_EMAIL_INEXISTENTE_SEG
+    _cache_emails_inexistentes.move_to_end(email) # --> Mais recente no fim: o início guarda as que expiram primeiro
+    # Como o TTL é fixo, as entradas do início são as primeiras a expirar
+    while _cache_emails_inexistentes:
+        email_antigo, expira_em = next(iter(_cache_emails_inexistentes.items()))
+        if expira_em > agora and len(_cache_emails_inexistentes) <= _MAX_ENTRADAS_CACHE_EMAIL_INEXISTENTE:
+            break
+        _cache_emails_inexistentes.pop(email_antigo, None)
+
 def deletar_cliente_por_id(cliente_id: int, conexao_existente: Optional[sqlite3.Connection] = None) -> bool:
     """
     Deleta um cliente específico do banco de dados pelo seu ID.
@@ -64,7 +99,6 @@ def deletar_cliente_por_id(cliente_id: int, conexao_existente: Optional[sqlite3.
 
     try:
         cursor = conexao.cursor() # --> Objeto cursor para executar comandos SQL
-        cursor.execute("PRAGMA foreign_keys = ON;") # --> Garante que as constraints de FK sejam respeitadas
 
         # Etapa 1: Verificar se o cliente existe antes de tentar deletar
         # Isso evita erros desnecessários e permite um feedback mais preciso.
@@ -119,7 +153,7 @@ def cadastrar_usuario(nome: str, email: str, senha: str, tipo: str, telefone1: O
     """
     Cadastra um novo usuário (administrador ou vistoriador) no sistema.
 
-    A senha fornecida é criptografada usando SHA-256 antes de ser armazenada.
+    A senha fornecida é criptografada com scrypt (com sal aleatório) antes de ser armazenada.
     O tipo de usuário deve ser 'adm' ou 'vistoriador'.
 
     Args:
@@ -151,6 +185,7 @@ def cadastrar_usuario(nome: str, email: str, senha: str, tipo: str, telefone1: O
             VALUES (?, ?, ?, ?, ?, ?)
         """, (nome, email, telefone1, telefone2, tipo, senha_hashed))
         conexao.commit() # --> Salva as alterações no banco
+        _cache_emails_inexistentes.pop(email, None) # --> O e-mail passou a existir: invalida o cache negativo
         user_id = cursor.lastrowid # --> Obtém o ID do usuário recém-inserido
         logging.info(f"✅ Usuário '{nome}' (Tipo: {tipo}, Email: {email}) cadastrado com sucesso! ID: {user_id}")
         print(f"✅ Usuário '{nome}' ({tipo}) cadastrado com sucesso! ID: {user_id}")
@@ -174,7 +209,9 @@ def login_usuario(email: str, senha: str) -> Optional[Tuple[int, str]]:
     """
     Autentica um usuário com base no e-mail e senha fornecidos.
 
-    Compara o hash da senha fornecida com o hash armazenado no banco de dados.
+    Confere a senha fornecida contra o hash armazenado no banco de dados (`verificar_senha`).
+    Hashes no formato antigo (SHA-256 sem sal) são regravados com scrypt no primeiro
+    login bem-sucedido, quando a senha em texto plano está disponível.
 
     Args:
         email (str): E-mail do usuário que está tentando fazer login.
@@ -186,6 +223,13 @@ def login_usuario(email: str, senha: str) -> Optional[Tuple[int, str]]:
                                    Retorna None se o usuário não for encontrado, a senha estiver
                                    incorreta, ou ocorrer um erro.
     """
+    # E-mail recentemente confirmado como inexistente: rejeita sem ir ao banco.
+    # Como na busca sem cache, nenhum hash é calculado para e-mails inexistentes
+    # (o scrypt custaria muito mais que a consulta que o cache evita).
+    if _email_em_cache_negativo(email):
+        logging.info(f"Tentativa de login falhou: Usuário com e-mail '{email}' não encontrado (cache).")
+        return None
+
     conexao = None
     try:
         conexao = conectar_banco()
@@ -197,10 +241,12 @@ def login_usuario(email: str, senha: str) -> Optional[Tuple[int, str]]:
         if usuario_db_data:
             id_usuario, senha_armazenada_hash, tipo_usuario = usuario_db_data # --> Desempacota os dados do usuário
 
-            senha_fornecida_hash = hash_senha(senha) # --> Calcula o hash da senha fornecida
-
-            # Compara o hash da senha fornecida com o hash armazenado
-            if senha_fornecida_hash == senha_armazenada_hash:
+            # Confere a senha com o sal e os parâmetros gravados junto com o hash armazenado
+            if verificar_senha(senha_armazenada_hash, senha):
+                if senha_precisa_rehash(senha_armazenada_hash):
+                    # Hash antigo (SHA-256) ou parâmetros desatualizados: regrava com o formato atual
+                    cursor.execute("UPDATE usuarios SET senha = ? WHERE id = ?", (hash_senha(senha), id_usuario))
+                    conexao.commit()
                 logging.info(f"✅ Login bem-sucedido para usuário '{email}'. ID: {id_usuario}, Tipo: {tipo_usuario}")
                 print(f"✅ Login bem-sucedido para {email}! ID: {id_usuario}, Tipo: {tipo_usuario}")
                 return id_usuario, tipo_usuario # --> Retorna ID e tipo do usuário
@@ -211,6 +257,8 @@ def login_usuario(email: str, senha: str) -> Optional[Tuple[int, str]]:
         else:
             logging.info(f"Tentativa de login falhou: Usuário com e-mail '{email}' não encontrado.")
             print(f"❌ Usuário com e-mail {email} não encontrado.")
+            # Registra o e-mail no cache negativo para curto-circuitar novas tentativas
+            _registrar_email_inexistente(email)
             return None # --> Usuário não encontrado
     except Exception as e:
         logging.error(f"❌ Erro inesperado durante o processo de login para o e-mail '{email}': {e}", exc_info=True)
@@ -337,7 +385,6 @@ def deletar_usuario(usuario_id: int) -> bool:
     try:
         conexao = conectar_banco()
         cursor = conexao.cursor()
-        cursor.execute("PRAGMA foreign_keys = ON;") # --> Garante a verificação de FKs
 
         # Antes de deletar, seria bom obter o nome e tipo para logging, se necessário.
         # user_info = obter_usuario_por_id(usuario_id) # Chamaria a função abaixo
@@ -411,7 +458,50 @@ def obter_usuario_por_id(usuario_id: int) -> Optional[Dict[str, Any]]:
         if conexao:
             conexao.close()
 
+def obter_vistoriador_por_id(usuario_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Busca e retorna os dados de um usuário do tipo 'vistoriador' pelo seu ID.
+
+    O filtro de tipo é aplicado na própria consulta: se o ID pertencer a um usuário
+    de outro tipo, nenhuma linha é retornada.
+
+    Args:
+        usuario_id (int): O ID do vistoriador a ser pesquisado.
+
+    Returns:
+        Optional[Dict[str, Any]]: Um dicionário contendo os dados do vistoriador
+                                   (id, nome, email, tipo, telefone1, telefone2)
+                                   se ele for encontrado. Retorna None caso contrário.
+    """
+    conexao = None
+    try:
+        conexao = conectar_banco()
+        cursor = conexao.cursor()
+        cursor.execute(
+            "SELECT id, nome, email, tipo, telefone1, telefone2 FROM usuarios WHERE id = ? AND tipo = 'vistoriador' LIMIT 1",
+            (usuario_id,))
+        usuario_db_tuple = cursor.fetchone() # --> Tupla com os dados ou None
+
+        if usuario_db_tuple:
+            return {
+                'id': usuario_db_tuple[0],
+                'nome': usuario_db_tuple[1],
+                'email': usuario_db_tuple[2],
+                'tipo': usuario_db_tuple[3],
+                'telefone1': usuario_db_tuple[4],
+                'telefone2': usuario_db_tuple[5]
+            }
+        logging.info(f"Vistoriador com ID {usuario_id} não encontrado.")
+        return None
+    except Exception as e:
+        logging.error(f"❌ Erro ao obter vistoriador ID {usuario_id}: {e}", exc_info=True)
+        return None
+    finally:
+        if conexao:
+            conexao.close()
+
 # --- Funções relacionadas a Clientes ---
+
 def cadastrar_cliente(nome: str, email: str, telefone1: Optional[str] = None, telefone2: Optional[str] = None, saldo_devedor_total: float = 0.0) -> Optional[int]:
     """
     Cadastra um novo cliente no sistema.
@@ -1050,7 +1050,7 @@ class GerenciarVistoriadorViewWidget(QWidget):
                 status_color = "#DAA520" # Um tom de amarelo/dourado para agendado
             # Pode haver outros estados ou combinações
             else:
-                status_str = f"{item_data['tipo_vistoria']} (Disp: {item_data['disponivel']})"
+                status_str = f"{item_data['tipo_vistoria']} (Disp: {bool(item_data['disponivel'])})"
 
 
             item_text = f"{dia_semana} {data_f} às {hora_f}  -  Status: {status_str}"